@@ -3,18 +3,23 @@ Authentication and Authorization Module
 Handles user authentication, JWT tokens, and OAuth2
 """
 import os
+import time
 import hashlib
+import logging
 import secrets
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status, Security
+from fastapi import Depends, HTTPException, Request, status, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, OAuth2PasswordBearer
 from pydantic import BaseModel
 from typing import Optional as TypingOptional
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+
+logger = logging.getLogger(__name__)
 
 # Configuration
 # Load from .env file if available
@@ -30,35 +35,27 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "30"))
 
-# Database connection
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_NAME = os.getenv("DB_NAME", "kms_db")
-DB_USER = os.getenv("DB_USER", "kms_user")
-
-def get_db_password():
-    """Get database password from secrets"""
-    import subprocess
-    result = subprocess.run(
-        ["bash", os.path.expanduser("~/.wikisys-local/scripts/secrets-manager.sh"),
-         "decrypt", "passwords/kms-db-password"],
-        capture_output=True,
-        text=True
-    )
-    if result.returncode == 0:
-        lines = result.stdout.strip().split('\n')
-        return lines[-1]
-    else:
-        raise Exception(f"Failed to get DB password: {result.stderr}")
+# Session/user lookup cache (per worker) and last_used_at flush interval
+SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", "30"))
+# Without Redis, invalidations reach only the worker that made them: other
+# workers may accept a revoked session or disabled user for up to this long
+SESSION_CACHE_LOCAL_TTL = int(os.getenv("SESSION_CACHE_LOCAL_TTL", "5"))
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
+SESSION_TOUCH_FLUSH_INTERVAL = int(os.getenv("SESSION_TOUCH_FLUSH_INTERVAL", "60"))
+
+# Database connection - shared pool (see database.py)
+from database import get_db_connection as _get_pooled_connection
+from database import get_async_db_connection as _get_async_pooled_connection, run_db
+from starlette.concurrency import run_in_threadpool
+from utils.cache import get_redis_client, invalidate_tags, tag_versions
 
 def get_db_connection():
-    """Create database connection"""
-    password = get_db_password()
-    return psycopg2.connect(
-        host=DB_HOST,
-        database=DB_NAME,
-        user=DB_USER,
-        password=password
-    )
+    """Borrow a pooled connection with plain tuple rows"""
+    return _get_pooled_connection(dict_rows=False)
+
+async def get_async_db_connection():
+    """Borrow a pooled connection with plain tuple rows (async handlers)"""
+    return await _get_async_pooled_connection(dict_rows=False)
 
 # Password hashing - use bcrypt directly to avoid passlib issues
 import bcrypt
@@ -123,6 +120,14 @@ def get_password_hash(password: str) -> str:
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on a worker thread - bcrypt is deliberately slow"""
+    return await run_in_threadpool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on a worker thread"""
+    return await run_in_threadpool(get_password_hash, password)
+
 def hash_token(token: str) -> str:
     """Hash a token for storage"""
     return hashlib.sha256(token.encode()).hexdigest()
@@ -199,6 +204,17 @@ def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
         return None
     return user
 
+async def authenticate_user_async(username: str, password: str) -> Optional[Dict[str, Any]]:
+    """Authenticate a user without blocking the event loop"""
+    user = await run_db(get_user_by_username, username)
+    if not user:
+        return None
+    if not user.get("is_active"):
+        return None
+    if not await verify_password_async(password, user["password_hash"]):
+        return None
+    return user
+
 def create_session(user_id: int, access_token: str, refresh_token: str,
                   ip_address: str = None, user_agent: str = None) -> int:
     """Create a session in database"""
@@ -271,11 +287,188 @@ def log_audit_event(user_id: Optional[int], action: str, resource_type: str = No
     finally:
         conn.close()
 
+# ============================================================================
+# Session Cache
+# ============================================================================
+
+class _TTLCache:
+    """Small thread-safe TTL map with oldest-first eviction"""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl: Optional[int] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def pop_where(self, predicate):
+        with self._lock:
+            for key in [k for k, (_, v) in self._data.items() if predicate(v)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+# Entries are checked against the Redis tag versions of "session:<token_hash>"
+# and "user:<id>" on every request (one MGET), so an invalidation in any
+# worker evicts them everywhere. Without Redis the versions are this
+# worker's own and entries live SESSION_CACHE_LOCAL_TTL at most.
+
+# token_hash -> (session_id, user_id, session expires_at, tag versions)
+_session_cache = _TTLCache(SESSION_CACHE_TTL, SESSION_CACHE_MAX_ENTRIES)
+# user_id -> (user row, tag versions)
+_user_cache = _TTLCache(SESSION_CACHE_TTL, SESSION_CACHE_MAX_ENTRIES)
+
+def _session_tag(token_hash: str) -> str:
+    return f"session:{token_hash}"
+
+def _user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+async def _auth_tag_versions(token_hash: str, user_id: int) -> Dict[str, int]:
+    """Current versions of a request's session and user tags"""
+    tags = [_session_tag(token_hash), _user_tag(user_id)]
+    if get_redis_client() is None:
+        return tag_versions(tags)
+    return await run_in_threadpool(tag_versions, tags)
+
+def _cache_ttl() -> Optional[int]:
+    """Entry lifetime: shorter when invalidations cannot reach other workers"""
+    return None if get_redis_client() is not None else SESSION_CACHE_LOCAL_TTL
+
+def invalidate_session(token_hash: str):
+    """Forget a cached session in every worker (logout, revoke)"""
+    _session_cache.pop(token_hash)
+    invalidate_tags(_session_tag(token_hash))
+
+def invalidate_session_id(session_id: int, user_id: int):
+    """
+    Forget a cached session by id (token refresh rotates the hash)
+
+    Other workers only know the old token hash, so the user's tag is
+    bumped: their cached sessions are simply reloaded.
+    """
+    _session_cache.pop_where(lambda entry: entry[0] == session_id)
+    invalidate_tags(_user_tag(user_id))
+
+def invalidate_user(user_id: int):
+    """Forget a cached user and all of their sessions in every worker (disable, password change)"""
+    _user_cache.pop(user_id)
+    _session_cache.pop_where(lambda entry: entry[1] == user_id)
+    invalidate_tags(_user_tag(user_id))
+
+def _load_active_session(token_hash: str) -> Optional[Tuple[int, int, datetime]]:
+    """Return (session_id, user_id, expires_at) for an active session"""
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT id, user_id, expires_at, NOW() FROM sessions
+            WHERE token_hash = %s AND is_active = true AND expires_at > NOW()
+        """, (token_hash,))
+        session = cur.fetchone()
+        cur.close()
+        if not session:
+            return None
+        session_id, user_id, expires_at, db_now = session
+        # Remember expiry as a monotonic deadline - no DB/host clock mixing
+        remaining = (expires_at - db_now).total_seconds()
+        return session_id, user_id, time.monotonic() + remaining
+    finally:
+        conn.close()
+
+# ----------------------------------------------------------------------------
+# Batched last_used_at updates
+# ----------------------------------------------------------------------------
+
+_pending_touches: Dict[int, float] = {}
+_touch_lock = threading.Lock()
+_touch_flusher: Optional[threading.Thread] = None
+_touch_flusher_pid: Optional[int] = None
+
+def _record_session_touch(session_id: int):
+    """Queue a last_used_at update instead of writing on every request"""
+    global _touch_flusher, _touch_flusher_pid
+    with _touch_lock:
+        _pending_touches[session_id] = time.monotonic()
+        if _touch_flusher is None or _touch_flusher_pid != os.getpid():
+            _touch_flusher_pid = os.getpid()
+            _touch_flusher = threading.Thread(
+                target=_touch_flush_loop, name="kms-session-touch", daemon=True
+            )
+            _touch_flusher.start()
+
+def _touch_flush_loop():
+    while True:
+        time.sleep(SESSION_TOUCH_FLUSH_INTERVAL)
+        try:
+            flush_session_touches()
+        except Exception as e:
+            logger.warning(f"Session last_used_at flush failed: {e}")
+
+def flush_session_touches() -> int:
+    """Write all queued last_used_at values in one statement"""
+    with _touch_lock:
+        pending = dict(_pending_touches)
+        _pending_touches.clear()
+    if not pending:
+        return 0
+
+    now = time.monotonic()
+    rows = [(session_id, max(0.0, now - touched)) for session_id, touched in pending.items()]
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        execute_values(cur, """
+            UPDATE sessions AS s
+            SET last_used_at = NOW() - make_interval(secs => v.age)
+            FROM (VALUES %s) AS v(id, age)
+            WHERE s.id = v.id
+        """, rows, template="(%s, %s::float8)")
+        conn.commit()
+        cur.close()
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        # Put them back unless a newer touch arrived meanwhile
+        with _touch_lock:
+            for session_id, touched in pending.items():
+                _pending_touches.setdefault(session_id, touched)
+        raise
+    finally:
+        conn.close()
+
 # ============================================================================
 # Authentication Dependencies
 # ============================================================================
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Security(http_bearer)
 ) -> Dict[str, Any]:
     """Get current authenticated user from JWT token"""
@@ -287,7 +480,13 @@ async def get_current_user(
         )
 
     token = credentials.credentials
-    payload = verify_token(token, "access")
+
+    # Reuse the payload auth_middleware already decoded for this request
+    payload = None
+    if getattr(request.state, "access_token", None) == token:
+        payload = request.state.token_payload
+    if payload is None:
+        payload = verify_token(token, "access")
 
     if payload is None:
         raise HTTPException(
@@ -306,33 +505,35 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Verify session exists and is active
-    conn = get_db_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id FROM sessions
-            WHERE token_hash = %s AND is_active = true AND expires_at > NOW()
-        """, (hash_token(token),))
-        session = cur.fetchone()
-        cur.close()
-
-        if not session:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Session expired or invalid",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+    # Verify session exists and is active (cached for SESSION_CACHE_TTL,
+    # read before any reload so an invalidation during it still counts)
+    token_hash = hash_token(token)
+    versions = await _auth_tag_versions(token_hash, user_id)
+    session = _session_cache.get(token_hash)
+    if session is None or session[2] <= time.monotonic() or session[3] != versions:
+        session = await run_db(_load_active_session, token_hash)
+        if session:
+            session = (*session, versions)
+            _session_cache.set(token_hash, session, _cache_ttl())
+    if not session or session[1] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session expired or invalid",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
-        # Update last used
-        cur = conn.cursor()
-        cur.execute("UPDATE sessions SET last_used_at = NOW() WHERE id = %s", (session[0],))
-        conn.commit()
-        cur.close()
-    finally:
-        conn.close()
+    # Update last used - flushed in batches, no write per request
+    _record_session_touch(session[0])
 
-    user = get_user_by_id(user_id)
+    user_tag = _user_tag(user_id)
+    user_versions = {user_tag: versions[user_tag]}
+    cached_user = _user_cache.get(user_id)
+    if cached_user is not None and cached_user[1] == user_versions:
+        user = cached_user[0]
+    else:
+        user = await run_db(get_user_by_id, user_id)
+        if user is not None:
+            _user_cache.set(user_id, (user, user_versions), _cache_ttl())
     if user is None or not user.get("is_active"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -340,7 +541,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return user
+    return dict(user)
 
 async def get_current_active_user(
     current_user: Dict[str, Any] = Depends(get_current_user)
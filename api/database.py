@@ -2,11 +2,24 @@
 Database connection and utilities
 """
 import os
+import time
+import asyncio
+import functools
+import contextvars
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import RealDictCursor
 
+from utils.db_optimization import (
+    ConnectionPool, pool_monitor, log_query_stats, DB_POOL_SIZE, DB_MAX_OVERFLOW
+)
+
 # Database configuration
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_NAME = os.getenv("DB_NAME", "kms_db")
@@ -26,9 +39,8 @@ def get_db_password():
     else:
         raise Exception(f"Failed to get DB password: {result.stderr}")
 
-def get_db_connection():
-    """Create database connection with RealDictCursor"""
-    password = get_db_password()
+def _connect(password):
+    """Open a raw connection with RealDictCursor"""
     return psycopg2.connect(
         host=DB_HOST,
         database=DB_NAME,
@@ -37,6 +49,197 @@ def get_db_connection():
         cursor_factory=RealDictCursor
     )
 
+# ============================================================================
+# Connection Pool
+# ============================================================================
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Get (or lazily create) the process-wide connection pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(_connect, get_db_password)
+                pool_monitor.attach(_pool)
+    return _pool
+
+def init_pool():
+    """Decrypt the password and open the initial connections (app startup)"""
+    get_pool().warm_up()
+
+def close_pool():
+    """Close all pooled connections (app shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+def get_listen_connection():
+    """Dedicated autocommit connection for LISTEN (never returned to the pool)"""
+    conn = get_pool().connect_dedicated()
+    conn.autocommit = True
+    return conn
+
+# ============================================================================
+# Request-scoped connections and query accounting
+# ============================================================================
+
+class RequestScope:
+    """One borrowed connection plus query/connection counters for a request"""
+
+    def __init__(self):
+        self.conn = None
+        self.queries = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def connection(self):
+        """Borrow the pool connection on first use, then keep reusing it"""
+        with self._lock:
+            if self.conn is not None and self.conn.closed:
+                get_pool().putconn(self.conn)
+                self.conn = None
+            if self.conn is None:
+                self.conn = get_pool().getconn()
+                self.connections += 1
+            return self.conn
+
+    def release(self):
+        with self._lock:
+            if self.conn is not None:
+                conn, self.conn = self.conn, None
+                get_pool().putconn(conn)
+
+    def stats(self):
+        return {"queries": self.queries, "connections": self.connections}
+
+_request_scope: ContextVar[Optional[RequestScope]] = ContextVar("db_request_scope", default=None)
+
+@contextmanager
+def request_scope():
+    """
+    Share one pooled connection for everything run inside the block
+
+    Used by the HTTP middleware so auth, handler and audit logging of a
+    request borrow a single connection instead of three or four.
+    """
+    scope = RequestScope()
+    token = _request_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _request_scope.reset(token)
+        scope.release()
+
+def get_request_stats() -> Optional[dict]:
+    """Queries/connections used so far by the current request (None outside one)"""
+    scope = _request_scope.get()
+    return scope.stats() if scope is not None else None
+
+def _record_query(query, started: float):
+    scope = _request_scope.get()
+    if scope is not None:
+        scope.queries += 1
+    log_query_stats(query if isinstance(query, str) else str(query),
+                    (time.perf_counter() - started) * 1000)
+
+class _CountingCursorMixin:
+    """Counts executed statements for the request scope and query stats"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _record_query(query, started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _record_query(query, started)
+
+_counting_cursors = {}
+
+def _counting_cursor(factory):
+    """Return (cached) subclass of ``factory`` that counts executions"""
+    counting = _counting_cursors.get(factory)
+    if counting is None:
+        counting = type(f"Counting{factory.__name__}", (_CountingCursorMixin, factory), {})
+        _counting_cursors[factory] = counting
+    return counting
+
+class PooledConnection:
+    """
+    Proxy around a pooled psycopg2 connection
+
+    Behaves like the connection itself, but close() hands it back to the
+    pool instead of tearing down the TCP session. Handles created inside a
+    request scope do not own the connection; close() only detaches them.
+    """
+
+    def __init__(self, pool, conn, cursor_factory=RealDictCursor, owned=True):
+        self._pool = pool
+        self._conn = conn
+        self._cursor_factory = cursor_factory
+        self._owned = owned
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.pop("cursor_factory", None) or self._cursor_factory
+        return self._conn.cursor(*args, cursor_factory=_counting_cursor(factory), **kwargs)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            if self._owned:
+                self._pool.putconn(conn)
+
+    @property
+    def closed(self):
+        return 1 if self._conn is None else self._conn.closed
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Same semantics as psycopg2: end the transaction, keep the connection
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+def get_db_connection(dict_rows: bool = True, scoped: bool = True):
+    """
+    Borrow a pooled connection (close() returns it)
+
+    Inside a request scope the request's shared connection is returned.
+    ``dict_rows=False`` gives plain tuple cursors by default.
+    ``scoped=False`` always borrows a separate connection - needed for
+    work that outlives the handler, such as streaming response bodies.
+    """
+    factory = RealDictCursor if dict_rows else psycopg2.extensions.cursor
+    scope = _request_scope.get() if scoped else None
+    if scope is not None:
+        return PooledConnection(None, scope.connection(), factory, owned=False)
+    pool = get_pool()
+    return PooledConnection(pool, pool.getconn(), factory)
+
 @contextmanager
 def get_db():
     """Context manager for database connections"""
@@ -56,3 +259,80 @@ def get_db_cursor():
     finally:
         cur.close()
         conn.close()
+
+# ============================================================================
+# Async access for async def handlers
+# ============================================================================
+
+# Sized to the pool: a thread waiting here would otherwise wait on the pool
+_db_executor = ThreadPoolExecutor(
+    max_workers=DB_POOL_SIZE + DB_MAX_OVERFLOW,
+    thread_name_prefix="kms-db"
+)
+
+async def run_db(func, *args, **kwargs):
+    """
+    Run blocking database work on the DB executor instead of the event loop
+
+    The caller's context (request scope) travels with the call.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _db_executor, functools.partial(ctx.run, func, *args, **kwargs)
+    )
+
+class AsyncCursor:
+    """Awaitable cursor API (execute/fetch*) over a pooled psycopg2 cursor"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    async def execute(self, query, vars=None):
+        await run_db(self._cursor.execute, query, vars)
+
+    async def executemany(self, query, vars_list):
+        await run_db(self._cursor.executemany, query, vars_list)
+
+    # Results of a client-side cursor are already buffered - no I/O here
+    async def fetchone(self):
+        return self._cursor.fetchone()
+
+    async def fetchall(self):
+        return self._cursor.fetchall()
+
+    async def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+class AsyncConnection:
+    """Awaitable connection API (commit/rollback/close) over PooledConnection"""
+
+    def __init__(self, conn: PooledConnection):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return AsyncCursor(self._conn.cursor(*args, **kwargs))
+
+    async def commit(self):
+        await run_db(self._conn.commit)
+
+    async def rollback(self):
+        await run_db(self._conn.rollback)
+
+    async def close(self):
+        await run_db(self._conn.close)
+
+    @property
+    def closed(self):
+        return self._conn.closed
+
+async def get_async_db_connection(dict_rows: bool = True, scoped: bool = True) -> AsyncConnection:
+    """Borrow a pooled connection without blocking the event loop (see get_db_connection)"""
+    return AsyncConnection(await run_db(get_db_connection, dict_rows, scoped))
@@ -29,6 +29,8 @@ logger.info("=" * 80)
 
 from routers import categories, subcategories, objects, documents, search, system, tools, resources, auth, oauth2, metrics, logins, resources_mgmt
 
+from utils.conditional import NotModified, not_modified_handler
+
 logger.info("All routers imported successfully")
 
 # Create FastAPI application
@@ -41,6 +43,45 @@ app = FastAPI(
     openapi_url="/api/openapi.json"
 )
 
+# Database connection pool lifecycle
+@app.on_event("startup")
+def open_db_pool():
+    """Decrypt the DB password once and pre-open pooled connections"""
+    from database import init_pool
+    try:
+        init_pool()
+        logger.info("Database connection pool initialized")
+    except Exception as e:
+        # Keep serving; the pool retries lazily on first checkout
+        logger.error(f"Database pool warm-up failed: {e}")
+
+@app.on_event("startup")
+def start_change_feed():
+    """LISTEN on kms_changes and keep in-memory indexes and the read cache current"""
+    from utils.change_feed import get_change_feed
+    from utils.read_cache import start_read_cache_invalidation
+    from utils.suggest import start_suggest_index
+    feed = get_change_feed()
+    start_suggest_index(feed)
+    start_read_cache_invalidation(feed)
+    feed.start()
+
+@app.on_event("shutdown")
+def stop_change_feed():
+    from utils.change_feed import get_change_feed
+    get_change_feed().stop()
+
+@app.on_event("shutdown")
+def close_db_pool():
+    """Flush pending session touches, then close pooled database connections"""
+    from auth import flush_session_touches
+    from database import close_pool
+    try:
+        flush_session_touches()
+    except Exception as e:
+        logger.warning(f"Session touch flush failed: {e}")
+    close_pool()
+
 # Configure CORS - Production ready
 import os
 ALLOWED_ORIGINS = os.getenv("CORS_ORIGINS", "https://kms.it-enterprise.solutions,http://localhost:3000").split(",")
@@ -98,9 +139,10 @@ async def auth_middleware(request: Request, call_next):
                 content={"error": "Unauthorized", "detail": "Authentication required"}
             )
 
-        # Basic token validation (full validation happens in dependencies)
+        # Basic token validation (full validation happens in dependencies,
+        # which reuse the decoded payload from request.state)
         try:
-            from api.auth import verify_token
+            from auth import verify_token
             token = auth_header.split(" ")[1] if len(auth_header.split(" ")) > 1 else ""
             if token:
                 payload = verify_token(token, "access")
@@ -110,6 +152,8 @@ async def auth_middleware(request: Request, call_next):
                         status_code=401,
                         content={"error": "Unauthorized", "detail": "Invalid or expired token"}
                     )
+                request.state.access_token = token
+                request.state.token_payload = payload
         except Exception as e:
             logger.error(f"Token validation error: {e}")
             return JSONResponse(
@@ -138,7 +182,19 @@ async def add_process_time_header(request: Request, call_next):
         logger.error(f"✗ ERROR in middleware: {request.method} {request.url.path} - {type(e).__name__}: {str(e)}", exc_info=True)
         raise
 
+# Request-scoped DB connection - one pooled connection per request
+@app.middleware("http")
+async def db_request_scope(request: Request, call_next):
+    from database import request_scope
+    with request_scope() as scope:
+        response = await call_next(request)
+        response.headers["X-DB-Queries"] = str(scope.queries)
+        response.headers["X-DB-Connections"] = str(scope.connections)
+        return response
+
 # Exception handlers
+app.add_exception_handler(NotModified, not_modified_handler)
+
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc):
     logger.warning(f"404 Not Found: {request.url.path} - {str(exc)}")
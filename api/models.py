@@ -176,6 +176,34 @@ class SearchQuery(BaseModel):
     query: str = Field(..., min_length=1)
     limit: int = Field(default=20, ge=1, le=100)
 
+class SearchHit(BaseModel):
+    document_id: int
+    object_id: int
+    object_name: str
+    category: str
+    subcategory: Optional[str] = None
+    folder: str
+    filename: str
+    content_type: Optional[str] = None
+    chunk_no: Optional[int] = None
+    heading: Optional[str] = None
+    start_offset: Optional[int] = None
+    end_offset: Optional[int] = None
+    rank: float
+    snippet: str
+
+class FacetCount(BaseModel):
+    value: Optional[str] = None
+    count: int
+
+class SearchPage(BaseModel):
+    query: str
+    mode: str = "document"
+    total: int
+    results: List[SearchHit]
+    facets: Optional[Dict[str, List[FacetCount]]] = None
+    next_cursor: Optional[str] = None
+
 # ============================================================================
 # Response Models
 # ============================================================================
@@ -13,12 +13,14 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from auth import (
-    authenticate_user, create_access_token, create_refresh_token,
+    authenticate_user_async, create_access_token, create_refresh_token,
     create_session, get_current_user, get_current_active_user,
     get_current_superuser, get_user_by_username, get_user_by_id,
-    get_password_hash, verify_token, hash_token, update_user_last_login,
-    log_audit_event, UserLogin, UserCreate, UserResponse, Token
+    get_password_hash_async, verify_token, hash_token, update_user_last_login,
+    log_audit_event, get_async_db_connection, invalidate_session,
+    invalidate_session_id, invalidate_user, UserLogin, UserCreate, UserResponse, Token
 )
+from database import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -33,9 +35,9 @@ async def login(user_data: UserLogin, request: Request):
     """Login with username and password"""
     try:
         # Authenticate user
-        user = authenticate_user(user_data.username, user_data.password)
+        user = await authenticate_user_async(user_data.username, user_data.password)
         if not user:
-            log_audit_event(None, "login_failed", details={"username": user_data.username})
+            await run_db(log_audit_event, None, "login_failed", details={"username": user_data.username})
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
@@ -53,15 +55,17 @@ async def login(user_data: UserLogin, request: Request):
         # Create session
         ip_address = request.client.host if request.client else None
         user_agent = request.headers.get("user-agent")
-        create_session(
+        await run_db(
+            create_session,
             user["id"], access_token, refresh_token, ip_address, user_agent
         )
 
         # Update last login
-        update_user_last_login(user["id"])
+        await run_db(update_user_last_login, user["id"])
 
         # Log successful login
-        log_audit_event(
+        await run_db(
+            log_audit_event,
             user["id"], "login", ip_address=ip_address, user_agent=user_agent
         )
 
@@ -96,21 +100,22 @@ async def logout(
             token_hash = hash_token(token)
 
             # Deactivate session
-            from ..auth import get_db_connection
-            conn = get_db_connection()
+            conn = await get_async_db_connection()
             try:
                 cur = conn.cursor()
-                cur.execute(
+                await cur.execute(
                     "UPDATE sessions SET is_active = false WHERE token_hash = %s",
                     (token_hash,)
                 )
-                conn.commit()
+                await conn.commit()
                 cur.close()
             finally:
-                conn.close()
+                await conn.close()
+            invalidate_session(token_hash)
 
             # Log logout
-            log_audit_event(
+            await run_db(
+                log_audit_event,
                 current_user["id"], "logout",
                 ip_address=request.client.host if request.client else None,
                 user_agent=request.headers.get("user-agent")
@@ -149,16 +154,15 @@ async def refresh_token(refresh_token: str, request: Request):
             )
 
         # Verify session
-        from ..auth import get_db_connection
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         try:
             cur = conn.cursor()
-            cur.execute("""
+            await cur.execute("""
                 SELECT id FROM sessions
                 WHERE refresh_token_hash = %s AND is_active = true
                 AND refresh_expires_at > NOW()
             """, (hash_token(refresh_token),))
-            session = cur.fetchone()
+            session = await cur.fetchone()
             cur.close()
 
             if not session:
@@ -167,7 +171,7 @@ async def refresh_token(refresh_token: str, request: Request):
                     detail="Refresh token expired or invalid",
                 )
         finally:
-            conn.close()
+            await conn.close()
 
         # Create new tokens
         new_access_token = create_access_token(
@@ -178,25 +182,30 @@ async def refresh_token(refresh_token: str, request: Request):
         )
 
         # Update session
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         try:
             cur = conn.cursor()
-            cur.execute("""
+            await cur.execute("""
                 UPDATE sessions
                 SET token_hash = %s, refresh_token_hash = %s,
                     expires_at = NOW() + INTERVAL '1 hour',
                     refresh_expires_at = NOW() + INTERVAL '30 days',
                     last_used_at = NOW()
                 WHERE refresh_token_hash = %s
+                RETURNING id, user_id
             """, (
                 hash_token(new_access_token),
                 hash_token(new_refresh_token),
                 hash_token(refresh_token)
             ))
-            conn.commit()
+            rotated = await cur.fetchall()
+            await conn.commit()
             cur.close()
         finally:
-            conn.close()
+            await conn.close()
+        # After the commit, so no worker reloads the old row under the new versions
+        for session_id, session_user_id in rotated:
+            invalidate_session_id(session_id, session_user_id)
 
         return {
             "access_token": new_access_token,
@@ -241,33 +250,33 @@ async def create_user(
     """Create a new user (admin only)"""
     try:
         # Check if username or email already exists
-        existing_user = get_user_by_username(user_data.username)
+        existing_user = await run_db(get_user_by_username, user_data.username)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already exists"
             )
 
-        from ..auth import get_db_connection
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         try:
             cur = conn.cursor()
-            cur.execute("""
+            await cur.execute("""
                 INSERT INTO users (username, email, password_hash, full_name, role)
                 VALUES (%s, %s, %s, %s, %s)
                 RETURNING id, username, email, full_name, is_active, is_superuser, role, created_at
             """, (
                 user_data.username,
                 user_data.email,
-                get_password_hash(user_data.password),
+                await get_password_hash_async(user_data.password),
                 user_data.full_name,
                 user_data.role
             ))
-            user = cur.fetchone()
-            conn.commit()
+            user = await cur.fetchone()
+            await conn.commit()
             cur.close()
 
-            log_audit_event(
+            await run_db(
+                log_audit_event,
                 current_user["id"], "user_create",
                 resource_type="user", resource_id=user[0],
                 details={"username": user_data.username}
@@ -284,7 +293,7 @@ async def create_user(
                 "created_at": user[7]
             }
         finally:
-            conn.close()
+            await conn.close()
     except HTTPException:
         raise
     except Exception as e:
@@ -305,10 +314,8 @@ async def change_password(
 ):
     """Change user password"""
     try:
-        from ..auth import authenticate_user, get_db_connection
-
         # Verify old password
-        user = authenticate_user(current_user["username"], password_data.old_password)
+        user = await authenticate_user_async(current_user["username"], password_data.old_password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -316,17 +323,19 @@ async def change_password(
             )
 
         # Update password
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         try:
             cur = conn.cursor()
-            cur.execute(
+            await cur.execute(
                 "UPDATE users SET password_hash = %s, updated_at = NOW() WHERE id = %s",
-                (get_password_hash(password_data.new_password), current_user["id"])
+                (await get_password_hash_async(password_data.new_password), current_user["id"])
             )
-            conn.commit()
+            await conn.commit()
             cur.close()
+            invalidate_user(current_user["id"])
 
-            log_audit_event(
+            await run_db(
+                log_audit_event,
                 current_user["id"], "password_change",
                 ip_address=None, user_agent=None
             )
@@ -335,7 +344,7 @@ async def change_password(
 
             return {"message": "Password changed successfully"}
         finally:
-            conn.close()
+            await conn.close()
     except HTTPException:
         raise
     except Exception as e:
@@ -352,7 +361,6 @@ async def disable_user(
 ):
     """Disable a user (admin only)"""
     try:
-        from ..auth import get_db_connection
 
         # Don't allow disabling yourself
         if user_id == current_user["id"]:
@@ -361,23 +369,25 @@ async def disable_user(
                 detail="Cannot disable your own account"
             )
 
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         try:
             cur = conn.cursor()
-            cur.execute(
+            await cur.execute(
                 "UPDATE users SET is_active = false, updated_at = NOW() WHERE id = %s RETURNING username",
                 (user_id,)
             )
-            result = cur.fetchone()
+            result = await cur.fetchone()
             if not result:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="User not found"
                 )
-            conn.commit()
+            await conn.commit()
             cur.close()
+            invalidate_user(user_id)
 
-            log_audit_event(
+            await run_db(
+                log_audit_event,
                 current_user["id"], "user_disable",
                 resource_type="user", resource_id=user_id,
                 details={"username": result[0]}
@@ -387,7 +397,7 @@ async def disable_user(
 
             return {"message": f"User {result[0]} disabled successfully"}
         finally:
-            conn.close()
+            await conn.close()
     except HTTPException:
         raise
     except Exception as e:
@@ -2,7 +2,8 @@
 Categories API Router
 """
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 import json
 import os
 
@@ -12,42 +13,68 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from models import Category, CategoryCreate, CategoryUpdate, MessageResponse
 from database import get_db_cursor
+from utils.cache import cached
+from utils.conditional import check_conditional, fingerprint_validators, list_fingerprint, make_etag
+from utils.read_cache import READ_CACHE_TTL, invalidates
 
 # Base path for category folders
 CATEGORY_BASE_PATH = "/opt/kms"
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
+
+def _category_filters(type: Optional[str], is_active: Optional[bool]):
+    where = "WHERE 1=1"
+    params = []
+
+    if type:
+        where += " AND type = %s"
+        params.append(type)
+
+    if is_active is not None:
+        where += " AND is_active = %s"
+        params.append(is_active)
+
+    return where, params
+
+
+@cached(prefix="categories", ttl=READ_CACHE_TTL)
+def _category_list_fingerprint(type: Optional[str], is_active: Optional[bool]):
+    where, params = _category_filters(type, is_active)
+    with get_db_cursor() as (cur, conn):
+        return list_fingerprint(
+            cur,
+            f"SELECT count(*) AS n, max(updated_at) AS last_modified FROM categories {where}",
+            params
+        )
+
+
+@cached(prefix="categories", ttl=READ_CACHE_TTL)
+def _category_list(type: Optional[str], is_active: Optional[bool], skip: int, limit: int):
+    where, params = _category_filters(type, is_active)
+    with get_db_cursor() as (cur, conn):
+        query = f"SELECT * FROM categories {where} ORDER BY sort_order, name LIMIT %s OFFSET %s"
+        cur.execute(query, params + [limit, skip])
+        return jsonable_encoder(cur.fetchall())
+
+
 @router.get("/", response_model=List[Category])
 def list_categories(
+    request: Request,
+    response: Response,
     type: Optional[str] = Query(None, pattern="^(product|system)$"),
     is_active: Optional[bool] = None,
     skip: int = 0,
     limit: int = 100
 ):
     """List all categories"""
-    with get_db_cursor() as (cur, conn):
-        query = "SELECT * FROM categories WHERE 1=1"
-        params = []
-
-        if type:
-            query += " AND type = %s"
-            params.append(type)
+    etag, last_modified = fingerprint_validators(request, _category_list_fingerprint(type, is_active))
+    check_conditional(request, response, etag, last_modified)
 
-        if is_active is not None:
-            query += " AND is_active = %s"
-            params.append(is_active)
-
-        query += " ORDER BY sort_order, name LIMIT %s OFFSET %s"
-        params.extend([limit, skip])
-
-        cur.execute(query, params)
-        categories = cur.fetchall()
-
-        return categories
+    return _category_list(type, is_active, skip, limit)
 
 @router.get("/{category_id}", response_model=Category)
-def get_category(category_id: int):
+def get_category(category_id: int, request: Request, response: Response):
     """Get a specific category"""
     with get_db_cursor() as (cur, conn):
         cur.execute("SELECT * FROM categories WHERE id = %s", (category_id,))
@@ -56,9 +83,14 @@ def get_category(category_id: int):
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
 
+        check_conditional(request, response,
+                          make_etag(request, category["id"], category["updated_at"]),
+                          category["updated_at"])
+
         return category
 
 @router.post("/", response_model=Category, status_code=201)
+@invalidates("categories")
 def create_category(category: CategoryCreate):
     """Create a new category"""
     with get_db_cursor() as (cur, conn):
@@ -106,6 +138,7 @@ def create_category(category: CategoryCreate):
             raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{category_id}", response_model=Category)
+@invalidates("categories")
 def update_category(category_id: int, category: CategoryUpdate):
     """Update a category"""
     with get_db_cursor() as (cur, conn):
@@ -168,6 +201,7 @@ def update_category(category_id: int, category: CategoryUpdate):
             raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{category_id}", response_model=MessageResponse)
+@invalidates("categories")
 def delete_category(category_id: int):
     """Delete a category"""
     with get_db_cursor() as (cur, conn):
@@ -2,7 +2,7 @@
 Documents API Router
 """
 from typing import List
-from fastapi import APIRouter, HTTPException, Response
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 import json
 
 import sys
@@ -10,15 +10,46 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from models import Document, DocumentCreate, DocumentUpdate, MessageResponse
-from database import get_db_cursor
+from database import get_db_cursor, get_db_connection
+from utils.conditional import check_conditional, make_etag
+from utils.read_cache import invalidates
+from utils.streaming import ranged_response, STREAM_CHUNK_SIZE
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
+# Document model columns without the body (content is TOASTed separately,
+# so leaving it out means large bodies are never read)
+DOCUMENT_METADATA_COLUMNS = """
+    id, object_id, folder, filename, filepath, content_type,
+    size_bytes, checksum, version, metadata, created_at, updated_at
+"""
+# Everything the Document model returns - not search_vector
+DOCUMENT_COLUMNS = DOCUMENT_METADATA_COLUMNS + ", content"
+
 @router.get("/{document_id}", response_model=Document)
-def get_document(document_id: int):
-    """Get a specific document"""
+def get_document(
+    document_id: int,
+    request: Request,
+    response: Response,
+    include_content: bool = Query(False, description="Also return the body (use /content for large files)")
+):
+    """Get a specific document (metadata only unless include_content=true)"""
+    columns = DOCUMENT_COLUMNS if include_content else DOCUMENT_METADATA_COLUMNS
     with get_db_cursor() as (cur, conn):
-        cur.execute("SELECT * FROM documents WHERE id = %s", (document_id,))
+        # Validators first, so a 304 never reads the row (or its TOASTed body)
+        cur.execute("SELECT checksum, version, updated_at FROM documents WHERE id = %s", (document_id,))
+        current = cur.fetchone()
+
+        if not current:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        check_conditional(
+            request, response,
+            make_etag(request, document_id, current["checksum"], current["version"], current["updated_at"]),
+            current["updated_at"]
+        )
+
+        cur.execute(f"SELECT {columns} FROM documents WHERE id = %s", (document_id,))
         document = cur.fetchone()
 
         if not document:
@@ -26,22 +57,153 @@ def get_document(document_id: int):
 
         return document
 
-@router.get("/{document_id}/content")
-def get_document_content(document_id: int):
-    """Get document content as raw text"""
+@router.get("/{document_id}/chunks")
+def get_document_chunks(document_id: int):
+    """Section outline of a document: chunk headings and character offsets"""
     with get_db_cursor() as (cur, conn):
-        cur.execute("SELECT content, content_type, filename FROM documents WHERE id = %s", (document_id,))
-        document = cur.fetchone()
-
-        if not document:
+        cur.execute("SELECT 1 FROM documents WHERE id = %s", (document_id,))
+        if not cur.fetchone():
             raise HTTPException(status_code=404, detail="Document not found")
 
-        content = document['content'] or ''
-        content_type = document['content_type'] or 'text/plain'
+        cur.execute("""
+            SELECT chunk_no, heading, start_offset, end_offset
+            FROM document_chunks
+            WHERE document_id = %s
+            ORDER BY chunk_no
+        """, (document_id,))
+
+        return {"document_id": document_id, "chunks": cur.fetchall()}
+
+@router.get("/{document_id}/chunks/{chunk_no}")
+def get_document_chunk(document_id: int, chunk_no: int):
+    """One chunk of a document, e.g. the section a chunk search hit points to"""
+    with get_db_cursor() as (cur, conn):
+        cur.execute("""
+            SELECT document_id, chunk_no, heading, start_offset, end_offset, content
+            FROM document_chunks
+            WHERE document_id = %s AND chunk_no = %s
+        """, (document_id, chunk_no))
+        chunk = cur.fetchone()
+
+        if not chunk:
+            raise HTTPException(status_code=404, detail="Chunk not found")
+
+        return chunk
+
+def _stream_document_content(conn, document_id: int, start: int, end: int):
+    """
+    Yield bytes start..end (inclusive) of a document body
+
+    Reads document_chunks through a server-side cursor, so only the chunks
+    overlapping the range are fetched and only one batch is in memory.
+    Owns ``conn`` and returns it to the pool when done.
+    """
+    cur = conn.cursor(name=f"document_content_{document_id}")
+    cur.itersize = 16
+    try:
+        cur.execute("""
+            SELECT start_byte, content
+            FROM document_chunks
+            WHERE document_id = %s
+              AND start_byte + octet_length(content) > %s
+              AND start_byte <= %s
+            ORDER BY chunk_no
+        """, (document_id, start, end))
+        for row in cur:
+            data = row["content"].encode("utf-8")
+            chunk_start = row["start_byte"]
+            yield data[max(0, start - chunk_start):end - chunk_start + 1]
+    finally:
+        cur.close()
+        conn.rollback()
+        conn.close()
+
+def _stream_document_body(conn, document_id: int, start: int, end: int,
+                          window: int = STREAM_CHUNK_SIZE):
+    """
+    Yield bytes start..end (inclusive) of a document body that has no
+    document_chunks yet (migration 006 pending)
+
+    The server slices the encoded body into ``window``-byte pieces read
+    through a server-side cursor, so only one batch is ever in memory
+    here. Owns ``conn`` and returns it to the pool when done.
+    """
+    cur = conn.cursor(name=f"document_body_{document_id}")
+    cur.itersize = 16
+    try:
+        cur.execute("""
+            WITH body AS MATERIALIZED (
+                SELECT convert_to(COALESCE(content, ''), 'UTF8') AS data
+                FROM documents
+                WHERE id = %(id)s
+            )
+            SELECT substring(body.data FROM pos FOR LEAST(%(window)s, %(end)s + 2 - pos)) AS data
+            FROM body, generate_series(%(start)s + 1, %(end)s + 1, %(window)s) AS pos
+            ORDER BY pos
+        """, {"id": document_id, "start": start, "end": end, "window": window})
+        for row in cur:
+            yield bytes(row["data"])
+    finally:
+        cur.close()
+        conn.rollback()
+        conn.close()
 
-        return Response(content=content, media_type=content_type)
+@router.get("/{document_id}/content")
+def get_document_content(document_id: int, request: Request):
+    """Get document content as raw text (streamed, supports Range and If-None-Match)"""
+    # Not the request's shared connection: the body is streamed after the
+    # handler returns, and metadata + chunks must come from one snapshot
+    conn = get_db_connection(scoped=False)
+    try:
+        cur = conn.cursor()
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        cur.execute("""
+            SELECT d.content_type, d.checksum, d.version, d.updated_at,
+                   COALESCE(octet_length(d.content), 0) AS size,
+                   EXISTS (SELECT 1 FROM document_chunks ch WHERE ch.document_id = d.id) AS chunked
+            FROM documents d
+            WHERE d.id = %s
+        """, (document_id,))
+        document = cur.fetchone()
+        cur.close()
+    except Exception:
+        conn.close()
+        raise
+
+    if not document:
+        conn.close()
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    content_type = document['content_type'] or 'text/plain'
+    if document['checksum']:
+        etag = f'"{document["checksum"]}"'
+    else:
+        etag = f'W/"{document_id}-{document["version"]}-{document["updated_at"].timestamp():.0f}"'
+
+    def release():
+        # Also runs after a finished stream has returned the connection
+        if not conn.closed:
+            conn.rollback()
+            conn.close()
+
+    if document['chunked'] or document['size'] == 0:
+        def open_stream(start, end):
+            return _stream_document_content(conn, document_id, start, end)
+    else:
+        def open_stream(start, end):
+            return _stream_document_body(conn, document_id, start, end)
+
+    return ranged_response(
+        request,
+        size=document['size'],
+        open_stream=open_stream,
+        media_type=content_type,
+        etag=etag,
+        release=release,
+    )
 
 @router.post("/", response_model=Document, status_code=201)
+@invalidates("documents")
 def create_document(doc: DocumentCreate):
     """Create a new document"""
     with get_db_cursor() as (cur, conn):
@@ -58,8 +220,7 @@ def create_document(doc: DocumentCreate):
                 INSERT INTO documents
                 (object_id, folder, filename, filepath, content, content_type, size_bytes, checksum, metadata)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING *
-            """, (
+                RETURNING """ + DOCUMENT_COLUMNS, (
                 doc.object_id,
                 doc.folder,
                 doc.filename,
@@ -81,11 +242,12 @@ def create_document(doc: DocumentCreate):
             raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{document_id}", response_model=Document)
+@invalidates("documents")
 def update_document(document_id: int, doc: DocumentUpdate):
     """Update a document"""
     with get_db_cursor() as (cur, conn):
         # Check if document exists
-        cur.execute("SELECT * FROM documents WHERE id = %s", (document_id,))
+        cur.execute(f"SELECT {DOCUMENT_METADATA_COLUMNS} FROM documents WHERE id = %s", (document_id,))
         existing = cur.fetchone()
 
         if not existing:
@@ -95,11 +257,15 @@ def update_document(document_id: int, doc: DocumentUpdate):
         update_fields = []
         params = []
 
+        # Unchanged content is not rewritten, so version counts real changes
+        content_changed = False
         if doc.content is not None:
             import hashlib
             checksum = hashlib.sha256(doc.content.encode()).hexdigest()
             size_bytes = len(doc.content.encode())
+            content_changed = checksum != existing['checksum']
 
+        if content_changed:
             update_fields.extend([
                 "content = %s",
                 "checksum = %s",
@@ -113,12 +279,14 @@ def update_document(document_id: int, doc: DocumentUpdate):
             params.append(json.dumps(doc.metadata))
 
         if not update_fields:
+            if doc.content is not None:
+                return {**existing, "content": doc.content}
             return existing
 
         update_fields.append("updated_at = NOW()")
         params.append(document_id)
 
-        query = f"UPDATE documents SET {', '.join(update_fields)} WHERE id = %s RETURNING *"
+        query = f"UPDATE documents SET {', '.join(update_fields)} WHERE id = %s RETURNING {DOCUMENT_COLUMNS}"
 
         try:
             cur.execute(query, params)
@@ -132,11 +300,12 @@ def update_document(document_id: int, doc: DocumentUpdate):
             raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{document_id}", response_model=MessageResponse)
+@invalidates("documents")
 def delete_document(document_id: int):
     """Delete a document"""
     with get_db_cursor() as (cur, conn):
         # Check if document exists
-        cur.execute("SELECT * FROM documents WHERE id = %s", (document_id,))
+        cur.execute("SELECT id, filename FROM documents WHERE id = %s", (document_id,))
         document = cur.fetchone()
 
         if not document:
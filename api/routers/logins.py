@@ -15,7 +15,8 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from auth import get_current_user, get_current_active_user, log_audit_event
-from database import get_db_connection
+from database import get_async_db_connection
+from starlette.concurrency import run_in_threadpool
 from lib.secrets import SecretsManager
 import json
 from psycopg2.extras import Json, RealDictCursor
@@ -87,7 +88,7 @@ class DecryptResponse(BaseModel):
 # Helper Functions
 # ============================================================================
 
-def log_credential_audit(
+async def log_credential_audit(
     credential_id: int,
     user_id: int,
     action: str,
@@ -97,8 +98,11 @@ def log_credential_audit(
     metadata: Optional[Dict] = None
 ):
     """Log credential access to audit log"""
+    conn = None
     try:
-        conn = get_db_connection()
+        # Own connection: the audit row must neither commit nor roll back
+        # the request's pending writes on the shared one
+        conn = await get_async_db_connection(scoped=False)
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         ip_address = None
@@ -108,7 +112,7 @@ def log_credential_audit(
             ip_address = request.client.host if request.client else None
             user_agent = request.headers.get("user-agent")
 
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO credentials_audit_log
                 (credential_id, user_id, action, ip_address, user_agent, success, error_message, metadata)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
@@ -119,14 +123,21 @@ def log_credential_audit(
             metadata if metadata else {}
         ))
 
-        conn.commit()
+        await conn.commit()
         cursor.close()
-        conn.close()
 
         logger.info(f"Audit: User {user_id} {action} credential {credential_id} - Success: {success}")
 
     except Exception as e:
         logger.error(f"Failed to log credential audit: {e}", exc_info=True)
+        if conn is not None:
+            try:
+                await conn.rollback()
+            except Exception:
+                pass
+    finally:
+        if conn is not None:
+            await conn.close()
 
 # ============================================================================
 # CRUD Endpoints
@@ -141,7 +152,7 @@ async def list_credentials(
 ):
     """List all credentials for current user"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         query = """
@@ -171,11 +182,11 @@ async def list_credentials(
 
         query += " ORDER BY c.created_at DESC"
 
-        cursor.execute(query, params)
-        credentials = cursor.fetchall()
+        await cursor.execute(query, params)
+        credentials = await cursor.fetchall()
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         return [
             {
@@ -214,10 +225,10 @@ async def get_credential(
 ):
     """Get specific credential by ID"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
-        cursor.execute("""
+        await cursor.execute("""
             SELECT
                 c.id, c.user_id, c.key_name, c.category, c.description,
                 c.connection_info, c.tags, c.notes, c.test_endpoint,
@@ -229,16 +240,16 @@ async def get_credential(
             WHERE c.id = %s AND c.user_id = %s
         """, (credential_id, current_user["id"]))
 
-        credential = cursor.fetchone()
+        credential = await cursor.fetchone()
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         if not credential:
             raise HTTPException(status_code=404, detail="Credential not found")
 
         # Log view audit
-        log_credential_audit(credential_id, current_user["id"], "view", request=request)
+        await log_credential_audit(credential_id, current_user["id"], "view", request=request)
 
         return {
             "id": credential[0],
@@ -278,15 +289,15 @@ async def create_credential(
     try:
         # Encrypt the secret value
         secret_name = f"credentials/{current_user['id']}/{credential.key_name}"
-        encrypted_value = SecretsManager.encrypt(credential.plain_value, secret_name)
+        encrypted_value = await run_in_threadpool(SecretsManager.encrypt, credential.plain_value, secret_name)
 
         # Create hash for uniqueness check
         key_hash = hashlib.sha256(f"{current_user['id']}:{credential.key_name}".encode()).hexdigest()
 
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO credentials
                 (user_id, key_name, key_hash, category, description, encrypted_value,
                  connection_info, tags, notes, test_endpoint, environment,
@@ -303,16 +314,16 @@ async def create_credential(
             credential.expires_at, credential.auto_rotate, credential.rotation_days
         ))
 
-        result = cursor.fetchone()
+        result = await cursor.fetchone()
         credential_id = result['id']
         created_at = result['created_at']
 
-        conn.commit()
+        await conn.commit()
         cursor.close()
-        conn.close()
+        await conn.close()
 
         # Log creation audit
-        log_credential_audit(
+        await log_credential_audit(
             credential_id, current_user["id"], "create",
             request=request,
             metadata={"category": credential.category, "key_name": credential.key_name}
@@ -355,12 +366,12 @@ async def update_credential(
 ):
     """Update existing credential"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # Verify ownership
-        cursor.execute("SELECT id FROM credentials WHERE id = %s AND user_id = %s", (credential_id, current_user["id"]))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT id FROM credentials WHERE id = %s AND user_id = %s", (credential_id, current_user["id"]))
+        if not await cursor.fetchone():
             raise HTTPException(status_code=404, detail="Credential not found")
 
         # Build update query
@@ -382,7 +393,7 @@ async def update_credential(
         if credential.plain_value is not None:
             # Re-encrypt with new value
             secret_name = f"credentials/{current_user['id']}/{credential.key_name or 'updated'}"
-            encrypted_value = SecretsManager.encrypt(credential.plain_value, secret_name)
+            encrypted_value = await run_in_threadpool(SecretsManager.encrypt, credential.plain_value, secret_name)
             updates.append("encrypted_value = %s")
             params.append(encrypted_value)
 
@@ -428,11 +439,11 @@ async def update_credential(
         query = f"UPDATE credentials SET {', '.join(updates)} WHERE id = %s AND user_id = %s"
         params.extend([credential_id, current_user["id"]])
 
-        cursor.execute(query, params)
-        conn.commit()
+        await cursor.execute(query, params)
+        await conn.commit()
 
         # Fetch updated credential
-        cursor.execute("""
+        await cursor.execute("""
             SELECT
                 id, user_id, key_name, category, description,
                 connection_info, tags, notes, test_endpoint,
@@ -442,13 +453,13 @@ async def update_credential(
             WHERE id = %s
         """, (credential_id,))
 
-        updated = cursor.fetchone()
+        updated = await cursor.fetchone()
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         # Log update audit
-        log_credential_audit(
+        await log_credential_audit(
             credential_id, current_user["id"], "update",
             request=request,
             metadata={"updated_fields": list(credential.dict(exclude_unset=True).keys())}
@@ -492,25 +503,25 @@ async def delete_credential(
 ):
     """Delete credential"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # Verify ownership and get credential info
-        cursor.execute("SELECT key_name FROM credentials WHERE id = %s AND user_id = %s", (credential_id, current_user["id"]))
-        credential = cursor.fetchone()
+        await cursor.execute("SELECT key_name FROM credentials WHERE id = %s AND user_id = %s", (credential_id, current_user["id"]))
+        credential = await cursor.fetchone()
 
         if not credential:
             raise HTTPException(status_code=404, detail="Credential not found")
 
         # Delete from database (audit log will cascade)
-        cursor.execute("DELETE FROM credentials WHERE id = %s AND user_id = %s", (credential_id, current_user["id"]))
+        await cursor.execute("DELETE FROM credentials WHERE id = %s AND user_id = %s", (credential_id, current_user["id"]))
 
-        conn.commit()
+        await conn.commit()
         cursor.close()
-        conn.close()
+        await conn.close()
 
         # Log deletion audit
-        log_credential_audit(
+        await log_credential_audit(
             credential_id, current_user["id"], "delete",
             request=request,
             metadata={"key_name": credential[0]}
@@ -538,41 +549,41 @@ async def decrypt_credential(
 ):
     """Decrypt and return plain text secret (DANGEROUS - use carefully!)"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # Get credential
-        cursor.execute("""
+        await cursor.execute("""
             SELECT encrypted_value, key_name, category, is_active
             FROM credentials
             WHERE id = %s AND user_id = %s
         """, (credential_id, current_user["id"]))
 
-        credential = cursor.fetchone()
+        credential = await cursor.fetchone()
 
         if not credential:
-            log_credential_audit(credential_id, current_user["id"], "decrypt", success=False, error_message="Not found", request=request)
+            await log_credential_audit(credential_id, current_user["id"], "decrypt", success=False, error_message="Not found", request=request)
             raise HTTPException(status_code=404, detail="Credential not found")
 
         encrypted_value, key_name, category, is_active = credential
 
         if not is_active:
-            log_credential_audit(credential_id, current_user["id"], "decrypt", success=False, error_message="Credential inactive", request=request)
+            await log_credential_audit(credential_id, current_user["id"], "decrypt", success=False, error_message="Credential inactive", request=request)
             raise HTTPException(status_code=403, detail="Credential is inactive")
 
         # Decrypt
         secret_name = f"credentials/{current_user['id']}/{key_name}"
-        plain_value = SecretsManager.decrypt(encrypted_value, secret_name)
+        plain_value = await run_in_threadpool(SecretsManager.decrypt, encrypted_value, secret_name)
 
         # Update last_used_at
-        cursor.execute("UPDATE credentials SET last_used_at = NOW() WHERE id = %s", (credential_id,))
-        conn.commit()
+        await cursor.execute("UPDATE credentials SET last_used_at = NOW() WHERE id = %s", (credential_id,))
+        await conn.commit()
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         # Log successful decrypt
-        log_credential_audit(credential_id, current_user["id"], "decrypt", request=request)
+        await log_credential_audit(credential_id, current_user["id"], "decrypt", request=request)
 
         logger.warning(f"Credential decrypted: ID={credential_id} by user {current_user['id']}")
 
@@ -585,7 +596,7 @@ async def decrypt_credential(
     except HTTPException:
         raise
     except Exception as e:
-        log_credential_audit(credential_id, current_user["id"], "decrypt", success=False, error_message=str(e), request=request)
+        await log_credential_audit(credential_id, current_user["id"], "decrypt", success=False, error_message=str(e), request=request)
         logger.error(f"Error decrypting credential: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -597,17 +608,17 @@ async def test_credential(
 ):
     """Test credential connection"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # Get credential
-        cursor.execute("""
+        await cursor.execute("""
             SELECT encrypted_value, key_name, category, connection_info, is_active
             FROM credentials
             WHERE id = %s AND user_id = %s
         """, (credential_id, current_user["id"]))
 
-        credential = cursor.fetchone()
+        credential = await cursor.fetchone()
 
         if not credential:
             raise HTTPException(status_code=404, detail="Credential not found")
@@ -619,16 +630,18 @@ async def test_credential(
 
         # Decrypt
         secret_name = f"credentials/{current_user['id']}/{key_name}"
-        plain_value = SecretsManager.decrypt(encrypted_value, secret_name)
+        plain_value = await run_in_threadpool(SecretsManager.decrypt, encrypted_value, secret_name)
 
         # Test connection
-        test_result = SecretsManager.test_connection(category, connection_info or {}, plain_value)
+        test_result = await run_in_threadpool(
+            SecretsManager.test_connection, category, connection_info or {}, plain_value
+        )
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         # Log test attempt
-        log_credential_audit(
+        await log_credential_audit(
             credential_id, current_user["id"], "test",
             success=test_result["success"],
             error_message=test_result.get("message") if not test_result["success"] else None,
@@ -642,7 +655,7 @@ async def test_credential(
     except HTTPException:
         raise
     except Exception as e:
-        log_credential_audit(credential_id, current_user["id"], "test", success=False, error_message=str(e), request=request)
+        await log_credential_audit(credential_id, current_user["id"], "test", success=False, error_message=str(e), request=request)
         logger.error(f"Error testing credential: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -672,16 +685,16 @@ async def get_credential_audit_log(
 ):
     """Get audit log for specific credential"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # Verify ownership
-        cursor.execute("SELECT id FROM credentials WHERE id = %s AND user_id = %s", (credential_id, current_user["id"]))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT id FROM credentials WHERE id = %s AND user_id = %s", (credential_id, current_user["id"]))
+        if not await cursor.fetchone():
             raise HTTPException(status_code=404, detail="Credential not found")
 
         # Get audit log
-        cursor.execute("""
+        await cursor.execute("""
             SELECT id, action, ip_address, user_agent, success, error_message, metadata, created_at
             FROM credentials_audit_log
             WHERE credential_id = %s
@@ -689,10 +702,10 @@ async def get_credential_audit_log(
             LIMIT %s
         """, (credential_id, limit))
 
-        logs = cursor.fetchall()
+        logs = await cursor.fetchall()
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         return {
             "credential_id": credential_id,
@@ -9,6 +9,14 @@ import time
 import psutil
 import os
 
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.db_optimization import pool_monitor
+from utils.suggest import get_suggest_engine
+from utils.sync_queue import read_stats as read_sync_stats
+
 router = APIRouter()
 
 # Metrics storage
@@ -116,6 +124,68 @@ def prometheus_metrics():
     output.append(f"# TYPE kms_disk_percent gauge")
     output.append(f'kms_disk_percent {sys_metrics["disk_percent"]}')
     
+    # Database connection pool
+    pool_stats = pool_monitor.get_stats()
+    output.append(f"# HELP kms_db_pool_connections DB pool connections by state")
+    output.append(f"# TYPE kms_db_pool_connections gauge")
+    output.append(f'kms_db_pool_connections{{state="in_use"}} {pool_stats.get("active", 0)}')
+    output.append(f'kms_db_pool_connections{{state="idle"}} {pool_stats.get("idle", 0)}')
+    output.append(f'kms_db_pool_connections{{state="overflow"}} {pool_stats.get("overflow", 0)}')
+    
+    output.append(f"# HELP kms_db_pool_checkouts_total Total DB pool checkouts")
+    output.append(f"# TYPE kms_db_pool_checkouts_total counter")
+    output.append(f'kms_db_pool_checkouts_total {pool_stats.get("checkouts", 0)}')
+    
+    output.append(f"# HELP kms_db_pool_timeouts_total DB pool checkouts that timed out")
+    output.append(f"# TYPE kms_db_pool_timeouts_total counter")
+    output.append(f'kms_db_pool_timeouts_total {pool_stats.get("timeouts", 0)}')
+    
+    # Search suggestions
+    suggest_stats = get_suggest_engine().stats()
+    output.append(f"# HELP kms_suggest_requests_total Suggest requests by answering source")
+    output.append(f"# TYPE kms_suggest_requests_total counter")
+    output.append(f'kms_suggest_requests_total{{source="memory"}} {suggest_stats["memory_hits"]}')
+    output.append(f'kms_suggest_requests_total{{source="database"}} {suggest_stats["db_queries"]}')
+    output.append(f"# HELP kms_suggest_index_entries Names held in the suggest prefix index")
+    output.append(f"# TYPE kms_suggest_index_entries gauge")
+    output.append(f'kms_suggest_index_entries {suggest_stats["entries"]}')
+    
+    # Sync daemon (stats file written by kms-sync-daemon)
+    sync_stats = read_sync_stats()
+    if sync_stats:
+        queue_stats = sync_stats.get("queue", {})
+        output.append(f"# HELP kms_sync_queue_depth Paths waiting in the sync daemon event queue")
+        output.append(f"# TYPE kms_sync_queue_depth gauge")
+        output.append(f'kms_sync_queue_depth {queue_stats.get("depth", 0)}')
+        output.append(f"# HELP kms_sync_queue_lag_seconds Age of the oldest queued event")
+        output.append(f"# TYPE kms_sync_queue_lag_seconds gauge")
+        output.append(f'kms_sync_queue_lag_seconds {queue_stats.get("oldest_pending_seconds", 0)}')
+        output.append(f"# HELP kms_sync_apply_lag_seconds First event to commit for the last applied batch")
+        output.append(f"# TYPE kms_sync_apply_lag_seconds gauge")
+        output.append(f'kms_sync_apply_lag_seconds {queue_stats.get("last_apply_lag_seconds", 0)}')
+        output.append(f"# HELP kms_sync_events_total File events received, coalesced and applied")
+        output.append(f"# TYPE kms_sync_events_total counter")
+        for state, key in (("received", "events"), ("coalesced", "coalesced"), ("applied", "applied")):
+            output.append(f'kms_sync_events_total{{state="{state}"}} {queue_stats.get(key, 0)}')
+        output.append(f"# HELP kms_sync_batches_total Batches applied by the sync daemon")
+        output.append(f"# TYPE kms_sync_batches_total counter")
+        output.append(f'kms_sync_batches_total {queue_stats.get("batches", 0)}')
+        output.append(f"# HELP kms_sync_stats_age_seconds Time since the sync daemon last reported")
+        output.append(f"# TYPE kms_sync_stats_age_seconds gauge")
+        output.append(f'kms_sync_stats_age_seconds {time.time() - sync_stats.get("written_at", 0):.0f}')
+
+        # Sharded mode: supervisor reports its worker processes
+        workers = sync_stats.get("workers")
+        if workers:
+            output.append(f"# HELP kms_sync_worker_healthy Sync worker alive and reporting (1) or not (0)")
+            output.append(f"# TYPE kms_sync_worker_healthy gauge")
+            for worker in workers:
+                output.append(f'kms_sync_worker_healthy{{shard="{worker["shard"]}"}} {int(bool(worker.get("healthy")))}')
+            output.append(f"# HELP kms_sync_worker_restarts_total Sync worker restarts after a crash")
+            output.append(f"# TYPE kms_sync_worker_restarts_total counter")
+            for worker in workers:
+                output.append(f'kms_sync_worker_restarts_total{{shard="{worker["shard"]}"}} {worker.get("restarts", 0)}')
+    
     # Uptime
     output.append(f"# HELP kms_uptime_seconds Time since API started")
     output.append(f"# TYPE kms_uptime_seconds gauge")
@@ -18,11 +18,12 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from auth import (
-    get_db_connection, get_user_by_username,
+    get_async_db_connection, get_user_by_username,
     create_access_token, create_refresh_token, create_session,
     get_password_hash, get_current_user, get_current_active_user,
-    get_current_superuser
+    get_current_superuser, verify_token, invalidate_session
 )
+from database import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -57,7 +58,7 @@ async def create_oauth2_client(
     current_user: Dict[str, Any] = Depends(get_current_superuser)
 ):
     """Create a new OAuth2 client application"""
-    conn = get_db_connection()
+    conn = await get_async_db_connection()
     try:
         cur = conn.cursor()
 
@@ -70,7 +71,7 @@ async def create_oauth2_client(
         scopes = client_data.scopes or ["read", "write"]
 
         # Insert into api_keys table (reusing existing structure)
-        cur.execute("""
+        await cur.execute("""
             INSERT INTO api_keys (user_id, key_name, key_hash, permissions, is_active)
             VALUES (%s, %s, %s, %s, %s)
             RETURNING id, created_at
@@ -87,16 +88,16 @@ async def create_oauth2_client(
             True
         ))
 
-        result = cur.fetchone()
-        conn.commit()
+        result = await cur.fetchone()
+        await conn.commit()
 
         # Store client_id mapping (in production, use Redis or separate table)
-        cur.execute("""
+        await cur.execute("""
             UPDATE api_keys
             SET permissions = jsonb_set(permissions, '{client_id}', %s::jsonb)
             WHERE id = %s
         """, (f'"{client_id}"', result[0]))
-        conn.commit()
+        await conn.commit()
         cur.close()
 
         return OAuth2ClientResponse(
@@ -109,17 +110,17 @@ async def create_oauth2_client(
             created_at=result[1].isoformat()
         )
     finally:
-        conn.close()
+        await conn.close()
 
 @router.get("/clients")
 async def list_oauth2_clients(
     current_user: Dict[str, Any] = Depends(get_current_superuser)
 ):
     """List all OAuth2 clients"""
-    conn = get_db_connection()
+    conn = await get_async_db_connection()
     try:
         cur = conn.cursor()
-        cur.execute("""
+        await cur.execute("""
             SELECT id, key_name, permissions, created_at, is_active
             FROM api_keys
             WHERE user_id = %s AND permissions->>'type' = 'oauth2_client'
@@ -127,7 +128,7 @@ async def list_oauth2_clients(
         """, (current_user["id"],))
 
         clients = []
-        for row in cur.fetchall():
+        for row in await cur.fetchall():
             perms = row[2] if isinstance(row[2], dict) else {}
             clients.append({
                 "id": row[0],
@@ -142,7 +143,7 @@ async def list_oauth2_clients(
         cur.close()
         return {"clients": clients}
     finally:
-        conn.close()
+        await conn.close()
 
 # ============================================================================
 # OAuth2 Authorization Flow
@@ -166,16 +167,16 @@ async def oauth2_authorize(
         return RedirectResponse(url=login_url)
 
     # Verify client
-    conn = get_db_connection()
+    conn = await get_async_db_connection()
     try:
         cur = conn.cursor()
-        cur.execute("""
+        await cur.execute("""
             SELECT permissions, is_active
             FROM api_keys
             WHERE permissions->>'client_id' = %s AND is_active = true
         """, (client_id,))
 
-        client = cur.fetchone()
+        client = await cur.fetchone()
         if not client:
             raise HTTPException(status_code=400, detail="Invalid client_id")
 
@@ -187,7 +188,6 @@ async def oauth2_authorize(
 
         # Get current user from token
         token = auth_header.split(" ")[1]
-        from ..auth import verify_token
         payload = verify_token(token, "access")
         if not payload:
             return RedirectResponse(url="/login.html")
@@ -200,7 +200,7 @@ async def oauth2_authorize(
         code_expires = datetime.utcnow() + timedelta(minutes=AUTHORIZATION_CODE_EXPIRE_MINUTES)
 
         # Store authorization code (in production, use Redis)
-        cur.execute("""
+        await cur.execute("""
             INSERT INTO sessions (user_id, token_hash, expires_at, is_active)
             VALUES (%s, %s, %s, %s)
         """, (
@@ -209,7 +209,7 @@ async def oauth2_authorize(
             code_expires,
             True
         ))
-        conn.commit()
+        await conn.commit()
         cur.close()
 
         # Build redirect URL with authorization code
@@ -221,7 +221,7 @@ async def oauth2_authorize(
         return RedirectResponse(url=redirect_url)
 
     finally:
-        conn.close()
+        await conn.close()
 
 @router.post("/token")
 async def oauth2_token(
@@ -239,18 +239,18 @@ async def oauth2_token(
         raise HTTPException(status_code=400, detail="Missing authorization code")
 
     # Verify client
-    conn = get_db_connection()
+    conn = await get_async_db_connection()
     try:
         cur = conn.cursor()
         client_secret_hash = hashlib.sha256(client_secret.encode()).hexdigest()
 
-        cur.execute("""
+        await cur.execute("""
             SELECT id, permissions, is_active
             FROM api_keys
             WHERE permissions->>'client_id' = %s AND is_active = true
         """, (client_id,))
 
-        client = cur.fetchone()
+        client = await cur.fetchone()
         if not client:
             raise HTTPException(status_code=401, detail="Invalid client credentials")
 
@@ -260,36 +260,36 @@ async def oauth2_token(
         # Verify client_secret (compare hash)
         if stored_secret_hash != client_secret_hash:
             # Store hash if not exists
-            cur.execute("""
+            await cur.execute("""
                 UPDATE api_keys
                 SET permissions = jsonb_set(permissions, '{client_secret_hash}', %s::jsonb)
                 WHERE id = %s
             """, (f'"{client_secret_hash}"', client[0]))
-            conn.commit()
+            await conn.commit()
 
         # Verify authorization code
         code_hash = hashlib.sha256(code.encode()).hexdigest()
-        cur.execute("""
+        await cur.execute("""
             SELECT user_id, expires_at
             FROM sessions
             WHERE token_hash = %s AND is_active = true AND expires_at > NOW()
         """, (code_hash,))
 
-        session = cur.fetchone()
+        session = await cur.fetchone()
         if not session:
             raise HTTPException(status_code=400, detail="Invalid or expired authorization code")
 
         user_id = session[0]
 
         # Get user info
-        cur.execute("SELECT username, email FROM users WHERE id = %s", (user_id,))
-        user = cur.fetchone()
+        await cur.execute("SELECT username, email FROM users WHERE id = %s", (user_id,))
+        user = await cur.fetchone()
         if not user:
             raise HTTPException(status_code=400, detail="User not found")
 
         # Invalidate authorization code
-        cur.execute("UPDATE sessions SET is_active = false WHERE token_hash = %s", (code_hash,))
-        conn.commit()
+        await cur.execute("UPDATE sessions SET is_active = false WHERE token_hash = %s", (code_hash,))
+        await conn.commit()
 
         # Create access token
         access_token = create_access_token(
@@ -300,7 +300,7 @@ async def oauth2_token(
         )
 
         # Create session for OAuth2 token
-        create_session(user_id, access_token, refresh_token, None, None)
+        await run_db(create_session, user_id, access_token, refresh_token, None, None)
 
         cur.close()
 
@@ -313,7 +313,7 @@ async def oauth2_token(
         }
 
     finally:
-        conn.close()
+        await conn.close()
 
 @router.get("/userinfo")
 async def oauth2_userinfo(
@@ -335,20 +335,21 @@ async def oauth2_revoke(
     current_user: Dict[str, Any] = Depends(get_current_active_user)
 ):
     """Revoke OAuth2 token"""
-    conn = get_db_connection()
+    conn = await get_async_db_connection()
     try:
         cur = conn.cursor()
         token_hash = hashlib.sha256(token.encode()).hexdigest()
 
-        cur.execute("""
+        await cur.execute("""
             UPDATE sessions
             SET is_active = false
             WHERE token_hash = %s AND user_id = %s
         """, (token_hash, current_user["id"]))
 
-        conn.commit()
+        await conn.commit()
         cur.close()
+        invalidate_session(token_hash)
 
         return {"status": "revoked"}
     finally:
-        conn.close()
+        await conn.close()
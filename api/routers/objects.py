@@ -2,7 +2,8 @@
 Objects API Router
 """
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 import json
 
 import sys
@@ -11,11 +12,76 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from models import Object, ObjectFull, ObjectCreate, ObjectUpdate, MessageResponse
 from database import get_db_cursor
+from utils.cache import cached
+from utils.conditional import check_conditional, fingerprint_validators, list_fingerprint, make_etag
+from utils.read_cache import READ_CACHE_TTL, invalidates
 
 router = APIRouter(prefix="/objects", tags=["objects"])
 
+# Aggregate fingerprint for list_objects: the rows also carry category,
+# subcategory and tag names, so their changes must move the validator too
+OBJECTS_FINGERPRINT_SQL = """
+    SELECT count(DISTINCT o.id) AS n,
+           GREATEST(max(o.updated_at), max(c.updated_at), max(sc.updated_at)) AS last_modified,
+           count(ot.tag_id) AS tag_links,
+           COALESCE(sum(ot.tag_id), 0) AS tag_sum
+    FROM objects o
+    JOIN categories c ON o.category_id = c.id
+    LEFT JOIN subcategories sc ON o.subcategory_id = sc.id
+    LEFT JOIN object_tags ot ON ot.object_id = o.id
+"""
+
+
+def _object_etag(request: Request, obj) -> str:
+    return make_etag(request, obj["id"], obj["updated_at"], obj.get("category_name"),
+                     obj.get("subcategory_name"), obj.get("tags"))
+
+
+def _object_filters(category_id: Optional[int], subcategory_id: Optional[int], status: Optional[str]):
+    conditions = []
+    params = []
+
+    if category_id:
+        conditions.append("category_id = %s")
+        params.append(category_id)
+
+    if subcategory_id:
+        conditions.append("subcategory_id = %s")
+        params.append(subcategory_id)
+
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+
+    return conditions, params
+
+
+@cached(prefix="objects", ttl=READ_CACHE_TTL)
+def _object_list_fingerprint(category_id: Optional[int], subcategory_id: Optional[int], status: Optional[str]):
+    conditions, params = _object_filters(category_id, subcategory_id, status)
+    with get_db_cursor() as (cur, conn):
+        return list_fingerprint(
+            cur,
+            OBJECTS_FINGERPRINT_SQL + " WHERE 1=1" + "".join(f" AND o.{c}" for c in conditions),
+            params
+        )
+
+
+@cached(prefix="objects", ttl=READ_CACHE_TTL)
+def _object_list(category_id: Optional[int], subcategory_id: Optional[int], status: Optional[str],
+                 skip: int, limit: int):
+    conditions, params = _object_filters(category_id, subcategory_id, status)
+    with get_db_cursor() as (cur, conn):
+        query = "SELECT * FROM v_objects_full WHERE 1=1" + "".join(f" AND {c}" for c in conditions)
+        query += " ORDER BY category_name, subcategory_name, object_name LIMIT %s OFFSET %s"
+        cur.execute(query, params + [limit, skip])
+        return jsonable_encoder(cur.fetchall())
+
+
 @router.get("/", response_model=List[ObjectFull])
 def list_objects(
+    request: Request,
+    response: Response,
     category_id: Optional[int] = None,
     subcategory_id: Optional[int] = None,
     status: Optional[str] = Query(None, pattern="^(draft|active|archived)$"),
@@ -23,32 +89,14 @@ def list_objects(
     limit: int = 100
 ):
     """List all objects with full hierarchy"""
-    with get_db_cursor() as (cur, conn):
-        query = "SELECT * FROM v_objects_full WHERE 1=1"
-        params = []
-
-        if category_id:
-            query += " AND category_id = %s"
-            params.append(category_id)
-
-        if subcategory_id:
-            query += " AND subcategory_id = %s"
-            params.append(subcategory_id)
-
-        if status:
-            query += " AND status = %s"
-            params.append(status)
-
-        query += " ORDER BY category_name, subcategory_name, object_name LIMIT %s OFFSET %s"
-        params.extend([limit, skip])
+    etag, last_modified = fingerprint_validators(
+        request, _object_list_fingerprint(category_id, subcategory_id, status))
+    check_conditional(request, response, etag, last_modified)
 
-        cur.execute(query, params)
-        objects = cur.fetchall()
-
-        return objects
+    return _object_list(category_id, subcategory_id, status, skip, limit)
 
 @router.get("/{object_id}", response_model=ObjectFull)
-def get_object(object_id: int):
+def get_object(object_id: int, request: Request, response: Response):
     """Get a specific object with full hierarchy"""
     with get_db_cursor() as (cur, conn):
         cur.execute("SELECT * FROM v_objects_full WHERE id = %s", (object_id,))
@@ -57,6 +105,8 @@ def get_object(object_id: int):
         if not obj:
             raise HTTPException(status_code=404, detail="Object not found")
 
+        check_conditional(request, response, _object_etag(request, obj), obj["updated_at"])
+
         # Ensure metadata is a dict (RealDictCursor should handle JSONB, but ensure it's parsed)
         if obj.get('metadata') and isinstance(obj['metadata'], str):
             import json
@@ -70,7 +120,7 @@ def get_object(object_id: int):
         return obj
 
 @router.get("/uuid/{uuid}", response_model=ObjectFull)
-def get_object_by_uuid(uuid: str):
+def get_object_by_uuid(uuid: str, request: Request, response: Response):
     """Get object by UUID"""
     with get_db_cursor() as (cur, conn):
         cur.execute("SELECT * FROM v_objects_full WHERE uuid = %s", (uuid,))
@@ -79,9 +129,12 @@ def get_object_by_uuid(uuid: str):
         if not obj:
             raise HTTPException(status_code=404, detail="Object not found")
 
+        check_conditional(request, response, _object_etag(request, obj), obj["updated_at"])
+
         return obj
 
 @router.post("/", response_model=Object, status_code=201)
+@invalidates("objects")
 def create_object(obj: ObjectCreate):
     """Create a new object"""
     with get_db_cursor() as (cur, conn):
@@ -113,6 +166,7 @@ def create_object(obj: ObjectCreate):
             raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{object_id}", response_model=Object)
+@invalidates("objects")
 def update_object(object_id: int, obj: ObjectUpdate):
     """Update an object"""
     with get_db_cursor() as (cur, conn):
@@ -167,6 +221,7 @@ def update_object(object_id: int, obj: ObjectUpdate):
             raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{object_id}", response_model=MessageResponse)
+@invalidates("objects")
 def delete_object(object_id: int):
     """Delete an object"""
     with get_db_cursor() as (cur, conn):
@@ -190,6 +245,7 @@ def delete_object(object_id: int):
             raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{object_id}/spec")
+@invalidates("objects")
 def update_object_spec(object_id: int, spec_data: dict):
     """Update object specification"""
     specification = spec_data.get('specification', '')
@@ -243,6 +299,7 @@ def get_object_spec(object_id: int):
 
 
 @router.put("/{object_id}/phases")
+@invalidates("objects")
 def update_object_phases(object_id: int, phases_data: dict):
     """Update object phases and tasks"""
     phases = phases_data.get('phases', [])
@@ -324,16 +381,32 @@ def get_object_phases(object_id: int):
 
 
 @router.get("/{object_id}/documents")
-def get_object_documents(object_id: int):
+def get_object_documents(object_id: int, request: Request, response: Response):
     """Get all documents for an object"""
     with get_db_cursor() as (cur, conn):
-        # Check if object exists
-        cur.execute("SELECT * FROM objects WHERE id = %s", (object_id,))
+        # Object name plus the documents fingerprint in one round trip
+        cur.execute("""
+            SELECT o.name, o.updated_at,
+                   (SELECT count(*) FROM documents WHERE object_id = o.id) AS document_count,
+                   (SELECT max(updated_at) FROM documents WHERE object_id = o.id) AS documents_updated_at
+            FROM objects o
+            WHERE o.id = %s
+        """, (object_id,))
         obj = cur.fetchone()
 
         if not obj:
             raise HTTPException(status_code=404, detail="Object not found")
 
+        last_modified = max(
+            (value for value in (obj["updated_at"], obj["documents_updated_at"]) if value is not None),
+            default=None
+        )
+        check_conditional(
+            request, response,
+            make_etag(request, obj["name"], obj["updated_at"], obj["document_count"], obj["documents_updated_at"]),
+            last_modified
+        )
+
         # Get documents
         cur.execute("""
             SELECT id, folder, filename, content_type, size_bytes, version, created_at, updated_at
@@ -13,7 +13,7 @@ from datetime import datetime
 from psycopg2.extras import RealDictCursor, Json
 import logging
 
-from database import get_db_connection
+from database import get_async_db_connection
 from auth import get_current_active_user
 
 router = APIRouter(prefix="/resources", tags=["resources"])
@@ -113,7 +113,7 @@ async def list_resources(
 ):
     """List all system resources with optional filters"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         query = "SELECT * FROM system_resources WHERE 1=1"
@@ -137,11 +137,11 @@ async def list_resources(
 
         query += " ORDER BY resource_type, resource_name"
 
-        cursor.execute(query, params)
-        resources = cursor.fetchall()
+        await cursor.execute(query, params)
+        resources = await cursor.fetchall()
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         return [dict(r) for r in resources]
 
@@ -157,19 +157,19 @@ async def get_conflicts(
 ):
     """Get list of resource conflicts"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # First, detect any new conflicts
-        cursor.execute("SELECT detect_and_log_conflicts() as new_conflicts")
-        new_conflicts = cursor.fetchone()['new_conflicts']
+        await cursor.execute("SELECT detect_and_log_conflicts() as new_conflicts")
+        new_conflicts = (await cursor.fetchone())['new_conflicts']
         
         if new_conflicts > 0:
             logger.info(f"Detected {new_conflicts} new conflicts")
 
         # Get conflicts from view
         if include_resolved:
-            cursor.execute("""
+            await cursor.execute("""
                 SELECT 
                     c.id as conflict_id,
                     c.conflict_type,
@@ -203,12 +203,12 @@ async def get_conflicts(
                     c.detected_at DESC
             """)
         else:
-            cursor.execute("SELECT * FROM v_resource_conflicts")
+            await cursor.execute("SELECT * FROM v_resource_conflicts")
 
-        conflicts = cursor.fetchall()
+        conflicts = await cursor.fetchall()
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         return [dict(c) for c in conflicts]
 
@@ -223,12 +223,12 @@ async def get_summary(
 ):
     """Get resource allocation summary"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # Get summary by resource type
         # Note: resource_status enum values: 'active', 'reserved', 'deprecated', 'available', 'conflict'
-        cursor.execute("""
+        await cursor.execute("""
             SELECT
                 resource_type,
                 COUNT(*) as count,
@@ -241,10 +241,10 @@ async def get_summary(
             GROUP BY resource_type
             ORDER BY resource_type
         """)
-        summary = cursor.fetchall()
+        summary = await cursor.fetchall()
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         return [dict(s) for s in summary]
 
@@ -260,17 +260,17 @@ async def get_resource(
 ):
     """Get specific resource by ID"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
-        cursor.execute(
+        await cursor.execute(
             "SELECT * FROM system_resources WHERE id = %s",
             (resource_id,)
         )
-        resource = cursor.fetchone()
+        resource = await cursor.fetchone()
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         if not resource:
             raise HTTPException(status_code=404, detail="Resource not found")
@@ -296,11 +296,11 @@ async def create_resource(
     Checks for conflicts before creating
     """
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # Check if resource is already allocated
-        cursor.execute("""
+        await cursor.execute("""
             SELECT id, resource_name, owner_service
             FROM system_resources
             WHERE resource_type = %s
@@ -309,7 +309,7 @@ async def create_resource(
             AND status IN ('active', 'reserved')
         """, (resource.resource_type, resource.resource_value, resource.environment))
 
-        existing = cursor.fetchone()
+        existing = await cursor.fetchone()
         if existing:
             raise HTTPException(
                 status_code=409,
@@ -322,7 +322,7 @@ async def create_resource(
             resource.server_hostname = socket.gethostname()
 
         # Insert new resource
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO system_resources (
                 resource_type, resource_name, resource_value,
                 owner_user_id, owner_service, assigned_to,
@@ -338,19 +338,19 @@ async def create_resource(
             resource.server_hostname, resource.min_value, resource.max_value, resource.expires_at
         ))
 
-        new_resource = cursor.fetchone()
+        new_resource = await cursor.fetchone()
 
         # Log allocation
         ip_address = request.client.host if request else None
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO resource_allocation_history (
                 resource_id, action, new_status, changed_by, ip_address
             ) VALUES (%s, 'allocated', 'active', %s, %s)
         """, (new_resource['id'], current_user["id"], ip_address))
 
-        conn.commit()
+        await conn.commit()
         cursor.close()
-        conn.close()
+        await conn.close()
 
         logger.info(f"Resource allocated: {resource.resource_type} {resource.resource_value} by {current_user['username']}")
 
@@ -371,12 +371,12 @@ async def update_resource(
 ):
     """Update resource details (not the value itself)"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # Get current resource
-        cursor.execute("SELECT * FROM system_resources WHERE id = %s", (resource_id,))
-        resource = cursor.fetchone()
+        await cursor.execute("SELECT * FROM system_resources WHERE id = %s", (resource_id,))
+        resource = await cursor.fetchone()
 
         if not resource:
             raise HTTPException(status_code=404, detail="Resource not found")
@@ -418,25 +418,25 @@ async def update_resource(
 
         update_values.append(resource_id)
 
-        cursor.execute(f"""
+        await cursor.execute(f"""
             UPDATE system_resources
             SET {', '.join(update_fields)}
             WHERE id = %s
             RETURNING *
         """, update_values)
 
-        updated_resource = cursor.fetchone()
+        updated_resource = await cursor.fetchone()
 
         # Log update
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO resource_allocation_history (
                 resource_id, action, changed_by
             ) VALUES (%s, 'modified', %s)
         """, (resource_id, current_user["id"]))
 
-        conn.commit()
+        await conn.commit()
         cursor.close()
-        conn.close()
+        await conn.close()
 
         return dict(updated_resource)
 
@@ -454,12 +454,12 @@ async def release_resource(
 ):
     """Release a resource (soft delete - marks as released)"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # Get resource
-        cursor.execute("SELECT * FROM system_resources WHERE id = %s", (resource_id,))
-        resource = cursor.fetchone()
+        await cursor.execute("SELECT * FROM system_resources WHERE id = %s", (resource_id,))
+        resource = await cursor.fetchone()
 
         if not resource:
             raise HTTPException(status_code=404, detail="Resource not found")
@@ -469,22 +469,22 @@ async def release_resource(
             raise HTTPException(status_code=403, detail="Resource is locked and cannot be released")
 
         # Mark as deprecated (released)
-        cursor.execute("""
+        await cursor.execute("""
             UPDATE system_resources
             SET status = 'deprecated', released_at = NOW()
             WHERE id = %s
         """, (resource_id,))
 
         # Log release
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO resource_allocation_history (
                 resource_id, action, old_status, new_status, changed_by
             ) VALUES (%s, 'released', %s, 'deprecated', %s)
         """, (resource_id, resource['status'], current_user["id"]))
 
-        conn.commit()
+        await conn.commit()
         cursor.close()
-        conn.close()
+        await conn.close()
 
         logger.info(f"Resource released: {resource['resource_type']} {resource['resource_value']}")
 
@@ -508,18 +508,18 @@ async def check_availability(
 ):
     """Check if a resource value is available with detailed conflict info"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # Use the database function for comprehensive check
-        cursor.execute("""
+        await cursor.execute("""
             SELECT * FROM check_resource_conflict(%s::resource_type, %s, %s)
         """, (check.resource_type, check.resource_value, check.environment))
 
-        result = cursor.fetchone()
+        result = await cursor.fetchone()
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         if result and result['has_conflict']:
             return {
@@ -557,10 +557,10 @@ async def resolve_conflict(
 ):
     """Mark a conflict as resolved"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
-        cursor.execute("""
+        await cursor.execute("""
             UPDATE resource_conflicts
             SET resolved_at = NOW(),
                 resolved_by = %s,
@@ -569,14 +569,14 @@ async def resolve_conflict(
             RETURNING *
         """, (current_user["id"], resolution_notes, conflict_id))
 
-        conflict = cursor.fetchone()
+        conflict = await cursor.fetchone()
 
         if not conflict:
             raise HTTPException(status_code=404, detail="Conflict not found")
 
-        conn.commit()
+        await conn.commit()
         cursor.close()
-        conn.close()
+        await conn.close()
 
         logger.info(f"Conflict {conflict_id} resolved by {current_user['username']}")
 
@@ -595,15 +595,15 @@ async def detect_conflicts(
 ):
     """Manually trigger conflict detection scan"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
-        cursor.execute("SELECT detect_and_log_conflicts() as new_conflicts")
-        result = cursor.fetchone()
+        await cursor.execute("SELECT detect_and_log_conflicts() as new_conflicts")
+        result = await cursor.fetchone()
 
-        conn.commit()
+        await conn.commit()
         cursor.close()
-        conn.close()
+        await conn.close()
 
         return {
             "new_conflicts_detected": result['new_conflicts'],
@@ -625,11 +625,11 @@ async def find_available_ports(
         if request.start_port >= request.end_port:
             raise HTTPException(status_code=400, detail="start_port must be less than end_port")
 
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
         # Get all allocated ports
-        cursor.execute("""
+        await cursor.execute("""
             SELECT resource_value
             FROM system_resources
             WHERE resource_type = 'port'
@@ -637,10 +637,10 @@ async def find_available_ports(
             AND status IN ('active', 'reserved')
         """, (request.environment,))
 
-        allocated_ports = {int(row['resource_value']) for row in cursor.fetchall()}
+        allocated_ports = {int(row['resource_value']) for row in (await cursor.fetchall())}
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         # Find available ports
         available_ports = []
@@ -678,10 +678,10 @@ async def get_resource_history(
 ):
     """Get allocation history for a resource"""
     try:
-        conn = get_db_connection()
+        conn = await get_async_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
-        cursor.execute("""
+        await cursor.execute("""
             SELECT
                 rh.*,
                 u.username as changed_by_username
@@ -691,10 +691,10 @@ async def get_resource_history(
             ORDER BY rh.created_at DESC
         """, (resource_id,))
 
-        history = cursor.fetchall()
+        history = await cursor.fetchall()
 
         cursor.close()
-        conn.close()
+        await conn.close()
 
         return [dict(h) for h in history]
 
@@ -1,15 +1,19 @@
 """
 Search API Router
 """
-from typing import List
-from fastapi import APIRouter, Query
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
 
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from models import SearchResult
+from models import SearchResult, SearchPage
 from database import get_db_cursor
+from utils.suggest import get_suggest_engine
+from utils.search_query import (
+    build_search_page_query, parse_search_page, render_snippet, InvalidCursor
+)
 
 router = APIRouter(prefix="/search", tags=["search"])
 
@@ -31,6 +35,44 @@ def search_documents(
 
         return results
 
+@router.get("/v2", response_model=SearchPage)
+def search_documents_v2(
+    q: str = Query(..., min_length=1, description="Search query"),
+    limit: int = Query(20, ge=1, le=100, description="Results per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    category: Optional[str] = Query(None, description="Category slug"),
+    subcategory: Optional[str] = Query(None, description="Subcategory slug"),
+    folder: Optional[str] = Query(None),
+    content_type: Optional[str] = Query(None),
+    facets: bool = Query(True, description="Include facet counts"),
+    mode: str = Query("document", pattern="^(document|chunk)$",
+                      description="document: rank whole files, chunk: return matching sections with offsets")
+):
+    """Search page with highlighted snippets, facet counts and keyset pagination"""
+    filters = {
+        "category": category,
+        "subcategory": subcategory,
+        "folder": folder,
+        "content_type": content_type,
+    }
+    try:
+        query, params = build_search_page_query(q, limit, cursor, filters,
+                                                with_facets=facets, mode=mode)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    with get_db_cursor() as (cur, conn):
+        cur.execute(query, params)
+        page = parse_search_page(cur.fetchone())
+
+    for hit in page["results"]:
+        hit["snippet"] = render_snippet(hit["snippet"])
+        if mode == "document":
+            for key in ("chunk_no", "heading", "start_offset", "end_offset"):
+                hit[key] = None
+
+    return {"query": q, "mode": mode, **page}
+
 @router.get("/by-category/{category_slug}")
 def search_by_category(
     category_slug: str,
@@ -45,19 +87,16 @@ def search_by_category(
                 o.name as object_name,
                 d.folder,
                 d.filename,
-                ts_rank(
-                    to_tsvector('english', COALESCE(d.content, '') || ' ' || d.filename),
-                    plainto_tsquery('english', %s)
-                ) as rank
+                ts_rank(d.search_vector, query) as rank
             FROM documents d
             JOIN objects o ON d.object_id = o.id
-            JOIN categories c ON o.category_id = c.id
+            JOIN categories c ON o.category_id = c.id,
+                 plainto_tsquery('english', %s) AS query
             WHERE c.slug = %s
-              AND to_tsvector('english', COALESCE(d.content, '') || ' ' || d.filename)
-                  @@ plainto_tsquery('english', %s)
+              AND d.search_vector @@ query
             ORDER BY rank DESC
             LIMIT %s
-        """, (q, category_slug, q, limit))
+        """, (q, category_slug, limit))
 
         results = cur.fetchall()
 
@@ -74,41 +113,21 @@ def search_suggestions(
     limit: int = Query(10, ge=1, le=50)
 ):
     """Get search suggestions based on object and document names"""
-    with get_db_cursor() as (cur, conn):
-        # Search in object names
-        cur.execute("""
-            SELECT DISTINCT
-                'object' as type,
-                o.id,
-                o.name as title,
-                c.name as category
-            FROM objects o
-            JOIN categories c ON o.category_id = c.id
-            WHERE o.name ILIKE %s
-            LIMIT %s
-        """, (f"%{q}%", limit))
+    results, source = get_suggest_engine().suggest(q.strip() or q, limit)
 
-        object_results = cur.fetchall()
-
-        # Search in document filenames
-        cur.execute("""
-            SELECT DISTINCT
-                'document' as type,
-                d.id,
-                d.filename as title,
-                o.name as object_name
-            FROM documents d
-            JOIN objects o ON d.object_id = o.id
-            WHERE d.filename ILIKE %s
-            LIMIT %s
-        """, (f"%{q}%", limit))
-
-        document_results = cur.fetchall()
-
-        return {
-            "query": q,
-            "suggestions": {
-                "objects": object_results,
-                "documents": document_results
-            }
+    return {
+        "query": q,
+        "source": source,
+        "suggestions": {
+            "objects": [
+                {"type": "object", "id": s["id"], "title": s["title"],
+                 "category": s["context"], "score": s["score"]}
+                for s in results["object"]
+            ],
+            "documents": [
+                {"type": "document", "id": s["id"], "title": s["title"],
+                 "object_name": s["context"], "score": s["score"]}
+                for s in results["document"]
+            ]
         }
+    }
@@ -2,7 +2,8 @@
 Subcategories API Router
 """
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 import json
 import os
 
@@ -12,42 +13,69 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from models import Subcategory, SubcategoryCreate, SubcategoryUpdate, MessageResponse
 from database import get_db_cursor
+from utils.cache import cached
+from utils.conditional import check_conditional, fingerprint_validators, list_fingerprint, make_etag
+from utils.read_cache import READ_CACHE_TTL, invalidates
 
 router = APIRouter(prefix="/subcategories", tags=["subcategories"])
 
 # Base path for subcategory folders
 SUBCATEGORY_BASE_PATH = "/opt/kms"
 
+
+def _subcategory_filters(category_id: Optional[int], is_active: Optional[bool]):
+    where = "WHERE 1=1"
+    params = []
+
+    if category_id:
+        where += " AND category_id = %s"
+        params.append(category_id)
+
+    if is_active is not None:
+        where += " AND is_active = %s"
+        params.append(is_active)
+
+    return where, params
+
+
+@cached(prefix="subcategories", ttl=READ_CACHE_TTL)
+def _subcategory_list_fingerprint(category_id: Optional[int], is_active: Optional[bool]):
+    where, params = _subcategory_filters(category_id, is_active)
+    with get_db_cursor() as (cur, conn):
+        return list_fingerprint(
+            cur,
+            f"SELECT count(*) AS n, max(updated_at) AS last_modified FROM subcategories {where}",
+            params
+        )
+
+
+@cached(prefix="subcategories", ttl=READ_CACHE_TTL)
+def _subcategory_list(category_id: Optional[int], is_active: Optional[bool], skip: int, limit: int):
+    where, params = _subcategory_filters(category_id, is_active)
+    with get_db_cursor() as (cur, conn):
+        query = f"SELECT * FROM subcategories {where} ORDER BY sort_order, name LIMIT %s OFFSET %s"
+        cur.execute(query, params + [limit, skip])
+        return jsonable_encoder(cur.fetchall())
+
+
 @router.get("/", response_model=List[Subcategory])
 def list_subcategories(
+    request: Request,
+    response: Response,
     category_id: Optional[int] = Query(None),
     is_active: Optional[bool] = None,
     skip: int = 0,
     limit: int = 100
 ):
     """List all subcategories"""
-    with get_db_cursor() as (cur, conn):
-        query = "SELECT * FROM subcategories WHERE 1=1"
-        params = []
-
-        if category_id:
-            query += " AND category_id = %s"
-            params.append(category_id)
+    etag, last_modified = fingerprint_validators(
+        request, _subcategory_list_fingerprint(category_id, is_active))
+    check_conditional(request, response, etag, last_modified)
 
-        if is_active is not None:
-            query += " AND is_active = %s"
-            params.append(is_active)
-
-        query += " ORDER BY sort_order, name LIMIT %s OFFSET %s"
-        params.extend([limit, skip])
-
-        cur.execute(query, params)
-        subcategories = cur.fetchall()
-
-        return subcategories
+    return _subcategory_list(category_id, is_active, skip, limit)
 
 @router.get("/{subcategory_id}", response_model=Subcategory)
-def get_subcategory(subcategory_id: int):
+def get_subcategory(subcategory_id: int, request: Request, response: Response):
     """Get a specific subcategory"""
     with get_db_cursor() as (cur, conn):
         cur.execute("SELECT * FROM subcategories WHERE id = %s", (subcategory_id,))
@@ -56,9 +84,14 @@ def get_subcategory(subcategory_id: int):
         if not subcategory:
             raise HTTPException(status_code=404, detail="Subcategory not found")
 
+        check_conditional(request, response,
+                          make_etag(request, subcategory["id"], subcategory["updated_at"]),
+                          subcategory["updated_at"])
+
         return subcategory
 
 @router.post("/", response_model=Subcategory, status_code=201)
+@invalidates("subcategories")
 def create_subcategory(subcategory: SubcategoryCreate):
     """Create a new subcategory"""
     with get_db_cursor() as (cur, conn):
@@ -111,6 +144,7 @@ def create_subcategory(subcategory: SubcategoryCreate):
             raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{subcategory_id}", response_model=Subcategory)
+@invalidates("subcategories")
 def update_subcategory(subcategory_id: int, subcategory: SubcategoryUpdate):
     """Update a subcategory"""
     with get_db_cursor() as (cur, conn):
@@ -181,6 +215,7 @@ def update_subcategory(subcategory_id: int, subcategory: SubcategoryUpdate):
             raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{subcategory_id}", response_model=MessageResponse)
+@invalidates("subcategories")
 def delete_subcategory(subcategory_id: int):
     """Delete a subcategory"""
     with get_db_cursor() as (cur, conn):
@@ -3,6 +3,7 @@ System API Router - Changelog, Sync Status, Stats
 """
 from typing import List, Optional
 from fastapi import APIRouter, Query
+from fastapi.encoders import jsonable_encoder
 
 import sys
 from pathlib import Path
@@ -10,6 +11,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from models import ChangeLog, SyncStatus
 from database import get_db_cursor
+from utils.cache import cached
+from utils.read_cache import STATS_CACHE_TTL
 
 router = APIRouter(prefix="/system", tags=["system"])
 
@@ -65,6 +68,10 @@ def get_sync_status(
 @router.get("/stats")
 def get_system_stats():
     """Get system statistics"""
+    return _system_stats()
+
+@cached(prefix="stats", ttl=STATS_CACHE_TTL)
+def _system_stats():
     with get_db_cursor() as (cur, conn):
         stats = {}
 
@@ -114,7 +121,7 @@ def get_system_stats():
         """)
         stats['sync_status_summary'] = dict(cur.fetchall())
 
-        return stats
+        return jsonable_encoder(stats)
 
 @router.get("/health")
 def health_check():
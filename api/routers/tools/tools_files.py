@@ -2,8 +2,8 @@
 KMS Tools - File browser and file operations endpoints
 """
 
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import FileResponse, Response
+from fastapi import APIRouter, HTTPException, Query, Request
+from email.utils import formatdate
 from pathlib import Path
 import os
 import subprocess
@@ -15,6 +15,7 @@ from .tools_base import (
     get_object_path, get_full_path,
     check_port_open, check_url_accessible
 )
+from utils.streaming import ranged_response, iter_file_range
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -200,14 +201,32 @@ def list_files(
         raise HTTPException(status_code=500, detail=f"Error listing files: {str(e)}")
 
 
+def _sudo_file_range(full_path: Path, start: int, end: int):
+    """Stream bytes start..end of a file only root can read, via sudo tail"""
+    proc = subprocess.Popen(
+        ['sudo', 'tail', '-c', f'+{start + 1}', str(full_path)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        yield from iter_file_range(proc.stdout, 0, end - start)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+
 @router.get("/files/download")
 def download_file(
+    request: Request,
     path: str = Query(..., description="Path to file to download"),
     allow_any: bool = Query(False, description="Allow any path (not just /opt/kms)"),
     use_sudo: bool = Query(False, description="Use sudo for file operations")
 ):
     """
     Download or read a file from the server
+
+    The file is streamed in chunks; Range requests get 206 partial content.
     """
     try:
         logger.debug(f"Downloading file: {path}, allow_any: {allow_any}, use_sudo: {use_sudo}")
@@ -244,38 +263,37 @@ def download_file(
         # Check if it's a text file
         text_extensions = {'.txt', '.json', '.xml', '.html', '.css', '.js', '.py', '.md', '.yml', '.yaml', '.sh', '.sql', '.log', '.conf', '.ini', '.env', '.gitignore', '.dockerfile', '.dockerignore'}
         is_text_file = full_path.suffix.lower() in text_extensions or mime_type.startswith('text/')
+        if is_text_file and mime_type == 'application/octet-stream':
+            mime_type = 'text/plain'
 
-        if is_text_file:
-            try:
-                if use_sudo:
-                    result = subprocess.run(
-                        ['sudo', 'cat', str(full_path)],
-                        capture_output=True,
-                        text=True,
-                        timeout=30
-                    )
-                    if result.returncode != 0:
-                        raise HTTPException(status_code=500, detail=f"Error reading file: {result.stderr}")
-                    content = result.stdout
-                else:
-                    with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-                        content = f.read()
-
-                return Response(
-                    content=content,
-                    media_type=mime_type,
-                    headers={"Content-Disposition": f'inline; filename="{full_path.name}"'}
-                )
-            except UnicodeDecodeError:
-                # Handle binary
-                pass
-
-        # Binary files
-        return FileResponse(
-            str(full_path),
+        # Size/mtime for Content-Length and a validator for Range/If-None-Match
+        if use_sudo:
+            result = subprocess.run(
+                ['sudo', 'stat', '-c', '%s %Y', str(full_path)],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+            if result.returncode != 0:
+                raise HTTPException(status_code=500, detail=f"Error reading file: {result.stderr}")
+            size, mtime = (int(value) for value in result.stdout.split())
+            open_stream = lambda start, end: _sudo_file_range(full_path, start, end)
+        else:
+            stat = full_path.stat()
+            size, mtime = stat.st_size, int(stat.st_mtime)
+            open_stream = lambda start, end: iter_file_range(open(full_path, 'rb'), start, end)
+
+        disposition = 'inline' if is_text_file else 'attachment'
+        return ranged_response(
+            request,
+            size=size,
+            open_stream=open_stream,
             media_type=mime_type,
-            filename=full_path.name,
-            headers={"Content-Disposition": f'attachment; filename="{full_path.name}"'}
+            etag=f'W/"{size:x}-{mtime:x}"',
+            headers={
+                "Content-Disposition": f'{disposition}; filename="{full_path.name}"',
+                "Last-Modified": formatdate(mtime, usegmt=True),
+            },
         )
 
     except HTTPException:
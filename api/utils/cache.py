@@ -1,16 +1,25 @@
 """
 KMS Cache Utilities
-Provides caching functionality using Redis or in-memory fallback
+Two-tier cache: a bounded in-process LRU/TTL tier in front of Redis
+(the local tier alone when Redis is not available), invalidated by
+tag versions instead of key scans
 """
 
 import os
-import json
-import hashlib
+import math
+import uuid
+import random
+import asyncio
+import inspect
 import time
-from typing import Any, Optional, Callable
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, Optional, Callable, Tuple
 from functools import wraps
 import logging
 
+from utils.cache_codec import call_key, get_codec
+
 logger = logging.getLogger(__name__)
 
 # Try to import Redis
@@ -26,171 +35,727 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CACHE_TTL_DEFAULT = int(os.getenv("CACHE_TTL", "300"))  # 5 minutes default
 CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
 
-# In-memory cache fallback
-_memory_cache = {}
-_memory_cache_expiry = {}
+# In-process tier (per worker)
+CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", "10000"))
+CACHE_LOCAL_MAX_BYTES = int(os.getenv("CACHE_LOCAL_MAX_BYTES", str(64 * 1024 * 1024)))
+# With Redis, local copies live at most this long (bounds staleness across workers)
+CACHE_LOCAL_TTL = int(os.getenv("CACHE_LOCAL_TTL", "30"))
+CACHE_SWEEP_INTERVAL = float(os.getenv("CACHE_SWEEP_INTERVAL", "30"))
+REDIS_RETRY_INTERVAL = 30  # Seconds before reconnecting after a failed connect
+
+# Tag versions expire this long after their last bump; entry TTLs are capped to it
+# (an entry must never outlive the version it recorded)
+CACHE_TAG_TTL = int(os.getenv("CACHE_TAG_TTL", str(24 * 3600)))
+TAG_KEY_PREFIX = "tag:"
+
+# @cached stampede protection
+CACHE_LOCK_TTL_MS = int(os.getenv("CACHE_LOCK_TTL_MS", "30000"))  # Recompute lock, released early
+CACHE_LOCK_WAIT = float(os.getenv("CACHE_LOCK_WAIT", "5"))  # Max wait for another worker's recompute
+CACHE_LOCK_POLL = 0.05
+# XFetch: refresh early with a probability rising towards expiry (0 disables)
+CACHE_EARLY_REFRESH_BETA = float(os.getenv("CACHE_EARLY_REFRESH_BETA", "1.0"))
 
 # Redis client (initialized lazily)
 _redis_client = None
+_redis_retry_at = 0.0
 
 
 def get_redis_client():
     """Get or create Redis client"""
-    global _redis_client
-    
+    global _redis_client, _redis_retry_at
+
     if not REDIS_AVAILABLE:
         return None
-    
-    if _redis_client is None:
+
+    # Not on every call: a down Redis would cost a connect per lookup
+    if _redis_client is None and time.monotonic() >= _redis_retry_at:
         try:
-            _redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+            # Values are binary codec payloads (see cache_codec)
+            _redis_client = redis.from_url(REDIS_URL, decode_responses=False)
             _redis_client.ping()
             logger.info("Redis cache connected")
         except Exception as e:
             logger.warning(f"Redis not available, using memory cache: {e}")
             _redis_client = None
-    
+            _redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+
     return _redis_client
 
 
+def key_prefix(key: str) -> str:
+    """Stats bucket of a key ("objects:list_objects:ab12..." -> "objects")"""
+    return key.split(":", 1)[0]
+
+
+class CacheStats:
+    """Per-prefix counters (hits by tier, misses, sets, evictions, expirations)"""
+
+    def __init__(self):
+        self._counters = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def incr(self, key: str, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[key_prefix(key)][counter] += amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {prefix: dict(counters) for prefix, counters in self._counters.items()}
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+_stats = CacheStats()
+
+
+class LocalCache:
+    """
+    Thread-safe LRU with per-entry TTL, bounded by entries and bytes
+
+    Values are kept as Python objects (no decoding on a hit); their
+    size is the length of their serialized (uncompressed) encoding. Expired entries are
+    dropped on access and by ``sweep()`` (background sweeper thread).
+    """
+
+    def __init__(self, max_entries: int = CACHE_LOCAL_MAX_ENTRIES,
+                 max_bytes: int = CACHE_LOCAL_MAX_BYTES, stats: CacheStats = _stats):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = stats
+        self._data: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._prefix_bytes = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def _drop(self, key: str) -> Optional[tuple]:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+            self._prefix_bytes[key_prefix(key)] -= entry[2]
+        return entry
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self.stats.incr(key, "expired")
+                return default
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float, size: int):
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._data[key] = (time.monotonic() + ttl, value, size)
+            self._bytes += size
+            self._prefix_bytes[key_prefix(key)] += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.stats.incr(oldest, "evictions")
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._drop(key) is not None
+
+    def sweep(self) -> int:
+        """Drop all expired entries"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._data.items() if entry[0] <= now]
+            for key in expired:
+                self._drop(key)
+                self.stats.incr(key, "expired")
+            return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self._prefix_bytes.clear()
+
+    def prefix_bytes(self) -> dict:
+        with self._lock:
+            return {prefix: size for prefix, size in self._prefix_bytes.items() if size}
+
+
+_local_cache = LocalCache()
+_sweeper: Optional[threading.Thread] = None
+_sweeper_lock = threading.Lock()
+
+
+def _sweep_loop():
+    while True:
+        time.sleep(CACHE_SWEEP_INTERVAL)
+        try:
+            _local_cache.sweep()
+        except Exception as e:
+            logger.warning(f"Cache sweep error: {e}")
+
+
+def _ensure_sweeper():
+    """Start the expiry sweeper on first use (one per worker process)"""
+    global _sweeper
+    if _sweeper is not None and _sweeper.is_alive():
+        return
+    with _sweeper_lock:
+        if _sweeper is None or not _sweeper.is_alive():
+            _sweeper = threading.Thread(target=_sweep_loop, name="kms-cache-sweeper", daemon=True)
+            _sweeper.start()
+
+
+# -- Tag versions ------------------------------------------------------------------
+#
+# Every entry records the version of each tag it depends on: its key
+# prefix (namespace) plus explicit tags such as "object:42". Invalidating
+# a tag bumps its version (one INCR); entries that recorded an older
+# version are misses from then on and simply expire. Redis holds the
+# versions shared by all workers; _tag_versions is this worker's view
+# (the only one without Redis), updated on every bump and Redis read.
+#
+# Tag keys expire CACHE_TAG_TTL after their last bump. A recreated key
+# starts from the Redis clock in microseconds, above anything the
+# expired key ever held, so a version never repeats and an old entry
+# cannot match again.
+
+# Bump each KEYS[i]; a missing key is seeded from TIME first
+_BUMP_TAGS_SCRIPT = """
+local versions = {}
+for i, key in ipairs(KEYS) do
+    if redis.call('exists', key) == 0 then
+        local now = redis.call('time')
+        redis.call('set', key, now[1] .. string.format('%06d', tonumber(now[2])))
+    end
+    versions[i] = redis.call('incr', key)
+    redis.call('expire', key, ARGV[1])
+end
+return versions
+"""
+
+_tag_versions: Dict[str, int] = {}
+_tag_versions_lock = threading.Lock()
+_tag_invalidations = 0
+
+
+def _remember_versions(versions: Dict[str, int]):
+    with _tag_versions_lock:
+        for tag, version in versions.items():
+            if version:
+                _tag_versions[tag] = version
+            else:
+                _tag_versions.pop(tag, None)
+
+
+def _versions_current(versions: Dict[str, int]) -> bool:
+    """Recorded versions still match this worker's view"""
+    return all(_tag_versions.get(tag, 0) == version for tag, version in versions.items())
+
+
+def entry_tags(key: str, tags: Iterable[str] = ()) -> list:
+    """Tags of an entry: its key prefix plus ``tags``"""
+    return list(dict.fromkeys([key_prefix(key), *tags]))
+
+
+def tag_versions(tags: Iterable[str]) -> Dict[str, int]:
+    """
+    Current version of each tag (0 = never invalidated)
+
+    Read these *before* computing a value and store them with it, so an
+    invalidation during the computation still invalidates the result.
+    """
+    tags = list(tags)
+    redis_client = get_redis_client()
+
+    if redis_client and tags:
+        try:
+            values = redis_client.mget([TAG_KEY_PREFIX + tag for tag in tags])
+            versions = {tag: int(value or 0) for tag, value in zip(tags, values)}
+            _remember_versions(versions)
+            return versions
+        except Exception as e:
+            logger.warning(f"Redis tag read error: {e}")
+
+    with _tag_versions_lock:
+        return {tag: _tag_versions.get(tag, 0) for tag in tags}
+
+
+def invalidate_tags(*tags: str) -> int:
+    """
+    Invalidate every entry carrying any of ``tags``
+
+    O(1) per tag: bumps the tag versions (one script call for all of
+    them), nothing is scanned or deleted. Returns the number of tags bumped.
+    """
+    global _tag_invalidations
+    tags = list(dict.fromkeys(tag for tag in tags if tag))
+    if not tags:
+        return 0
+
+    redis_client = get_redis_client()
+    bumped = False
+
+    if redis_client:
+        try:
+            versions = redis_client.eval(_BUMP_TAGS_SCRIPT, len(tags),
+                                         *[TAG_KEY_PREFIX + tag for tag in tags], CACHE_TAG_TTL)
+            _remember_versions(dict(zip(tags, versions)))
+            bumped = True
+        except Exception as e:
+            logger.warning(f"Redis tag invalidation error: {e}")
+
+    with _tag_versions_lock:
+        if not bumped:
+            # This worker at least stops serving the entries
+            for tag in tags:
+                _tag_versions[tag] = _tag_versions.get(tag, 0) + 1
+        _tag_invalidations += len(tags)
+    return len(tags)
+
+
+def _resolve_tags(tags, args, kwargs) -> list:
+    """Static tags, or a callable deriving them from the call's arguments"""
+    if callable(tags):
+        return list(tags(*args, **kwargs) or ())
+    return list(tags or ())
+
+
 def cache_key(*args, **kwargs) -> str:
     """Generate cache key from arguments"""
-    key_data = json.dumps({"args": args, "kwargs": kwargs}, sort_keys=True)
-    return hashlib.md5(key_data.encode()).hexdigest()
+    return call_key(args, kwargs)
 
 
 def cache_get(key: str) -> Optional[Any]:
-    """Get value from cache"""
+    """Get value from cache (local tier, then Redis)"""
     if not CACHE_ENABLED:
         return None
-    
+
+    entry = _local_cache.get(key)
+    if entry is not None:
+        versions, value = entry
+        if _versions_current(versions):
+            _stats.incr(key, "local_hits")
+            return value
+        _local_cache.delete(key)
+        _stats.incr(key, "invalidated")
+
     redis_client = get_redis_client()
-    
+
     if redis_client:
         try:
-            value = redis_client.get(key)
-            if value:
-                return json.loads(value)
+            namespace = key_prefix(key)
+            # The namespace version rides along; other tags cost one MGET
+            raw, pttl, namespace_version = (redis_client.pipeline(transaction=False)
+                                            .get(key).pttl(key).get(TAG_KEY_PREFIX + namespace).execute())
+            entry, size = get_codec().decode(raw) if raw else (None, 0)
+            if isinstance(entry, dict) and "t" in entry and "v" in entry:
+                versions = entry["t"]
+                current = {namespace: int(namespace_version or 0)}
+                others = [tag for tag in versions if tag != namespace]
+                if others:
+                    values = redis_client.mget([TAG_KEY_PREFIX + tag for tag in others])
+                    current.update((tag, int(value or 0)) for tag, value in zip(others, values))
+                _remember_versions(current)
+                if all(current.get(tag, 0) == version for tag, version in versions.items()):
+                    # Keep a local copy, never past the Redis expiry
+                    local_ttl = CACHE_LOCAL_TTL if pttl is None or pttl < 0 else min(CACHE_LOCAL_TTL, pttl / 1000)
+                    _local_cache.set(key, (versions, entry["v"]), local_ttl, size)
+                    _stats.incr(key, "redis_hits")
+                    return entry["v"]
+                _stats.incr(key, "invalidated")
         except Exception as e:
             logger.warning(f"Redis get error: {e}")
-    
-    # Fallback to memory cache
-    if key in _memory_cache:
-        if _memory_cache_expiry.get(key, 0) > time.time():
-            return _memory_cache[key]
-        else:
-            # Expired
-            del _memory_cache[key]
-            del _memory_cache_expiry[key]
-    
+
+    _stats.incr(key, "misses")
     return None
 
 
-def cache_set(key: str, value: Any, ttl: int = None) -> bool:
-    """Set value in cache"""
+def cache_set(key: str, value: Any, ttl: int = None, tags: Iterable[str] = (),
+              versions: Optional[Dict[str, int]] = None) -> bool:
+    """
+    Set value in cache
+
+    The entry is invalidated by ``invalidate_tags`` of its key prefix or
+    any of ``tags``. Pass ``versions`` (``tag_versions(entry_tags(key,
+    tags))`` read before computing ``value``) to close the race with an
+    invalidation during the computation; the default reads them now.
+    """
     if not CACHE_ENABLED:
         return False
-    
-    ttl = ttl or CACHE_TTL_DEFAULT
+
+    ttl = min(ttl or CACHE_TTL_DEFAULT, CACHE_TAG_TTL)
+    if versions is None:
+        versions = tag_versions(entry_tags(key, tags))
+    payload, size = get_codec().encode({"t": versions, "v": value})
     redis_client = get_redis_client()
-    
+    stored = False
+
     if redis_client:
         try:
-            redis_client.setex(key, ttl, json.dumps(value))
-            return True
+            redis_client.setex(key, ttl, payload)
+            stored = True
         except Exception as e:
             logger.warning(f"Redis set error: {e}")
-    
-    # Fallback to memory cache
-    _memory_cache[key] = value
-    _memory_cache_expiry[key] = time.time() + ttl
+
+    # Local tier: short-lived copy in front of Redis, or the only tier
+    _ensure_sweeper()
+    _local_cache.set(key, (versions, value), min(ttl, CACHE_LOCAL_TTL) if stored else ttl, size)
+    _stats.incr(key, "sets")
     return True
 
 
 def cache_delete(key: str) -> bool:
     """Delete value from cache"""
     redis_client = get_redis_client()
-    
+
     if redis_client:
         try:
             redis_client.delete(key)
         except Exception:
             pass
-    
+
     # Also clear from memory cache
-    _memory_cache.pop(key, None)
-    _memory_cache_expiry.pop(key, None)
+    _local_cache.delete(key)
     return True
 
 
-def cache_clear_pattern(pattern: str) -> int:
-    """Clear all keys matching pattern"""
-    count = 0
+# -- @cached: single-flight, stale-while-revalidate, early refresh ---------------
+
+# Release the recompute lock only if it is still ours
+_UNLOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Sentinel results of _acquire_lock (_HELD_ELSEWHERE also of a background _recompute)
+_NO_REDIS = object()
+_HELD_ELSEWHERE = object()
+
+
+def _acquire_lock(key: str):
+    """Cross-worker recompute lock: a token, _HELD_ELSEWHERE or _NO_REDIS"""
+    redis_client = get_redis_client()
+    if not redis_client:
+        return _NO_REDIS
+    token = uuid.uuid4().hex
+    try:
+        if redis_client.set(f"lock:{key}", token, nx=True, px=CACHE_LOCK_TTL_MS):
+            return token
+        return _HELD_ELSEWHERE
+    except Exception as e:
+        logger.warning(f"Redis lock error: {e}")
+        return _NO_REDIS
+
+
+def _release_lock(key: str, token):
+    if not isinstance(token, str):
+        return
     redis_client = get_redis_client()
-    
     if redis_client:
         try:
-            keys = redis_client.keys(pattern)
-            if keys:
-                count = redis_client.delete(*keys)
+            redis_client.eval(_UNLOCK_SCRIPT, 1, f"lock:{key}", token)
         except Exception as e:
-            logger.warning(f"Redis clear pattern error: {e}")
-    
-    # Clear matching memory cache keys
-    pattern_prefix = pattern.replace("*", "")
-    keys_to_delete = [k for k in _memory_cache.keys() if k.startswith(pattern_prefix)]
-    for key in keys_to_delete:
-        del _memory_cache[key]
-        _memory_cache_expiry.pop(key, None)
-        count += 1
-    
-    return count
-
-
-def cached(prefix: str = "", ttl: int = None):
+            logger.warning(f"Redis unlock error: {e}")
+
+
+def _store_entry(key: str, value: Any, ttl: int, stale_ttl: int, delta: float, versions: Dict[str, int]):
+    """Cache a result with its freshness and recompute time (for early refresh)"""
+    cache_set(key, {"v": value, "x": time.time() + ttl, "d": round(delta, 4)}, ttl + stale_ttl,
+              versions=versions)
+
+
+def _entry_state(entry: Optional[dict], beta: float) -> str:
+    """'fresh', 'early' (XFetch says refresh now), 'stale' or 'miss'"""
+    if not isinstance(entry, dict) or "x" not in entry:
+        return "miss"
+    now = time.time()
+    if now >= entry["x"]:
+        return "stale"
+    # XFetch: recompute with probability rising as expiry nears, scaled
+    # by how long a recompute takes
+    if beta > 0 and now - entry["d"] * beta * math.log(1.0 - random.random()) >= entry["x"]:
+        return "early"
+    return "fresh"
+
+
+class _Flight:
+    """One in-process recompute that concurrent callers of a key wait for"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: dict = {}
+_flights_lock = threading.Lock()
+_async_flights: dict = {}
+_background_tasks: set = set()
+
+
+def _recompute(key, func, args, kwargs, ttl, stale_ttl, tags, wait=True):
+    """
+    Recompute and store under the cross-worker lock
+
+    Without the lock (another worker is recomputing) a waiting caller
+    polls the cache for its result for up to CACHE_LOCK_WAIT, then
+    computes anyway; a non-waiting caller (background refresh) gives up
+    and returns _HELD_ELSEWHERE.
+    """
+    token = _acquire_lock(key)
+    if token is _HELD_ELSEWHERE:
+        if not wait:
+            return _HELD_ELSEWHERE
+        _stats.incr(key, "lock_waits")
+        deadline = time.monotonic() + CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(CACHE_LOCK_POLL)
+            entry = cache_get(key)
+            if _entry_state(entry, 0) == "fresh":
+                return entry["v"]
+    try:
+        versions = tag_versions(tags)
+        started = time.monotonic()
+        value = func(*args, **kwargs)
+        _store_entry(key, value, ttl, stale_ttl, time.monotonic() - started, versions)
+        _stats.incr(key, "recomputes")
+        return value
+    finally:
+        _release_lock(key, token)
+
+
+def _single_flight(key, compute):
+    """Run compute() once per key in this process; concurrent callers share the result"""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        _stats.incr(key, "coalesced")
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        if flight.result is _HELD_ELSEWHERE:
+            # Joined a background refresh that gave up: no value to share
+            return _single_flight(key, compute)
+        return flight.result
+    try:
+        flight.result = compute()
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def _refresh_in_background(key, compute):
+    """Start compute() on a thread unless this key is already being recomputed"""
+    with _flights_lock:
+        if key in _flights:
+            return
+    threading.Thread(target=_swallow, args=(_single_flight, key, compute),
+                     name="kms-cache-refresh", daemon=True).start()
+
+
+def _swallow(fn, *args):
+    try:
+        fn(*args)
+    except Exception as e:
+        logger.warning(f"Background cache refresh failed: {e}")
+
+
+def _background_task_done(task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Background cache refresh failed: {task.exception()}")
+
+
+async def _recompute_async(key, func, args, kwargs, ttl, stale_ttl, tags, wait=True):
+    token = await asyncio.to_thread(_acquire_lock, key)
+    if token is _HELD_ELSEWHERE:
+        if not wait:
+            return _HELD_ELSEWHERE
+        _stats.incr(key, "lock_waits")
+        deadline = time.monotonic() + CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(CACHE_LOCK_POLL)
+            entry = await asyncio.to_thread(cache_get, key)
+            if _entry_state(entry, 0) == "fresh":
+                return entry["v"]
+    try:
+        versions = await asyncio.to_thread(tag_versions, tags)
+        started = time.monotonic()
+        value = await func(*args, **kwargs)
+        await asyncio.to_thread(_store_entry, key, value, ttl, stale_ttl, time.monotonic() - started, versions)
+        _stats.incr(key, "recomputes")
+        return value
+    finally:
+        await asyncio.to_thread(_release_lock, key, token)
+
+
+async def _single_flight_async(key, compute):
+    flight = _async_flights.get(key)
+    if flight is not None:
+        _stats.incr(key, "coalesced")
+        result = await asyncio.shield(flight)
+        if result is _HELD_ELSEWHERE:
+            # Joined a background refresh that gave up: no value to share
+            return await _single_flight_async(key, compute)
+        return result
+    flight = asyncio.get_running_loop().create_future()
+    _async_flights[key] = flight
+    try:
+        result = await compute()
+        flight.set_result(result)
+        return result
+    except BaseException as e:
+        flight.set_exception(e)
+        # Nobody may be waiting; don't warn about an unretrieved exception
+        flight.exception()
+        raise
+    finally:
+        _async_flights.pop(key, None)
+
+
+async def _async_cache_get(key: str):
+    """Local tier inline, Redis off the event loop"""
+    if not CACHE_ENABLED:
+        return None
+    entry = _local_cache.get(key)
+    if entry is not None and _versions_current(entry[0]):
+        _stats.incr(key, "local_hits")
+        return entry[1]
+    return await asyncio.to_thread(cache_get, key)
+
+
+def cached(prefix: str = "", ttl: int = None, stale_ttl: int = 0,
+           early_refresh_beta: float = CACHE_EARLY_REFRESH_BETA, tags=None):
     """
-    Decorator to cache function results
-    
+    Decorator to cache function results (sync or async functions)
+
+    Concurrent misses of a key are coalesced: one caller per process
+    recomputes (single-flight) and workers serialize on a Redis lock,
+    so an expiring hot key is recomputed once. With ``stale_ttl`` an
+    expired value is still served for that long while one background
+    refresh runs (stale-while-revalidate). Fresh values are refreshed
+    early with a probability that rises towards expiry (XFetch,
+    ``early_refresh_beta``; 0 disables).
+
+    Entries are tagged with ``prefix`` and ``tags`` (a list, or a
+    callable taking the function's arguments); ``invalidate_tags`` of
+    any of them makes the entry a miss, stale window included.
+
     Usage:
-        @cached(prefix="users", ttl=60)
+        @cached(prefix="users", ttl=60, tags=lambda user_id: [f"user:{user_id}"])
         def get_user(user_id):
             ...
     """
     def decorator(func: Callable):
+        entry_ttl = ttl or CACHE_TTL_DEFAULT
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = f"{prefix}:{func.__name__}:{cache_key(*args, **kwargs)}"
+                if not CACHE_ENABLED:
+                    return await func(*args, **kwargs)
+                key_tags = entry_tags(key, _resolve_tags(tags, args, kwargs))
+
+                entry = await _async_cache_get(key)
+                state = _entry_state(entry, early_refresh_beta)
+                if state == "fresh":
+                    return entry["v"]
+
+                def refresh(wait=True):
+                    return _single_flight_async(
+                        key, lambda: _recompute_async(key, func, args, kwargs, entry_ttl, stale_ttl, key_tags, wait))
+
+                if state == "early" or (state == "stale" and stale_ttl):
+                    _stats.incr(key, "early_refreshes" if state == "early" else "stale_served")
+                    if key not in _async_flights:
+                        task = asyncio.get_running_loop().create_task(refresh(wait=False))
+                        _background_tasks.add(task)
+                        task.add_done_callback(_background_task_done)
+                    return entry["v"]
+
+                logger.debug(f"Cache miss: {key}")
+                return await refresh()
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             key = f"{prefix}:{func.__name__}:{cache_key(*args, **kwargs)}"
-            
+            if not CACHE_ENABLED:
+                return func(*args, **kwargs)
+            key_tags = entry_tags(key, _resolve_tags(tags, args, kwargs))
+
             # Try to get from cache
-            result = cache_get(key)
-            if result is not None:
+            entry = cache_get(key)
+            state = _entry_state(entry, early_refresh_beta)
+            if state == "fresh":
                 logger.debug(f"Cache hit: {key}")
-                return result
-            
-            # Call function and cache result
+                return entry["v"]
+
+            def compute(wait=True):
+                return _recompute(key, func, args, kwargs, entry_ttl, stale_ttl, key_tags, wait)
+
+            if state == "early" or (state == "stale" and stale_ttl):
+                # Serve what we have; one refresh runs in the background
+                _stats.incr(key, "early_refreshes" if state == "early" else "stale_served")
+                _refresh_in_background(key, lambda: compute(wait=False))
+                return entry["v"]
+
+            # Miss: one caller computes, concurrent callers wait for it
             logger.debug(f"Cache miss: {key}")
-            result = func(*args, **kwargs)
-            cache_set(key, result, ttl)
-            
-            return result
+            return _single_flight(key, compute)
         return wrapper
     return decorator
 
 
-def invalidate_cache(prefix: str):
+def invalidate_cache(prefix: str = "", tags=None):
     """
     Decorator to invalidate cache after function call
-    
+
+    Bumps ``prefix`` (every entry cached under it) and ``tags`` (a list,
+    or a callable taking the function's arguments).
+
     Usage:
-        @invalidate_cache(prefix="users")
+        @invalidate_cache(tags=lambda user_id, data: [f"user:{user_id}"])
         def update_user(user_id, data):
             ...
     """
     def decorator(func: Callable):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                result = await func(*args, **kwargs)
+                await asyncio.to_thread(invalidate_tags, prefix, *_resolve_tags(tags, args, kwargs))
+                return result
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             result = func(*args, **kwargs)
-            cache_clear_pattern(f"{prefix}:*")
+            invalidate_tags(prefix, *_resolve_tags(tags, args, kwargs))
             return result
         return wrapper
     return decorator
@@ -198,14 +763,35 @@ def invalidate_cache(prefix: str):
 
 # Cache statistics
 def get_cache_stats():
-    """Get cache statistics"""
+    """Get cache statistics (both tiers, per key prefix)"""
+    redis_client = get_redis_client()
     stats = {
-        "type": "redis" if get_redis_client() else "memory",
+        "type": "redis+local" if redis_client else "memory",
         "enabled": CACHE_ENABLED,
-        "memory_cache_size": len(_memory_cache)
+        "memory_cache_size": len(_local_cache),
+        "local": {
+            "entries": len(_local_cache),
+            "bytes": _local_cache.bytes,
+            "max_entries": _local_cache.max_entries,
+            "max_bytes": _local_cache.max_bytes,
+            "ttl": CACHE_LOCAL_TTL,
+        },
+        "codec": get_codec().describe(),
+        "tags": {
+            "known": len(_tag_versions),
+            "invalidations": _tag_invalidations,
+        },
     }
-    
-    redis_client = get_redis_client()
+
+    prefixes = _stats.snapshot()
+    for prefix, size in _local_cache.prefix_bytes().items():
+        prefixes.setdefault(prefix, {})["bytes"] = size
+    for counters in prefixes.values():
+        hits = counters.get("local_hits", 0) + counters.get("redis_hits", 0)
+        lookups = hits + counters.get("misses", 0)
+        counters["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+    stats["prefixes"] = prefixes
+
     if redis_client:
         try:
             info = redis_client.info("memory")
@@ -213,6 +799,5 @@ def get_cache_stats():
             stats["redis_keys"] = redis_client.dbsize()
         except Exception:
             pass
-    
-    return stats
 
+    return stats
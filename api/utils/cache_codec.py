@@ -0,0 +1,239 @@
+"""
+KMS Cache Codec
+Pluggable serializers (json, orjson, msgpack) with optional compression
+(zlib, zstd) above a size threshold for values stored in Redis
+
+Every payload starts with one header byte naming its serializer and
+compression, so entries stay readable when the configuration changes
+(or differs between workers during a rollout).
+"""
+
+import os
+import json
+import zlib
+import hashlib
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Optional speedups: used when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# "auto" = fastest installed (orjson, msgpack, json)
+CACHE_SERIALIZER = os.getenv("CACHE_SERIALIZER", "auto")
+# "auto" = zstd when installed, else zlib (both only above the threshold)
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "auto")
+# Payloads smaller than this are stored uncompressed
+CACHE_COMPRESS_THRESHOLD = int(os.getenv("CACHE_COMPRESS_THRESHOLD", "4096"))
+CACHE_ZSTD_LEVEL = int(os.getenv("CACHE_ZSTD_LEVEL", "3"))
+CACHE_ZLIB_LEVEL = int(os.getenv("CACHE_ZLIB_LEVEL", "1"))
+
+
+class Serializer:
+    """value <-> bytes; ``code`` is its id in the payload header"""
+
+    name = ""
+    code = 0
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JsonSerializer(Serializer):
+    name = "json"
+    code = 1
+
+    def dumps(self, value):
+        return json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonSerializer(Serializer):
+    name = "orjson"
+    code = 2
+
+    def dumps(self, value):
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgpackSerializer(Serializer):
+    name = "msgpack"
+    code = 3
+
+    def dumps(self, value):
+        return msgpack.packb(value, default=str, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class Compressor:
+    """bytes <-> bytes; ``code`` is its id in the payload header"""
+
+    name = "none"
+    code = 0
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class ZlibCompressor(Compressor):
+    name = "zlib"
+    code = 1
+
+    def __init__(self, level: int = CACHE_ZLIB_LEVEL):
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    name = "zstd"
+    code = 2
+
+    def __init__(self, level: int = CACHE_ZSTD_LEVEL):
+        # zstandard (de)compressor objects are not thread-safe; one-shot
+        # calls with a shared level are
+        self.level = level
+
+    def compress(self, data):
+        return zstandard.compress(data, self.level)
+
+    def decompress(self, data):
+        return zstandard.decompress(data)
+
+
+SERIALIZERS: Dict[str, Serializer] = {"json": JsonSerializer()}
+if orjson is not None:
+    SERIALIZERS["orjson"] = OrjsonSerializer()
+if msgpack is not None:
+    SERIALIZERS["msgpack"] = MsgpackSerializer()
+
+COMPRESSORS: Dict[str, Compressor] = {"none": Compressor(), "zlib": ZlibCompressor()}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = ZstdCompressor()
+
+_SERIALIZER_CODES = {serializer.code: serializer for serializer in SERIALIZERS.values()}
+_COMPRESSOR_CODES = {compressor.code: compressor for compressor in COMPRESSORS.values()}
+
+
+class CacheCodec:
+    """
+    Serializer + compressor with a one-byte header per payload
+
+    Header: serializer code in the low nibble, compressor code in the
+    high nibble. Values the serializer cannot encode (e.g. integers
+    beyond 64 bits for orjson) fall back to JSON for that payload.
+    """
+
+    def __init__(self, serializer: str = CACHE_SERIALIZER, compression: str = CACHE_COMPRESSION,
+                 threshold: int = CACHE_COMPRESS_THRESHOLD):
+        if serializer == "auto":
+            serializer = next(name for name in ("orjson", "msgpack", "json") if name in SERIALIZERS)
+        if compression == "auto":
+            compression = "zstd" if "zstd" in COMPRESSORS else "zlib"
+        if serializer not in SERIALIZERS:
+            logger.warning(f"Cache serializer {serializer!r} not available, using json")
+            serializer = "json"
+        if compression not in COMPRESSORS:
+            logger.warning(f"Cache compression {compression!r} not available, storing uncompressed")
+            compression = "none"
+        self.serializer = SERIALIZERS[serializer]
+        self.compressor = COMPRESSORS[compression]
+        self.threshold = threshold
+
+    def encode(self, value: Any) -> Tuple[bytes, int]:
+        """(payload, serialized size before compression)"""
+        serializer = self.serializer
+        try:
+            data = serializer.dumps(value)
+        except (TypeError, ValueError, OverflowError):
+            serializer = SERIALIZERS["json"]
+            data = serializer.dumps(value)
+
+        size = len(data)
+        compressor = COMPRESSORS["none"]
+        if self.compressor.code and size >= self.threshold:
+            compressed = self.compressor.compress(data)
+            if len(compressed) < size:
+                compressor, data = self.compressor, compressed
+        return bytes((compressor.code << 4 | serializer.code,)) + data, size
+
+    def decode(self, payload: bytes) -> Tuple[Any, int]:
+        """(value, serialized size); ValueError if this worker cannot read the payload"""
+        if not payload:
+            raise ValueError("empty cache payload")
+        header = payload[0]
+        serializer = _SERIALIZER_CODES.get(header & 0x0F)
+        compressor = _COMPRESSOR_CODES.get(header >> 4)
+        if serializer is None or compressor is None:
+            raise ValueError(f"unreadable cache payload header {header:#04x}")
+        data = compressor.decompress(payload[1:])
+        return serializer.loads(data), len(data)
+
+    def describe(self) -> dict:
+        return {"serializer": self.serializer.name, "compression": self.compressor.name,
+                "compress_threshold": self.threshold}
+
+
+# Argument encodings up to this length are used as the key as is
+CACHE_KEY_RAW_MAX = 64
+
+
+def call_key(args: tuple, kwargs: dict) -> str:
+    """
+    Key of a call's arguments: their compact sorted-keys JSON encoding,
+    or its blake2b digest when longer than CACHE_KEY_RAW_MAX
+
+    Typical list filters (a few ids, flags and paging values) need no
+    hashing at all. Raw keys start with "[", digests never do.
+    """
+    if orjson is not None:
+        data = orjson.dumps([args, kwargs], default=str,
+                            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    else:
+        data = json.dumps([args, kwargs], sort_keys=True, default=str,
+                          separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(data) <= CACHE_KEY_RAW_MAX:
+        return data.decode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+_codec: Optional[CacheCodec] = None
+
+
+def get_codec() -> CacheCodec:
+    """Process-wide codec from the CACHE_* settings"""
+    global _codec
+    if _codec is None:
+        _codec = CacheCodec()
+    return _codec
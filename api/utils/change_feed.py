@@ -0,0 +1,143 @@
+"""
+KMS Change Feed
+Background LISTEN on the kms_changes channel (see notify_change() trigger)
+with fan-out to in-process subscribers
+"""
+
+import os
+import json
+import time
+import select
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHANGE_CHANNEL = os.getenv("KMS_CHANGE_CHANNEL", "kms_changes")
+CHANGE_FEED_RECONNECT_DELAY = float(os.getenv("CHANGE_FEED_RECONNECT_DELAY", "5"))
+
+
+class ChangeFeed:
+    """
+    One LISTEN connection per process, many subscribers
+
+    Subscribers get ``on_changes(events)`` with every notification payload
+    (``{'table', 'action', 'id'}``) received in one poll, and
+    ``on_resync()`` after each (re)connect, because notifications sent
+    while disconnected are lost and local state must be rebuilt.
+    """
+
+    def __init__(self, connect: Callable, channel: str = CHANGE_CHANNEL,
+                 reconnect_delay: float = CHANGE_FEED_RECONNECT_DELAY,
+                 poll_timeout: float = 1.0):
+        self._connect = connect
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.poll_timeout = poll_timeout
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stats = {
+            "connected": False,
+            "connects": 0,
+            "notifications": 0,
+            "errors": 0,
+            "last_notification": None,
+        }
+
+    def subscribe(self, on_changes: Callable[[List[Dict]], None],
+                  on_resync: Optional[Callable[[], None]] = None):
+        """Register callbacks; they run on the feed thread and must not block long"""
+        with self._lock:
+            self._subscribers.append((on_changes, on_resync))
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="kms-change-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return dict(self._stats, subscribers=len(self._subscribers), channel=self.channel)
+
+    # -- internals ------------------------------------------------------------
+
+    def _dispatch(self, method_index: int, *args):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            callback = subscriber[method_index]
+            if callback is None:
+                continue
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"Change feed subscriber {callback!r} failed: {e}", exc_info=True)
+
+    def _listen(self, conn):
+        cur = conn.cursor()
+        cur.execute(f"LISTEN {self.channel}")
+        cur.close()
+
+        self._stats["connected"] = True
+        self._stats["connects"] += 1
+        self._dispatch(1)
+
+        while not self._stop.is_set():
+            if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                continue
+            conn.poll()
+            events = []
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    events.append(json.loads(notify.payload))
+                except ValueError:
+                    logger.warning(f"Ignoring malformed {self.channel} payload: {notify.payload!r}")
+            if events:
+                self._stats["notifications"] += len(events)
+                self._stats["last_notification"] = time.time()
+                self._dispatch(0, events)
+
+    def _run(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                self._listen(conn)
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Change feed on {self.channel} lost: {e}; "
+                               f"reconnecting in {self.reconnect_delay}s")
+            finally:
+                self._stats["connected"] = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(self.reconnect_delay)
+
+
+_change_feed: Optional[ChangeFeed] = None
+_change_feed_lock = threading.Lock()
+
+
+def get_change_feed() -> ChangeFeed:
+    """Process-wide change feed on the shared DB settings (not started)"""
+    global _change_feed
+    if _change_feed is None:
+        with _change_feed_lock:
+            if _change_feed is None:
+                from database import get_listen_connection
+                _change_feed = ChangeFeed(get_listen_connection)
+    return _change_feed
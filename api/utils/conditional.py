@@ -0,0 +1,119 @@
+"""
+KMS Conditional Requests
+Weak ETag / Last-Modified validators and 304 Not Modified short-circuits
+for read endpoints
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from utils.streaming import etag_matches
+
+# Clients (and browser fetch) may keep responses but must revalidate
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+
+class NotModified(Exception):
+    """Raised by check_conditional(); the app handler turns it into a 304"""
+
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+
+def make_etag(request: Request, *parts) -> str:
+    """
+    Weak ETag from the request target and validator values
+
+    ``parts`` are cheap columns (id, version, checksum, updated_at, or a
+    list fingerprint like count + max(updated_at)) - never the payload.
+    """
+    digest = hashlib.sha1(str(request.url.path).encode())
+    digest.update(str(request.url.query).encode())
+    for part in parts:
+        digest.update(b"\x1f")
+        digest.update(str(part).encode())
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Columns are TIMESTAMP WITHOUT TIME ZONE; treat them as UTC consistently
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value).replace(microsecond=0), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """If-None-Match wins; If-Modified-Since is only used without it (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since is None:
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+
+def check_conditional(request: Request, response: Response, etag: str,
+                      last_modified: Optional[datetime] = None):
+    """
+    Answer 304 if the client copy is current, else stamp validators
+
+    Call before the payload is built; raises NotModified on a match.
+    """
+    headers = {"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+
+    if is_not_modified(request, etag, last_modified):
+        raise NotModified(headers)
+
+    response.headers.update(headers)
+
+
+async def not_modified_handler(request: Request, exc: NotModified) -> Response:
+    return Response(status_code=304, headers=exc.headers)
+
+
+def list_fingerprint(cur, fingerprint_sql: str, params=None):
+    """
+    The aggregate row of a list endpoint, as JSON-ready (cacheable) values
+
+    ``fingerprint_sql`` applies the same filters as the list query and
+    returns ``last_modified`` (max(updated_at)) plus counts or other cheap
+    aggregates; a count catches deletes that leave max(updated_at) alone.
+    """
+    cur.execute(fingerprint_sql, params)
+    return jsonable_encoder(cur.fetchone())
+
+
+def fingerprint_validators(request: Request, row):
+    """ETag and Last-Modified from a ``list_fingerprint`` row"""
+    values = list(row.values()) if isinstance(row, dict) else list(row)
+    last_modified = row.get("last_modified") if isinstance(row, dict) else None
+    if isinstance(last_modified, str):
+        last_modified = datetime.fromisoformat(last_modified)
+    return make_etag(request, *values), last_modified
+
+
+def list_validators(request: Request, cur, fingerprint_sql: str, params=None):
+    """
+    Validators for a list endpoint from one aggregate row
+
+    Paging parameters are covered by the request query string.
+    """
+    return fingerprint_validators(request, list_fingerprint(cur, fingerprint_sql, params))
@@ -4,10 +4,16 @@ Provides database query optimization and connection pooling
 """
 
 import os
+import time
 import logging
-from typing import Optional
+import threading
+from collections import deque
+from typing import Callable, Optional
 from contextlib import contextmanager
 
+import psycopg2
+import psycopg2.extensions
+
 logger = logging.getLogger(__name__)
 
 # Database configuration
@@ -15,6 +21,8 @@ DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
 DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
 DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
 DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 30 minutes
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_PRE_PING = float(os.getenv("DB_POOL_PRE_PING", "30"))  # ping idle conns older than this
 
 # Query statistics
 query_stats = {
@@ -153,6 +161,11 @@ class ConnectionPoolMonitor:
         self.active_connections = 0
         self.peak_connections = 0
         self.connection_errors = 0
+        self._pool = None
+    
+    def attach(self, pool):
+        """Report live figures from a ConnectionPool instead of manual counters"""
+        self._pool = pool
     
     def connection_acquired(self):
         self.active_connections += 1
@@ -165,6 +178,8 @@ class ConnectionPoolMonitor:
         self.connection_errors += 1
     
     def get_stats(self):
+        if self._pool is not None:
+            return self._pool.stats()
         return {
             "active": self.active_connections,
             "peak": self.peak_connections,
@@ -190,3 +205,265 @@ def monitored_connection(connection_func):
     finally:
         pool_monitor.connection_released()
 
+
+# ============================================================================
+# Connection Pool
+# ============================================================================
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within DB_POOL_TIMEOUT"""
+
+
+def _is_auth_failure(error: Exception) -> bool:
+    """Check whether a connect error was caused by a rejected password"""
+    message = str(error).lower()
+    return "password authentication failed" in message or "no password supplied" in message
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool
+
+    - keeps up to ``pool_size`` idle connections, allows ``max_overflow``
+      extra connections under load (closed again on return)
+    - recycles connections older than ``recycle`` seconds
+    - health-checks connections on checkout (broken / idle too long)
+    - asks ``password_provider`` for the password once and again only
+      after the server rejects it
+    """
+
+    def __init__(self, connect: Callable, password_provider: Callable[[], str],
+                 pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW,
+                 timeout: float = DB_POOL_TIMEOUT, recycle: int = DB_POOL_RECYCLE,
+                 min_size: int = DB_POOL_MIN_SIZE, pre_ping_after: float = DB_POOL_PRE_PING):
+        self._connect = connect
+        self._password_provider = password_provider
+        self._password: Optional[str] = None
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.min_size = min(min_size, pool_size)
+        self.pre_ping_after = pre_ping_after
+
+        self._idle = deque()          # (conn, created_at, returned_at)
+        self._created = {}            # id(conn) -> created_at for checked-out conns
+        self._total = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._pid = os.getpid()
+        self._closed = False
+
+        self._counters = {
+            "checkouts": 0,
+            "connects": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "password_refreshes": 0,
+            "errors": 0,
+            "peak_in_use": 0,
+        }
+
+    def _count(self, counter: str):
+        """Bump a counter from code that does not hold the lock"""
+        with self._lock:
+            self._counters[counter] += 1
+
+    # -- password / connect -------------------------------------------------
+
+    def _get_password(self, refresh: bool = False) -> str:
+        if refresh or self._password is None:
+            self._password = self._password_provider()
+            if refresh:
+                self._count("password_refreshes")
+        return self._password
+
+    def _new_connection(self):
+        """Open a new connection, re-reading the password once on auth failure"""
+        try:
+            conn = self._connect(self._get_password())
+        except psycopg2.OperationalError as e:
+            if not _is_auth_failure(e):
+                self._count("errors")
+                raise
+            logger.warning("DB authentication failed, re-reading password from secrets")
+            try:
+                conn = self._connect(self._get_password(refresh=True))
+            except Exception:
+                self._count("errors")
+                raise
+        self._count("connects")
+        return conn
+
+    def connect_dedicated(self):
+        """
+        Open a connection outside the pool (LISTEN sessions)
+
+        Shares the cached password and auth-retry logic but does not count
+        against pool_size; the caller owns and closes it.
+        """
+        return self._new_connection()
+
+    def warm_up(self):
+        """Fetch the password and pre-open ``min_size`` connections"""
+        self._get_password()
+        opened = []
+        try:
+            while True:
+                with self._lock:
+                    if self._total + len(opened) >= self.min_size:
+                        break
+                opened.append(self._new_connection())
+        finally:
+            now = time.monotonic()
+            with self._lock:
+                for conn in opened:
+                    self._total += 1
+                    self._idle.append((conn, now, now))
+                self._available.notify_all()
+
+    # -- checkout / checkin -------------------------------------------------
+
+    def _check_fork(self):
+        # Connections must never be shared across processes (uvicorn workers)
+        if self._pid != os.getpid():
+            self._idle.clear()
+            self._created.clear()
+            self._total = 0
+            self._pid = os.getpid()
+
+    def _checkout_problem(self, conn, created_at: float, returned_at: float) -> Optional[str]:
+        """None for a usable idle connection, else the counter to bump for dropping it"""
+        now = time.monotonic()
+        if conn.closed:
+            return "health_check_failures"
+        if self.recycle and now - created_at > self.recycle:
+            return "recycled"
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return "health_check_failures"
+        if self.pre_ping_after is not None and now - returned_at > self.pre_ping_after:
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT 1")
+                cur.close()
+                conn.rollback()
+            except Exception:
+                return "health_check_failures"
+        return None
+
+    def getconn(self):
+        """Check out a raw psycopg2 connection"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._available:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+                self._check_fork()
+                candidate = None
+                if self._idle:
+                    candidate = self._idle.pop()
+                elif self._total < self.pool_size + self.max_overflow:
+                    self._total += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"No DB connection available within {self.timeout}s "
+                            f"(pool_size={self.pool_size}, max_overflow={self.max_overflow})"
+                        )
+                    self._counters["waits"] += 1
+                    self._available.wait(remaining)
+                    continue
+
+            if candidate is not None:
+                conn, created_at, returned_at = candidate
+                problem = self._checkout_problem(conn, created_at, returned_at)
+                if problem:
+                    self._count(problem)
+                    self._discard(conn)
+                    continue
+            else:
+                try:
+                    conn = self._new_connection()
+                except Exception:
+                    with self._available:
+                        self._total -= 1
+                        self._available.notify()
+                    raise
+                created_at = time.monotonic()
+
+            with self._lock:
+                self._created[id(conn)] = created_at
+                self._counters["checkouts"] += 1
+                self._counters["peak_in_use"] = max(
+                    self._counters["peak_in_use"], len(self._created)
+                )
+            return conn
+
+    def putconn(self, conn):
+        """Return a connection to the pool, resetting any open transaction"""
+        with self._lock:
+            created_at = self._created.pop(id(conn), None)
+        if created_at is None:
+            # Not ours (or already returned) - just make sure it is closed
+            if not conn.closed:
+                conn.close()
+            return
+
+        reusable = not conn.closed
+        if reusable:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except Exception:
+                reusable = False
+
+        with self._available:
+            if reusable and not self._closed and self._pid == os.getpid() \
+                    and len(self._idle) < self.pool_size:
+                self._idle.append((conn, created_at, time.monotonic()))
+                self._available.notify()
+                return
+        self._discard(conn)
+
+    def _discard(self, conn):
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+        with self._available:
+            self._total = max(0, self._total - 1)
+            self._available.notify()
+
+    def closeall(self):
+        """Close every idle connection; checked-out ones are closed on return"""
+        with self._available:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        """Live pool figures for ConnectionPoolMonitor / metrics"""
+        with self._lock:
+            in_use = len(self._created)
+            return {
+                "active": in_use,
+                "idle": len(self._idle),
+                "total": self._total,
+                "overflow": max(0, self._total - self.pool_size),
+                "peak": self._counters["peak_in_use"],
+                "errors": self._counters["errors"],
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "min_size": self.min_size,
+                "recycle_seconds": self.recycle,
+                **{k: v for k, v in self._counters.items() if k not in ("peak_in_use", "errors")},
+            }
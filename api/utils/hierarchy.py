@@ -0,0 +1,178 @@
+"""
+KMS Hierarchy Index
+In-memory slug -> ID map for categories, subcategories and objects, so
+sync daemon and importer resolve a file path without queries
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_QUERIES = {
+    "categories": "SELECT id, slug FROM categories",
+    "subcategories": "SELECT id, category_id, slug FROM subcategories",
+    "objects": "SELECT id, category_id, subcategory_id, slug FROM objects",
+}
+
+
+def _values(row) -> tuple:
+    return tuple(row.values()) if isinstance(row, dict) else tuple(row)
+
+
+class HierarchyIndex:
+    """
+    (category slug, subcategory slug, object slug) -> (cat_id, sub_id, obj_id)
+
+    Loaded once; kept current with ``apply_changes`` (kms_changes events
+    for categories, subcategories and objects) and ``put_*`` after own
+    upserts. A miss falls back to one targeted query whose result is
+    cached, so only unknown slugs ever reach the database.
+    ``execute(sql, params)`` returns a list of rows (tuples or dicts).
+    """
+
+    def __init__(self, execute: Callable[[str, object], List[Sequence]]):
+        self._execute = execute
+        self._lock = threading.RLock()
+        self._categories: Dict[str, int] = {}                       # slug -> id
+        self._subcategories: Dict[Tuple[int, str], int] = {}        # (cat_id, slug) -> id
+        self._objects: Dict[Tuple[int, int, str], int] = {}         # (cat_id, sub_id or 0, slug) -> id
+        # id -> key, to drop stale keys on rename/delete
+        self._keys = {"categories": {}, "subcategories": {}, "objects": {}}
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "changes": 0}
+
+    # -- updates ----------------------------------------------------------------
+
+    def _maps(self):
+        return {"categories": self._categories, "subcategories": self._subcategories,
+                "objects": self._objects}
+
+    def _put(self, table: str, key, entity_id: int):
+        with self._lock:
+            self._remove(table, entity_id)
+            self._maps()[table][key] = entity_id
+            self._keys[table][entity_id] = key
+
+    def _remove(self, table: str, entity_id: int):
+        with self._lock:
+            key = self._keys[table].pop(entity_id, None)
+            if key is not None and self._maps()[table].get(key) == entity_id:
+                del self._maps()[table][key]
+
+    def put_category(self, category_id: int, slug: str):
+        self._put("categories", slug, category_id)
+
+    def put_subcategory(self, subcategory_id: int, category_id: int, slug: str):
+        self._put("subcategories", (category_id, slug), subcategory_id)
+
+    def put_object(self, object_id: int, category_id: int, subcategory_id: Optional[int], slug: str):
+        self._put("objects", (category_id, subcategory_id or 0, slug), object_id)
+
+    def _put_row(self, table: str, row):
+        values = _values(row)
+        if table == "categories":
+            self.put_category(*values)
+        elif table == "subcategories":
+            self.put_subcategory(*values)
+        else:
+            self.put_object(*values)
+
+    def load(self):
+        """(Re)load the whole hierarchy (three queries)"""
+        rows = {table: self._execute(query, None) for table, query in SNAPSHOT_QUERIES.items()}
+        with self._lock:
+            for mapping in self._maps().values():
+                mapping.clear()
+            for keys in self._keys.values():
+                keys.clear()
+            for table in SNAPSHOT_QUERIES:
+                for row in rows[table]:
+                    self._put_row(table, row)
+            self._stats["loads"] += 1
+        logger.info(f"Hierarchy index loaded: {len(self._categories)} categories, "
+                    f"{len(self._subcategories)} subcategories, {len(self._objects)} objects")
+
+    def apply_changes(self, events: List[dict]):
+        """Apply kms_changes notifications for the hierarchy tables"""
+        changed = {table: set() for table in SNAPSHOT_QUERIES}
+        for event in events:
+            table = event.get("table")
+            if table not in changed or event.get("id") is None:
+                continue
+            if event.get("action") == "DELETE":
+                self._remove(table, event["id"])
+            else:
+                changed[table].add(event["id"])
+            self._stats["changes"] += 1
+
+        for table, ids in changed.items():
+            if not ids:
+                continue
+            present = set()
+            for row in self._execute(f"{SNAPSHOT_QUERIES[table]} WHERE id = ANY(%s)", (list(ids),)):
+                self._put_row(table, row)
+                present.add(_values(row)[0])
+            for entity_id in ids - present:
+                self._remove(table, entity_id)
+
+    # -- lookups ----------------------------------------------------------------
+
+    def _lookup(self, table: str, key, where: str, params) -> Optional[int]:
+        with self._lock:
+            entity_id = self._maps()[table].get(key)
+        if entity_id is not None:
+            self._stats["hits"] += 1
+            return entity_id
+        self._stats["misses"] += 1
+        rows = self._execute(f"{SNAPSHOT_QUERIES[table]} WHERE {where}", params)
+        for row in rows:
+            self._put_row(table, row)
+        return _values(rows[0])[0] if rows else None
+
+    def category_id(self, cat_slug: str) -> Optional[int]:
+        return self._lookup("categories", cat_slug, "slug = %s", (cat_slug,))
+
+    def subcategory_id(self, category_id: int, sub_slug: str) -> Optional[int]:
+        return self._lookup("subcategories", (category_id, sub_slug),
+                            "category_id = %s AND slug = %s", (category_id, sub_slug))
+
+    def object_id(self, category_id: int, subcategory_id: Optional[int], obj_slug: str) -> Optional[int]:
+        return self._lookup(
+            "objects", (category_id, subcategory_id or 0, obj_slug),
+            "category_id = %s AND COALESCE(subcategory_id, 0) = COALESCE(%s, 0) AND slug = %s",
+            (category_id, subcategory_id, obj_slug)
+        )
+
+    def resolve(self, cat_slug: str, sub_slug: Optional[str] = None,
+                obj_slug: Optional[str] = None) -> Optional[Tuple[int, Optional[int], Optional[int]]]:
+        """
+        (cat_id, sub_id, obj_id) for a path prefix
+
+        Returns None when the category, a named subcategory or a named
+        object does not exist.
+        """
+        cat_id = self.category_id(cat_slug)
+        if cat_id is None:
+            return None
+        sub_id = None
+        if sub_slug:
+            sub_id = self.subcategory_id(cat_id, sub_slug)
+            if sub_id is None:
+                return None
+        obj_id = None
+        if obj_slug:
+            obj_id = self.object_id(cat_id, sub_id, obj_slug)
+            if obj_id is None:
+                return None
+        return cat_id, sub_id, obj_id
+
+    def categories(self) -> Dict[str, int]:
+        """slug -> id of all known categories"""
+        with self._lock:
+            return dict(self._categories)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, categories=len(self._categories),
+                        subcategories=len(self._subcategories), objects=len(self._objects))
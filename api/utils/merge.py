@@ -0,0 +1,130 @@
+"""
+KMS Three-Way Merge
+Line-based diff3 merge of a file and a DB row against their last-synced base
+"""
+
+import difflib
+from typing import List, NamedTuple, Optional, Tuple
+
+# choose_side() outcomes
+SIDE_FILE = "file"
+SIDE_DB = "db"
+MERGE = "merge"
+CONFLICT = "conflict"
+
+
+class MergeResult(NamedTuple):
+    text: str           # merged text; conflicting regions carry <<<<<<< / >>>>>>> markers
+    conflicts: int
+
+    @property
+    def clean(self) -> bool:
+        return self.conflicts == 0
+
+
+def _hunks(base: List[str], other: List[str]) -> List[Tuple[int, int, int, int]]:
+    """(base_start, base_end, other_start, other_end) of every changed region"""
+    matcher = difflib.SequenceMatcher(None, base, other, autojunk=False)
+    return [(i1, i2, j1, j2) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+def _apply(base: List[str], lo: int, hi: int, hunks, other: List[str]) -> List[str]:
+    """base[lo:hi] with the given hunks of one side applied"""
+    out, pos = [], lo
+    for i1, i2, j1, j2 in hunks:
+        out.extend(base[pos:i1])
+        out.extend(other[j1:j2])
+        pos = i2
+    out.extend(base[pos:hi])
+    return out
+
+
+def merge3(base: str, ours: str, theirs: str,
+           ours_label: str = "file", theirs_label: str = "db") -> MergeResult:
+    """
+    Merge two edits of ``base`` line by line
+
+    Changes that touch different lines are combined; identical changes on
+    both sides are taken once. Changes to the same or adjacent lines
+    are a conflict, as in diff3.
+    """
+    if ours == theirs:
+        return MergeResult(ours, 0)
+    if ours == base:
+        return MergeResult(theirs, 0)
+    if theirs == base:
+        return MergeResult(ours, 0)
+
+    base_lines = base.splitlines(keepends=True)
+    ours_lines = ours.splitlines(keepends=True)
+    theirs_lines = theirs.splitlines(keepends=True)
+
+    changes = sorted(
+        [(h, 0) for h in _hunks(base_lines, ours_lines)]
+        + [(h, 1) for h in _hunks(base_lines, theirs_lines)]
+    )
+
+    merged, conflicts, pos, i = [], 0, 0, 0
+    while i < len(changes):
+        # Group hunks whose base ranges overlap or touch
+        lo, hi = changes[i][0][0], changes[i][0][1]
+        group = [[], []]
+        while i < len(changes) and changes[i][0][0] <= hi:
+            hunk, side = changes[i]
+            group[side].append(hunk)
+            hi = max(hi, hunk[1])
+            i += 1
+
+        merged.extend(base_lines[pos:lo])
+        pos = hi
+        mine = _apply(base_lines, lo, hi, group[0], ours_lines)
+        other = _apply(base_lines, lo, hi, group[1], theirs_lines)
+        if not group[1] or mine == other:
+            merged.extend(mine)
+        elif not group[0]:
+            merged.extend(other)
+        else:
+            conflicts += 1
+            merged.append(f"<<<<<<< {ours_label}\n")
+            merged.extend(_terminated(mine))
+            merged.append("=======\n")
+            merged.extend(_terminated(other))
+            merged.append(f">>>>>>> {theirs_label}\n")
+    merged.extend(base_lines[pos:])
+    return MergeResult("".join(merged), conflicts)
+
+
+def _terminated(lines: List[str]) -> List[str]:
+    if lines and not lines[-1].endswith("\n"):
+        return lines[:-1] + [lines[-1] + "\n"]
+    return lines
+
+
+def choose_side(base: Optional[str], file_sha: Optional[str], db_sha: Optional[str],
+                conflict=None, incoming: str = SIDE_FILE) -> str:
+    """
+    Which side of a document wins when file and row checksums differ
+
+    ``base`` is the checksum both had at the last sync. Only one side
+    moved away from it: that side wins. Both moved: MERGE. Without a
+    base (never synced) the side that just changed, ``incoming``, wins.
+    After a recorded ``conflict`` (file_sha256, db_sha256) the first side
+    to change again wins; until then it stays CONFLICT.
+    """
+    if file_sha is None:
+        return SIDE_DB
+    if db_sha is None:
+        return SIDE_FILE
+    if conflict is not None:
+        if file_sha != conflict.file_sha256:
+            return SIDE_FILE
+        if db_sha != conflict.db_sha256:
+            return SIDE_DB
+        return CONFLICT
+    if base is None:
+        return incoming
+    if db_sha == base:
+        return SIDE_FILE
+    if file_sha == base:
+        return SIDE_DB
+    return MERGE
@@ -0,0 +1,94 @@
+"""
+KMS Own-Write Registry
+Writes the sync daemon made itself, so the file events and kms_changes
+notifications they echo back are dropped instead of being synced again
+"""
+
+import os
+import time
+import threading
+from typing import Dict, Hashable, NamedTuple, Optional
+
+# A write whose echo never arrives (e.g. the event was coalesced away) is forgotten after this
+OWN_WRITE_TTL_SECONDS = float(os.getenv("KMS_SYNC_OWN_WRITE_TTL", "30"))
+
+
+class OwnWrite(NamedTuple):
+    checksum: Optional[str]
+    fingerprint: object         # e.g. (size, mtime_ns) of a written file; None = any
+    generation: int
+    expires: float
+
+
+class OwnWrites:
+    """
+    key -> the daemon's latest write to it (checksum, fingerprint, generation)
+
+    Record a write *before* it becomes visible (file rename, commit), so
+    its echo can never arrive first. ``is_echo`` matches an event against
+    the record: a file event matches while the file still has the
+    recorded fingerprint; a mismatch means someone else wrote since and
+    drops the record. Generations let a failed write withdraw its own
+    record without clobbering a newer one.
+    """
+
+    def __init__(self, ttl: float = OWN_WRITE_TTL_SECONDS):
+        self.ttl = ttl
+        self._writes: Dict[Hashable, OwnWrite] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {"recorded": 0, "echoes": 0, "expired": 0}
+
+    def __contains__(self, key) -> bool:
+        return key in self._writes
+
+    def record(self, key: Hashable, checksum: Optional[str] = None, fingerprint=None) -> int:
+        now = time.monotonic()
+        with self._lock:
+            self._generation += 1
+            self._writes[key] = OwnWrite(checksum, fingerprint, self._generation, now + self.ttl)
+            self._stats["recorded"] += 1
+            if self._stats["recorded"] % 1000 == 0:
+                self._expire(now)
+            return self._generation
+
+    def forget(self, key: Hashable, generation: Optional[int] = None):
+        """Withdraw a record (write failed); only if it is still ``generation``"""
+        with self._lock:
+            write = self._writes.get(key)
+            if write is not None and (generation is None or write.generation == generation):
+                del self._writes[key]
+
+    def is_echo(self, key: Hashable, fingerprint=None, consume: bool = False) -> bool:
+        """
+        True if an event for ``key`` is the echo of the recorded write
+
+        ``consume`` drops the record on a match (exactly one echo per
+        write, like a row notification); file writes echo several events.
+        """
+        now = time.monotonic()
+        with self._lock:
+            write = self._writes.get(key)
+            if write is None:
+                return False
+            if write.expires < now:
+                del self._writes[key]
+                self._stats["expired"] += 1
+                return False
+            if write.fingerprint is not None and write.fingerprint != fingerprint:
+                del self._writes[key]
+                return False
+            if consume:
+                del self._writes[key]
+            self._stats["echoes"] += 1
+            return True
+
+    def _expire(self, now: float):
+        expired = [key for key, write in self._writes.items() if write.expires < now]
+        for key in expired:
+            del self._writes[key]
+        self._stats["expired"] += len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, pending=len(self._writes))
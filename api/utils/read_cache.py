@@ -0,0 +1,62 @@
+"""
+KMS Read Cache
+Cache namespaces of the hot read endpoints (hierarchy lists, objects
+list, system stats) and their invalidation from API writes and
+kms_changes notifications (sync daemon and other out-of-band writes)
+"""
+
+import os
+import logging
+from typing import Dict, Iterable, List
+
+from utils.cache import invalidate_cache, invalidate_tags
+
+logger = logging.getLogger(__name__)
+
+READ_CACHE_TTL = int(os.getenv("READ_CACHE_TTL", "300"))
+# change_log and sync_status publish no notifications; their counts age out
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "60"))
+
+# Table -> cache namespaces (key prefixes) whose entries read it
+TABLE_NAMESPACES = {
+    "categories": ("categories", "objects", "stats"),      # v_objects_full carries category names
+    "subcategories": ("subcategories", "objects", "stats"),
+    "objects": ("objects", "stats"),
+    "documents": ("stats",),
+}
+ALL_NAMESPACES = tuple(sorted({ns for namespaces in TABLE_NAMESPACES.values() for ns in namespaces}))
+
+
+def namespaces_for(tables: Iterable[str]) -> List[str]:
+    """Namespaces to invalidate after writes to ``tables`` (unknown tables: none)"""
+    return sorted({ns for table in tables for ns in TABLE_NAMESPACES.get(table, ())})
+
+
+def invalidate_tables(*tables: str) -> int:
+    return invalidate_tags(*namespaces_for(tables))
+
+
+def invalidates(*tables: str):
+    """
+    Decorator for write handlers: invalidate the readers of ``tables``
+
+    Runs once the handler has returned, i.e. after its commit, so a read
+    racing the write cannot cache the old rows under the new versions.
+    Failed writes raise and invalidate nothing.
+    """
+    return invalidate_cache(tags=namespaces_for(tables))
+
+
+def apply_changes(events: List[Dict]):
+    """Change feed subscriber: one invalidation per batch of notifications"""
+    invalidate_tables(*{event.get("table") for event in events})
+
+
+def resync():
+    """Notifications sent while the feed was disconnected are lost; drop everything"""
+    invalidate_tags(*ALL_NAMESPACES)
+
+
+def start_read_cache_invalidation(change_feed):
+    """Invalidate the read cache from ``change_feed`` (before it is started)"""
+    change_feed.subscribe(apply_changes, resync)
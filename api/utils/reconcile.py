@@ -0,0 +1,140 @@
+"""
+KMS Startup Reconciliation
+Parallel directory walk and a bulk (filepath, size, checksum) diff against
+the documents table, for changes made while the sync daemon was down
+"""
+
+import os
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from utils.sync_manifest import ManifestEntry
+
+logger = logging.getLogger(__name__)
+
+# scandir/stat and hashing release the GIL, so threads scale on I/O
+SCAN_JOBS = int(os.getenv("KMS_SYNC_SCAN_JOBS", str(min(32, (os.cpu_count() or 1) * 4))))
+
+
+def _scan_dir(path: str, rel: str) -> Tuple[List[Tuple[str, int, int]], List[Tuple[str, str]]]:
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                # Hidden files and directories are never synced
+                if entry.name.startswith("."):
+                    continue
+                entry_rel = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append((entry.path, entry_rel))
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        files.append((entry_rel, st.st_size, st.st_mtime_ns))
+                except OSError:
+                    continue    # removed while scanning
+    except OSError as e:
+        logger.warning(f"Cannot scan {path}: {e}")
+    return files, subdirs
+
+
+def scan_tree(root, relative_to=None, jobs: int = SCAN_JOBS,
+              include: Optional[Callable[[str], bool]] = None) -> Dict[str, Tuple[int, int]]:
+    """
+    rel path -> (size, mtime_ns) of the regular files below ``root``
+
+    Every directory is listed as its own task on a thread pool, so wide
+    and deep trees are walked concurrently. Paths are relative to
+    ``relative_to`` (default ``root``) with '/' separators; ``include``
+    filters them.
+    """
+    root = str(root)
+    rel = os.path.relpath(root, str(relative_to)) if relative_to is not None else ""
+    rel = "" if rel == "." else rel.replace(os.sep, "/")
+
+    result = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="kms-scan") as executor:
+        pending = {executor.submit(_scan_dir, root, rel)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                for path, size, mtime_ns in files:
+                    if include is None or include(path):
+                        result[path] = (size, mtime_ns)
+                for path, sub_rel in subdirs:
+                    pending.add(executor.submit(_scan_dir, path, sub_rel))
+    return result
+
+
+class ReconcilePlan(NamedTuple):
+    upload: List[str]       # file changed or new -> DB
+    delete: List[str]       # file removed since last sync -> delete row
+    export: List[str]       # row changed or never written -> file
+    in_sync: List[tuple]    # (path, size, mtime_ns, sha256) confirmed by hashing
+    hashed: int
+
+
+def plan_reconcile(files: Dict[str, Tuple[int, int]],
+                   documents: Dict[str, Tuple[Optional[int], Optional[str]]],
+                   manifest: Dict[str, ManifestEntry],
+                   hash_file: Callable[[str], str],
+                   jobs: int = SCAN_JOBS) -> ReconcilePlan:
+    """
+    Diff the scanned tree against documents {filepath: (size_bytes, checksum)}
+
+    The manifest tells which side moved: a file whose stat still matches
+    its entry is unchanged since the last sync, so a different DB
+    checksum means the row changed (export). Other files are hashed, in
+    parallel: content still equal to the entry means only the row
+    changed (export), otherwise the file is uploaded (the daemon merges
+    if the row changed too). Files without an entry whose size differs
+    from the row are uploaded without hashing. A row without a file is
+    deleted if the file was synced before, else exported.
+    """
+    upload, delete, export, to_hash = [], [], [], []
+
+    for path, (size, mtime_ns) in files.items():
+        entry = manifest.get(path)
+        unchanged = entry is not None and entry.size == size and entry.mtime_ns == mtime_ns
+        row = documents.get(path)
+        if row is None:
+            upload.append(path)
+        elif unchanged:
+            if entry.sha256 != row[1]:
+                export.append(path)
+        elif entry is None and row[0] != size:
+            upload.append(path)
+        else:
+            to_hash.append(path)
+
+    for path in documents:
+        if path not in files:
+            (delete if path in manifest else export).append(path)
+
+    in_sync = []
+    if to_hash:
+        with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="kms-hash") as executor:
+            for path, checksum in zip(to_hash, executor.map(_safe_hash(hash_file), to_hash)):
+                if checksum is None:
+                    continue
+                entry = manifest.get(path)
+                if checksum == documents[path][1]:
+                    size, mtime_ns = files[path]
+                    in_sync.append((path, size, mtime_ns, checksum))
+                elif entry is not None and checksum == entry.sha256:
+                    export.append(path)
+                else:
+                    upload.append(path)
+
+    return ReconcilePlan(upload, delete, export, in_sync, len(to_hash))
+
+
+def _safe_hash(hash_file: Callable[[str], str]) -> Callable[[str], Optional[str]]:
+    def run(path):
+        try:
+            return hash_file(path)
+        except OSError:
+            return None     # removed since the scan; the watcher has it
+    return run
@@ -0,0 +1,182 @@
+"""
+KMS Search Pages
+One-statement full-text search page: keyset-paginated hits with
+ts_headline snippets, total and facet counts (shared by API and CLI)
+"""
+
+import re
+import json
+import html
+import base64
+from typing import Dict, Optional, Tuple
+
+SEARCH_FACETS = ("category", "subcategory", "folder", "content_type")
+SEARCH_MODES = ("document", "chunk")
+
+# Highlight markers inside ts_headline output; rendered per client
+SNIPPET_START = "\x02"
+SNIPPET_STOP = "\x03"
+SNIPPET_OPTIONS = (
+    f'StartSel="{SNIPPET_START}", StopSel="{SNIPPET_STOP}", '
+    'MaxFragments=2, MaxWords=25, MinWords=8, FragmentDelimiter=" … "'
+)
+
+_FILTER_COLUMNS = {
+    "category": "c.slug",
+    "subcategory": "sc.slug",
+    "folder": "d.folder",
+    "content_type": "d.content_type",
+}
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was not produced by encode_cursor()"""
+
+
+def encode_cursor(rank, document_id: int, chunk_no: int = 0) -> str:
+    """Opaque keyset cursor; rank is kept as text to round-trip the exact real"""
+    raw = json.dumps([str(rank), document_id, chunk_no], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, document_id, chunk_no = json.loads(raw)
+        float(rank)
+        return str(rank), int(document_id), int(chunk_no)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid search cursor: {cursor!r}") from e
+
+
+def build_search_page_query(q: str, limit: int, cursor: Optional[str] = None,
+                            filters: Optional[Dict[str, str]] = None,
+                            with_facets: bool = True, mode: str = "document"):
+    """
+    Build the search-page statement; returns (sql, params)
+
+    The result is a single row (hits, total, has_more, facets). All parts
+    read the same ``matches`` CTE, so the index scan and ranking run once;
+    ts_headline runs only for the rows of the returned page.
+    Order is rank DESC, id DESC, chunk_no DESC; the cursor is the last
+    key seen. In "chunk" mode every hit is one matching document_chunks
+    row (heading, offsets); facets still count documents.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode: {mode}")
+    params = {"q": q, "limit": limit, "options": SNIPPET_OPTIONS}
+
+    if mode == "chunk":
+        source = "JOIN document_chunks ch ON ch.document_id = d.id"
+        vector = "ch.search_vector"
+        chunk_columns = "ch.chunk_no, ch.heading, ch.start_offset, ch.end_offset"
+        snippet_source = "JOIN document_chunks t ON t.document_id = p.id AND t.chunk_no = p.chunk_no"
+    else:
+        source = ""
+        vector = "d.search_vector"
+        chunk_columns = ("0 AS chunk_no, NULL::text AS heading, "
+                         "NULL::integer AS start_offset, NULL::integer AS end_offset")
+        snippet_source = "JOIN documents t ON t.id = p.id"
+
+    conditions = [f"{vector} @@ query.tsq"]
+    for name, value in (filters or {}).items():
+        if value is None:
+            continue
+        if name not in _FILTER_COLUMNS:
+            raise ValueError(f"Unknown search filter: {name}")
+        conditions.append(f"{_FILTER_COLUMNS[name]} = %({name})s")
+        params[name] = value
+
+    keyset = "TRUE"
+    if cursor:
+        params["after_rank"], params["after_id"], params["after_chunk"] = decode_cursor(cursor)
+        keyset = ("(m.rank, m.id, m.chunk_no) < "
+                  "(%(after_rank)s::real, %(after_id)s, %(after_chunk)s)")
+
+    facets_sql = "NULL::json"
+    if with_facets:
+        facets_sql = "json_build_object({})".format(", ".join(
+            f"""'{facet}', (SELECT COALESCE(json_agg(json_build_object('value', value, 'count', n)
+                                         ORDER BY n DESC, value), '[]'::json)
+                     FROM (SELECT {facet} AS value, count(DISTINCT id) AS n
+                           FROM matches GROUP BY {facet}) f)"""
+            for facet in SEARCH_FACETS
+        ))
+
+    sql = f"""
+        WITH query AS (
+            SELECT plainto_tsquery('english', %(q)s) AS tsq
+        ),
+        matches AS MATERIALIZED (
+            SELECT d.id, d.object_id, o.name AS object_name,
+                   c.slug AS category, sc.slug AS subcategory,
+                   d.folder, d.filename, d.content_type,
+                   {chunk_columns},
+                   ts_rank({vector}, query.tsq) AS rank
+            FROM documents d
+            {source}
+            JOIN objects o ON d.object_id = o.id
+            JOIN categories c ON o.category_id = c.id
+            LEFT JOIN subcategories sc ON o.subcategory_id = sc.id
+            CROSS JOIN query
+            WHERE {" AND ".join(conditions)}
+        ),
+        page AS (
+            SELECT m.* FROM matches m
+            WHERE {keyset}
+            ORDER BY m.rank DESC, m.id DESC, m.chunk_no DESC
+            LIMIT %(limit)s + 1
+        ),
+        hits AS (
+            SELECT p.*,
+                   ts_headline('english', COALESCE(t.content, ''), query.tsq, %(options)s) AS snippet
+            FROM (SELECT * FROM page ORDER BY rank DESC, id DESC, chunk_no DESC LIMIT %(limit)s) p
+            {snippet_source}
+            CROSS JOIN query
+        )
+        SELECT
+            (SELECT COALESCE(json_agg(json_build_object(
+                        'document_id', h.id, 'object_id', h.object_id,
+                        'object_name', h.object_name, 'category', h.category,
+                        'subcategory', h.subcategory, 'folder', h.folder,
+                        'filename', h.filename, 'content_type', h.content_type,
+                        'chunk_no', h.chunk_no, 'heading', h.heading,
+                        'start_offset', h.start_offset, 'end_offset', h.end_offset,
+                        'rank', h.rank::text, 'snippet', h.snippet)
+                    ORDER BY h.rank DESC, h.id DESC, h.chunk_no DESC), '[]'::json)
+             FROM hits h) AS hits,
+            (SELECT count(*) FROM matches) AS total,
+            (SELECT count(*) > %(limit)s FROM page) AS has_more,
+            {facets_sql} AS facets
+    """
+    return sql, params
+
+
+def parse_search_page(row) -> dict:
+    """Turn the single result row into {results, total, facets, next_cursor}"""
+    if isinstance(row, dict):
+        hits, total, has_more, facets = row["hits"], row["total"], row["has_more"], row["facets"]
+    else:
+        hits, total, has_more, facets = row
+    if isinstance(hits, str):
+        hits = json.loads(hits)
+    if isinstance(facets, str):
+        facets = json.loads(facets)
+
+    next_cursor = None
+    if has_more and hits:
+        last = hits[-1]
+        next_cursor = encode_cursor(last["rank"], last["document_id"], last.get("chunk_no") or 0)
+    for hit in hits:
+        hit["rank"] = float(hit["rank"])
+    return {"results": hits, "total": total, "facets": facets, "next_cursor": next_cursor}
+
+
+def render_snippet(snippet: Optional[str], start: str = "<mark>", stop: str = "</mark>",
+                   escape_html: bool = True) -> str:
+    """Replace the highlight markers; HTML-escapes the document text by default"""
+    if not snippet:
+        return ""
+    text = html.escape(snippet, quote=False) if escape_html else snippet
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.replace(SNIPPET_START, start).replace(SNIPPET_STOP, stop)
@@ -0,0 +1,79 @@
+"""
+KMS Sync Sharding
+Consistent hashing of category slugs onto sync daemon worker processes,
+and aggregation of the workers' stats for the supervisor
+"""
+
+import bisect
+import hashlib
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# Virtual nodes per shard; more = more even spread of categories
+SHARD_VNODES = 64
+
+# Queue counters that add up across workers; gauges take the worst worker
+SUMMED_QUEUE_STATS = ("depth", "events", "coalesced", "batches", "applied")
+MAX_QUEUE_STATS = ("oldest_pending_seconds", "last_apply_lag_seconds")
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class ConsistentHashRing:
+    """
+    key -> shard index on a hash ring with ``vnodes`` points per shard
+
+    Going from N to N+1 shards moves only ~1/(N+1) of the keys, so a
+    resized daemon re-scans few categories.
+    """
+
+    def __init__(self, shards: int, vnodes: int = SHARD_VNODES):
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        self.shards = shards
+        points = sorted((_hash(f"shard-{shard}#{vnode}"), shard)
+                        for shard in range(shards) for vnode in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._shards[i]
+
+
+@lru_cache(maxsize=None)
+def _ring(shards: int) -> ConsistentHashRing:
+    return ConsistentHashRing(shards)
+
+
+def category_shard(cat_slug: str, shards: int) -> int:
+    """Shard (worker index) that owns a category"""
+    return _ring(shards).shard_for(cat_slug)
+
+
+def aggregate_worker_stats(workers: List[dict], shard_stats: Dict[int, Optional[dict]]) -> dict:
+    """
+    Supervisor view of all workers, in the single-daemon stats layout
+
+    ``workers`` are the supervisor's records (shard, pid, alive,
+    restarts); ``shard_stats`` each worker's own stats file (or None).
+    """
+    queue = {key: 0 for key in SUMMED_QUEUE_STATS + MAX_QUEUE_STATS}
+    connected = bool(shard_stats)
+    for stats in shard_stats.values():
+        worker_queue = (stats or {}).get("queue", {})
+        for key in SUMMED_QUEUE_STATS:
+            queue[key] += worker_queue.get(key, 0)
+        for key in MAX_QUEUE_STATS:
+            queue[key] = max(queue[key], worker_queue.get(key, 0))
+        connected = connected and bool((stats or {}).get("change_feed", {}).get("connected"))
+
+    return {
+        "mode": "supervisor",
+        "queue": queue,
+        "change_feed": {"connected": connected},
+        "workers": workers,
+        "shards": {str(shard): stats for shard, stats in shard_stats.items()},
+    }
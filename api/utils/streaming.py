@@ -0,0 +1,150 @@
+"""
+KMS Streaming Responses
+Chunked bodies with single-range HTTP Range (206) and ETag/If-None-Match
+support, for content that must never be held in memory as a whole
+"""
+
+import os
+import re
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", str(64 * 1024)))
+
+_RANGE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
+
+
+class RangeNotSatisfiable(Exception):
+    """Range header that selects no byte of the representation"""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a Range header into an inclusive (start, end)
+
+    Returns None for no/unsupported (multi-range, malformed) headers, in
+    which case the full body is sent, as RFC 9110 allows. Nothing of an
+    empty body is satisfiable.
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header)
+    if not match:
+        return None
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        # Suffix range: last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(header: Optional[str], etag: Optional[str]) -> bool:
+    """Weak comparison for If-None-Match"""
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+
+def ranged_response(
+    request: Request,
+    *,
+    size: int,
+    open_stream: Callable[[int, int], Iterator[bytes]],
+    media_type: str,
+    etag: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    release: Optional[Callable[[], None]] = None,
+) -> Response:
+    """
+    Build a 200/206/304/416 response around ``open_stream(start, end)``
+
+    ``open_stream`` yields the bytes start..end (inclusive) in pieces; it
+    is only called when a body is actually sent. ``release`` frees
+    resources held for the stream: called right away when no body will
+    be streamed (304/416), otherwise once the response has finished,
+    also after a client disconnect or for an empty body. It may run
+    after ``open_stream``'s own cleanup and must be idempotent.
+    """
+    base_headers = {"Accept-Ranges": "bytes", **(headers or {})}
+    if etag:
+        base_headers["ETag"] = etag
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        if release:
+            release()
+        return Response(status_code=304, headers=base_headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or (etag and if_range.strip() == etag and not etag.startswith("W/")):
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            if release:
+                release()
+            return Response(status_code=416, headers={**base_headers, "Content-Range": f"bytes */{size}"})
+
+    background = BackgroundTask(release) if release else None
+    if byte_range is None:
+        body = open_stream(0, size - 1) if size else iter(())
+        return StreamingResponse(
+            body, media_type=media_type,
+            headers={**base_headers, "Content-Length": str(size)},
+            background=background,
+        )
+
+    start, end = byte_range
+    return StreamingResponse(
+        open_stream(start, end),
+        status_code=206,
+        media_type=media_type,
+        background=background,
+        headers={
+            **base_headers,
+            "Content-Range": f"bytes {start}-{end}/{size}",
+            "Content-Length": str(end - start + 1),
+        },
+    )
+
+
+def iter_file_range(fileobj, start: int, end: int, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield bytes start..end (inclusive) from a binary stream, closing it afterwards"""
+    try:
+        if start:
+            if fileobj.seekable():
+                fileobj.seek(start)
+            else:
+                remaining = start
+                while remaining > 0:
+                    skipped = fileobj.read(min(chunk_size, remaining))
+                    if not skipped:
+                        return
+                    remaining -= len(skipped)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = fileobj.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        fileobj.close()
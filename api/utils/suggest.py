@@ -0,0 +1,332 @@
+"""
+KMS Search Suggestions
+Autocomplete over object names and document filenames:
+trigram/prefix indexed SQL plus an optional in-memory prefix index
+kept current from the kms_changes feed
+"""
+
+import os
+import re
+import time
+import bisect
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_PREFIX_INDEX = os.getenv("SUGGEST_PREFIX_INDEX", "true").lower() == "true"
+SUGGEST_REFRESH_INTERVAL = int(os.getenv("SUGGEST_REFRESH_INTERVAL", "600"))
+SUGGEST_MAX_INCREMENTAL = int(os.getenv("SUGGEST_MAX_INCREMENTAL", "500"))
+# Below this length trigrams are useless; only anchored prefixes are searched
+SUGGEST_MIN_TRIGRAM_LENGTH = 3
+
+SUGGEST_TYPES = ("object", "document")
+
+_WORD_START = re.compile(r"(?<![^\W_])[^\W_]|(?<=[_\-.])[^\W_]")
+
+
+def normalize(text: str) -> str:
+    return (text or "").casefold()
+
+
+def _word_starts(name: str):
+    """Offsets where a word starts ("install-guide.md" -> 0, 8, 14)"""
+    return sorted({0} | {m.start() for m in _WORD_START.finditer(name)})
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index (a flattened trie)
+
+    Every name is indexed at each word start, so "guide" finds
+    "Install Guide". Lookup is a bisect plus a scan of the matching range.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[str, str, int]] = []     # (suffix, type, id)
+        self._entries: Dict[Tuple[str, int], dict] = {}
+        self._entry_keys: Dict[Tuple[str, int], List[Tuple[str, str, int]]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _keys_for(entry: dict):
+        name = normalize(entry["title"])
+        return [(name[offset:], entry["type"], entry["id"]) for offset in _word_starts(name)]
+
+    def load(self, entries):
+        """Replace the whole index"""
+        new_entries, new_entry_keys, keys = {}, {}, []
+        for entry in entries:
+            ref = (entry["type"], entry["id"])
+            entry_keys = self._keys_for(entry)
+            new_entries[ref] = entry
+            new_entry_keys[ref] = entry_keys
+            keys.extend(entry_keys)
+        keys.sort()
+        with self._lock:
+            self._keys, self._entries, self._entry_keys = keys, new_entries, new_entry_keys
+
+    def upsert(self, entry: dict):
+        with self._lock:
+            self.remove(entry["type"], entry["id"])
+            ref = (entry["type"], entry["id"])
+            entry_keys = self._keys_for(entry)
+            for key in entry_keys:
+                bisect.insort(self._keys, key)
+            self._entries[ref] = entry
+            self._entry_keys[ref] = entry_keys
+
+    def remove(self, entry_type: str, entry_id: int):
+        with self._lock:
+            ref = (entry_type, entry_id)
+            for key in self._entry_keys.pop(ref, []):
+                index = bisect.bisect_left(self._keys, key)
+                if index < len(self._keys) and self._keys[index] == key:
+                    del self._keys[index]
+            self._entries.pop(ref, None)
+
+    def lookup(self, prefix: str, limit: int, max_scan: int = 2000) -> Dict[str, List[dict]]:
+        """
+        Prefix matches per type, best first: whole-name prefix before
+        word prefix, then shorter titles (closest to what was typed)
+        """
+        prefix = normalize(prefix)
+        found: Dict[Tuple[str, int], Tuple[int, int, str]] = {}
+        with self._lock:
+            index = bisect.bisect_left(self._keys, (prefix,))
+            for key in self._keys[index:index + max_scan]:
+                suffix, entry_type, entry_id = key
+                if not suffix.startswith(prefix):
+                    break
+                name = normalize(self._entries[(entry_type, entry_id)]["title"])
+                whole = 0 if len(suffix) == len(name) else 1
+                best = found.get((entry_type, entry_id))
+                rank = (whole, len(name), name)
+                if best is None or rank < best:
+                    found[(entry_type, entry_id)] = rank
+            entries = self._entries
+
+        results = {entry_type: [] for entry_type in SUGGEST_TYPES}
+        for ref, rank in sorted(found.items(), key=lambda item: item[1]):
+            bucket = results[ref[0]]
+            if len(bucket) < limit:
+                bucket.append(dict(entries[ref], score=2.5 if rank[0] == 0 else 2.0))
+        return results
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_suggest_query(q: str, limit: int):
+    """
+    One statement for both suggestion types
+
+    Score = trigram similarity + 1.5 for a whole-name prefix match
+    (+1.0 for a word prefix), so typed prefixes always rank above
+    fuzzy-only matches (similarity <= 1).
+    Short inputs use only the lower(name) text_pattern_ops prefix indexes.
+    """
+    needle = normalize(q)
+    params = {
+        "q": q,
+        "prefix": _like_escape(needle) + "%",
+        "word": r"\m" + re.escape(needle),
+        "contains": "%" + _like_escape(needle) + "%",
+        "limit": limit,
+    }
+    if len(needle) >= SUGGEST_MIN_TRIGRAM_LENGTH:
+        object_match = "o.name ILIKE %(contains)s OR o.name %% %(q)s"
+        document_match = "d.filename ILIKE %(contains)s OR d.filename %% %(q)s"
+    else:
+        object_match = "lower(o.name) LIKE %(prefix)s"
+        document_match = "lower(d.filename) LIKE %(prefix)s"
+
+    query = f"""
+        (SELECT 'object' AS type, o.id, o.name AS title, c.name AS context,
+                similarity(o.name, %(q)s)
+                + CASE WHEN lower(o.name) LIKE %(prefix)s THEN 1.5
+                       WHEN o.name ~* %(word)s THEN 1.0 ELSE 0 END AS score
+         FROM objects o
+         JOIN categories c ON o.category_id = c.id
+         WHERE {object_match}
+         ORDER BY score DESC, length(o.name), o.name
+         LIMIT %(limit)s)
+        UNION ALL
+        (SELECT 'document' AS type, d.id, d.filename AS title, o.name AS context,
+                similarity(d.filename, %(q)s)
+                + CASE WHEN lower(d.filename) LIKE %(prefix)s THEN 1.5
+                       WHEN d.filename ~* %(word)s THEN 1.0 ELSE 0 END AS score
+         FROM documents d
+         JOIN objects o ON d.object_id = o.id
+         WHERE {document_match}
+         ORDER BY score DESC, length(d.filename), d.filename
+         LIMIT %(limit)s)
+    """
+    return query, params
+
+
+SNAPSHOT_QUERIES = {
+    "object": """
+        SELECT 'object' AS type, o.id, o.name AS title, c.name AS context
+        FROM objects o
+        JOIN categories c ON o.category_id = c.id
+    """,
+    "document": """
+        SELECT 'document' AS type, d.id, d.filename AS title, o.name AS context
+        FROM documents d
+        JOIN objects o ON d.object_id = o.id
+    """,
+}
+
+_CHANGE_TABLES = {"objects": "object", "documents": "document"}
+
+
+class SuggestEngine:
+    """
+    Autocomplete front end
+
+    With the prefix index enabled and loaded, a request is answered from
+    memory when every type already has ``limit`` prefix matches (fuzzy-only
+    matches always rank below those); otherwise the SQL path runs.
+    """
+
+    def __init__(self, execute: Callable[[str, object], List[dict]],
+                 use_prefix_index: bool = SUGGEST_PREFIX_INDEX,
+                 refresh_interval: int = SUGGEST_REFRESH_INTERVAL):
+        self._execute = execute
+        self.use_prefix_index = use_prefix_index
+        self.refresh_interval = refresh_interval
+        self.index = PrefixIndex()
+        self._loaded_at: Optional[float] = None
+        self._load_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "db_queries": 0, "reloads": 0, "incremental_updates": 0}
+
+    # -- lookups --------------------------------------------------------------
+
+    def suggest(self, q: str, limit: int) -> Tuple[Dict[str, List[dict]], str]:
+        """Return ({type: [suggestion, ...]}, source)"""
+        if self.ready:
+            results = self.index.lookup(q, limit)
+            if all(len(results[entry_type]) >= limit for entry_type in SUGGEST_TYPES):
+                self._stats["memory_hits"] += 1
+                return results, "memory"
+
+        self._stats["db_queries"] += 1
+        query, params = build_suggest_query(q, limit)
+        results = {entry_type: [] for entry_type in SUGGEST_TYPES}
+        for row in self._execute(query, params):
+            results[row["type"]].append(dict(row, score=round(float(row["score"]), 4)))
+        return results, "database"
+
+    @property
+    def ready(self) -> bool:
+        return self.use_prefix_index and self._loaded_at is not None
+
+    # -- maintenance (change feed thread) ---------------------------------------
+
+    def reload(self):
+        """Rebuild the prefix index from the database"""
+        if not self.use_prefix_index:
+            return
+        with self._load_lock:
+            entries = []
+            for query in SNAPSHOT_QUERIES.values():
+                entries.extend(dict(row) for row in self._execute(query, None))
+            self.index.load(entries)
+            self._loaded_at = time.monotonic()
+            self._stats["reloads"] += 1
+        logger.info(f"Suggest prefix index loaded: {len(self.index)} names")
+
+    def apply_changes(self, events: List[dict]):
+        """Apply kms_changes notifications; large bursts trigger a full reload"""
+        if not self.use_prefix_index or self._loaded_at is None:
+            return
+        changed = {entry_type: set() for entry_type in SUGGEST_TYPES}
+        for event in events:
+            entry_type = _CHANGE_TABLES.get(event.get("table"))
+            if entry_type is not None and event.get("id") is not None:
+                changed[entry_type].add(event["id"])
+        total = sum(len(ids) for ids in changed.values())
+        if total == 0:
+            return
+        if total > SUGGEST_MAX_INCREMENTAL:
+            self.reload()
+            return
+
+        with self._load_lock:
+            for entry_type, ids in changed.items():
+                if not ids:
+                    continue
+                alias = "o" if entry_type == "object" else "d"
+                rows = self._execute(
+                    SNAPSHOT_QUERIES[entry_type] + f" WHERE {alias}.id = ANY(%s)",
+                    (list(ids),)
+                )
+                present = set()
+                for row in rows:
+                    self.index.upsert(dict(row))
+                    present.add(row["id"])
+                for entry_id in ids - present:
+                    self.index.remove(entry_type, entry_id)
+            self._stats["incremental_updates"] += total
+
+    def refresh_if_stale(self):
+        """
+        Periodic full reload: category renames change the context of
+        indexed names without a row event for them
+        """
+        if self._loaded_at is not None and \
+                time.monotonic() - self._loaded_at >= self.refresh_interval:
+            self.reload()
+
+    def stats(self) -> dict:
+        return dict(self._stats, entries=len(self.index), ready=self.ready)
+
+
+def _execute_pooled(query: str, params) -> List[dict]:
+    from database import get_db_cursor
+    with get_db_cursor() as (cur, conn):
+        cur.execute(query, params)
+        return cur.fetchall()
+
+
+_engine: Optional[SuggestEngine] = None
+_engine_lock = threading.Lock()
+_refresher: Optional[threading.Thread] = None
+
+
+def get_suggest_engine() -> SuggestEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SuggestEngine(_execute_pooled)
+    return _engine
+
+
+def start_suggest_index(change_feed):
+    """Load the prefix index and keep it current from ``change_feed``"""
+    global _refresher
+    engine = get_suggest_engine()
+    if not engine.use_prefix_index:
+        return engine
+    # on_resync runs after every (re)connect, which also covers the first load
+    change_feed.subscribe(engine.apply_changes, engine.reload)
+
+    def refresh_loop():
+        while True:
+            time.sleep(max(1, engine.refresh_interval // 4))
+            try:
+                engine.refresh_if_stale()
+            except Exception as e:
+                logger.warning(f"Suggest index refresh failed: {e}")
+
+    if _refresher is None:
+        _refresher = threading.Thread(target=refresh_loop, name="kms-suggest-refresh", daemon=True)
+        _refresher.start()
+    return engine
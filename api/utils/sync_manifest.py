@@ -0,0 +1,175 @@
+"""
+KMS Sync Manifest
+Local SQLite record of (path, size, mtime_ns, sha256) for synced files,
+so unchanged files are recognised from a stat() alone; also keeps the
+last-synced contents (merge bases) and unresolved conflicts
+"""
+
+import os
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Iterable, NamedTuple, Optional
+
+# Larger files keep no merge base; concurrent edits of them are conflicts
+MERGE_BASE_MAX_BYTES = int(os.getenv("KMS_SYNC_MERGE_MAX_BYTES", str(1024 * 1024)))
+
+
+class ManifestEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+class Conflict(NamedTuple):
+    file_sha256: str
+    db_sha256: str
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path, chunk_size: int = 1024 * 1024) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class SyncManifest:
+    """
+    Path -> (size, mtime_ns, sha256) of the last state known to be in sync
+
+    An entry is only recorded once the file and the database agree, so a
+    file whose stat still matches its entry needs neither a read nor a
+    query. Paths are relative to the KMS root (documents.filepath).
+    Safe to share between the watcher and change feed threads.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL
+                ) WITHOUT ROWID
+            """)
+            # Contents by checksum, referenced by files.sha256
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS bases (
+                    sha256 TEXT PRIMARY KEY,
+                    content BLOB NOT NULL
+                ) WITHOUT ROWID
+            """)
+            # Both sides as they were when the conflict was detected
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS conflicts (
+                    path TEXT PRIMARY KEY,
+                    file_sha256 TEXT NOT NULL,
+                    db_sha256 TEXT NOT NULL
+                ) WITHOUT ROWID
+            """)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM files").fetchone()[0]
+
+    def get(self, path: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime_ns, sha256 FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        return ManifestEntry(*row) if row else None
+
+    def is_unchanged(self, path: str, st: os.stat_result) -> bool:
+        """True if the file's stat matches its entry (no content I/O needed)"""
+        entry = self.get(path)
+        return entry is not None and entry.size == st.st_size and entry.mtime_ns == st.st_mtime_ns
+
+    def record(self, path: str, st: os.stat_result, sha256: str):
+        self.record_many([(path, st.st_size, st.st_mtime_ns, sha256)])
+
+    def record_many(self, entries: Iterable[tuple]):
+        """Upsert (path, size, mtime_ns, sha256) tuples in one transaction"""
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("""
+                    INSERT INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (path) DO UPDATE
+                    SET size = excluded.size, mtime_ns = excluded.mtime_ns, sha256 = excluded.sha256
+                """, entries)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def remove(self, path: str):
+        self.remove_many([path])
+
+    def remove_many(self, paths: Iterable[str]):
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in paths))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def put_bases(self, contents: Iterable[bytes]):
+        """Keep synced contents as merge bases (keyed by their sha256)"""
+        rows = [(sha256_bytes(data), data) for data in contents if len(data) <= MERGE_BASE_MAX_BYTES]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO bases (sha256, content) VALUES (?, ?)", rows)
+
+    def get_base(self, sha256: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute("SELECT content FROM bases WHERE sha256 = ?", (sha256,)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def prune_bases(self) -> int:
+        """Drop bases no file refers to any more"""
+        with self._lock:
+            cur = self._db.execute("DELETE FROM bases WHERE sha256 NOT IN (SELECT sha256 FROM files)")
+            return cur.rowcount
+
+    def get_conflict(self, path: str) -> Optional[Conflict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT file_sha256, db_sha256 FROM conflicts WHERE path = ?", (path,)
+            ).fetchone()
+        return Conflict(*row) if row else None
+
+    def set_conflict(self, path: str, file_sha256: str, db_sha256: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO conflicts (path, file_sha256, db_sha256) VALUES (?, ?, ?)",
+                (path, file_sha256, db_sha256)
+            )
+
+    def clear_conflict(self, path: str):
+        with self._lock:
+            self._db.execute("DELETE FROM conflicts WHERE path = ?", (path,))
+
+    def entries(self) -> Dict[str, ManifestEntry]:
+        with self._lock:
+            rows = self._db.execute("SELECT path, size, mtime_ns, sha256 FROM files").fetchall()
+        return {path: ManifestEntry(size, mtime_ns, sha) for path, size, mtime_ns, sha in rows}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,133 @@
+"""
+KMS Sync Event Queue
+Debounced, path-coalescing queue between the file watcher and the sync
+daemon's batch worker, plus the daemon stats file read by /metrics
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+SYNC_DEBOUNCE_SECONDS = float(os.getenv("KMS_SYNC_DEBOUNCE", "0.5"))
+# A path that keeps changing is still synced after this long
+SYNC_MAX_DELAY_SECONDS = float(os.getenv("KMS_SYNC_MAX_DELAY", "5"))
+SYNC_BATCH_SIZE = int(os.getenv("KMS_SYNC_BATCH_SIZE", "200"))
+SYNC_STATS_FILE = os.getenv("KMS_SYNC_STATS_FILE", "/tmp/kms-sync-daemon.stats.json")
+
+EVENT_UPSERT = "upsert"
+EVENT_DELETE = "delete"
+
+
+class CoalescingQueue:
+    """
+    Pending file events keyed by path
+
+    Repeated events for a path collapse into one entry that keeps the
+    latest kind (upsert/delete) and the time of the first event. A path is
+    released once it has been quiet for ``debounce`` seconds, or after
+    ``max_delay`` seconds regardless, in batches of up to ``batch_size``.
+    """
+
+    def __init__(self, debounce: float = SYNC_DEBOUNCE_SECONDS,
+                 max_delay: float = SYNC_MAX_DELAY_SECONDS,
+                 batch_size: int = SYNC_BATCH_SIZE):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self._pending: "OrderedDict[str, list]" = OrderedDict()   # path -> [kind, first, last]
+        self._cond = threading.Condition()
+        self._stats = {
+            "events": 0,
+            "coalesced": 0,
+            "batches": 0,
+            "applied": 0,
+            "last_batch_size": 0,
+            "last_batch_seconds": 0.0,
+            "last_apply_lag_seconds": 0.0,
+        }
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pending)
+
+    def put(self, path: str, kind: str = EVENT_UPSERT):
+        now = time.monotonic()
+        with self._cond:
+            self._stats["events"] += 1
+            item = self._pending.get(path)
+            if item is None:
+                self._pending[path] = [kind, now, now]
+            else:
+                self._stats["coalesced"] += 1
+                item[0] = kind
+                item[2] = now
+            self._cond.notify()
+
+    def _ready_at(self, item) -> float:
+        _, first, last = item
+        return min(last + self.debounce, first + self.max_delay)
+
+    def get_batch(self, timeout: float = 1.0, flush: bool = False) -> List[Tuple[str, str, float]]:
+        """
+        Wait up to ``timeout`` for settled paths; returns [(path, kind, first_seen)]
+
+        ``flush`` ignores the debounce window (shutdown drain).
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                batch = []
+                for path, item in self._pending.items():
+                    if flush or self._ready_at(item) <= now:
+                        batch.append((path, item[0], item[1]))
+                        if len(batch) >= self.batch_size:
+                            break
+                if batch:
+                    for path, _, _ in batch:
+                        del self._pending[path]
+                    return batch
+                if now >= deadline:
+                    return []
+                wake = min((self._ready_at(item) for item in self._pending.values()), default=deadline)
+                self._cond.wait(max(0.01, min(wake, deadline) - now))
+
+    def record_batch(self, batch: List[Tuple[str, str, float]], seconds: float):
+        """Account an applied batch; lag is first event -> applied"""
+        now = time.monotonic()
+        with self._cond:
+            self._stats["batches"] += 1
+            self._stats["applied"] += len(batch)
+            self._stats["last_batch_size"] = len(batch)
+            self._stats["last_batch_seconds"] = round(seconds, 4)
+            if batch:
+                self._stats["last_apply_lag_seconds"] = round(now - min(first for _, _, first in batch), 4)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._cond:
+            oldest = min((item[1] for item in self._pending.values()), default=None)
+            return dict(
+                self._stats,
+                depth=len(self._pending),
+                oldest_pending_seconds=round(now - oldest, 4) if oldest is not None else 0.0,
+            )
+
+
+def write_stats(stats: dict, path: str = SYNC_STATS_FILE):
+    """Atomically replace the daemon stats file"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(dict(stats, written_at=time.time()), f, default=str)
+    os.replace(tmp, path)
+
+
+def read_stats(path: str = SYNC_STATS_FILE) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
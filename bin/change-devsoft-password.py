@@ -3,9 +3,9 @@
 import sys
 import os
 import getpass
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api"))
 
-from api.auth import get_db_connection, get_password_hash
+from auth import get_db_connection, get_password_hash
 
 def change_devsoft_password():
     """Change devsoft user password"""
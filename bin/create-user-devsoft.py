@@ -2,9 +2,9 @@
 """Create devsoft user and disable admin"""
 import sys
 import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api"))
 
-from api.auth import get_db_connection, get_password_hash
+from auth import get_db_connection, get_password_hash
 
 def create_devsoft_user():
     """Create devsoft user and disable admin"""
@@ -7,9 +7,9 @@ import os
 import sys
 import json
 import yaml
+import shlex
 import argparse
 import hashlib
-import psycopg2
 from pathlib import Path
 from datetime import datetime
 from tabulate import tabulate
@@ -18,35 +18,16 @@ from tabulate import tabulate
 KMS_ROOT = Path("/opt/kms")
 CATEGORIES_DIR = KMS_ROOT / "categories"
 
-# Database connection info
-DB_HOST = "localhost"
-DB_NAME = "kms_db"
-DB_USER = "kms_user"
-
-def get_db_password():
-    """Get database password from WikiSys secrets"""
-    import subprocess
-    result = subprocess.run(
-        ["bash", os.path.expanduser("~/.wikisys-local/scripts/secrets-manager.sh"),
-         "decrypt", "passwords/kms-db-password"],
-        capture_output=True,
-        text=True
-    )
-    if result.returncode == 0:
-        lines = result.stdout.strip().split('\n')
-        return lines[-1]
-    else:
-        raise Exception(f"Failed to get DB password: {result.stderr}")
+# Shared database layer (connection pool, password decrypted once)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+from database import get_db_connection as _get_pooled_connection
+from utils.search_query import (
+    build_search_page_query, parse_search_page, render_snippet, InvalidCursor
+)
 
 def get_db_connection():
-    """Create database connection"""
-    password = get_db_password()
-    return psycopg2.connect(
-        host=DB_HOST,
-        database=DB_NAME,
-        user=DB_USER,
-        password=password
-    )
+    """Borrow a connection from the shared pool (tuple rows)"""
+    return _get_pooled_connection(dict_rows=False)
 
 def calculate_checksum(filepath):
     """Calculate SHA256 checksum"""
@@ -366,31 +347,61 @@ def cmd_list_objects(args):
 
 def cmd_search(args):
     """Search documents"""
+    filters = {"category": args.category, "folder": args.folder}
+    try:
+        query, params = build_search_page_query(
+            args.query, args.limit, args.cursor, filters, with_facets=not args.cursor
+        )
+    except InvalidCursor as e:
+        print(f"✗ Error: {e}")
+        return 1
+
     conn = get_db_connection()
     cur = conn.cursor()
 
     try:
-        cur.execute("""
-            SELECT document_id, object_name, folder, filename, rank
-            FROM search_documents(%s)
-            ORDER BY rank DESC
-            LIMIT %s
-        """, (args.query, args.limit))
-
-        results = cur.fetchall()
+        cur.execute(query, params)
+        page = parse_search_page(cur.fetchone())
+        results = page["results"]
 
         if not results:
             print(f"No results found for: {args.query}")
+            cur.close()
+            conn.close()
             return 0
 
+        if sys.stdout.isatty():
+            start, stop = "\033[1m", "\033[0m"
+        else:
+            start, stop = "**", "**"
+
         print(f"\n🔍 Search Results for: '{args.query}'")
         print("=" * 80)
 
-        for doc_id, obj_name, folder, filename, rank in results:
-            print(f"\n  [{doc_id}] {obj_name}/{folder}/{filename}")
-            print(f"      Rank: {rank:.4f}")
-
-        print(f"\nTotal: {len(results)} documents")
+        for hit in results:
+            print(f"\n  [{hit['document_id']}] {hit['object_name']}/{hit['folder']}/{hit['filename']}")
+            print(f"      Rank: {hit['rank']:.4f}")
+            snippet = render_snippet(hit["snippet"], start, stop, escape_html=False)
+            if snippet:
+                print(f"      {snippet}")
+
+        print(f"\nShowing {len(results)} of {page['total']} documents")
+
+        if page["facets"]:
+            for facet in ("category", "folder"):
+                counts = ", ".join(
+                    f"{item['value'] or '-'} ({item['count']})" for item in page["facets"][facet]
+                )
+                print(f"  {facet}: {counts}")
+
+        if page["next_cursor"]:
+            # The cursor is only a position: repeat the filters it belongs to
+            command = ["kms-cli", "search", args.query, "--limit", str(args.limit)]
+            for name, value in filters.items():
+                if value is not None:
+                    command += [f"--{name}", value]
+            command += ["--cursor", page["next_cursor"]]
+            print(f"\nNext page: {shlex.join(command)}")
 
         cur.close()
         conn.close()
@@ -690,7 +701,10 @@ Examples:
     # Search
     parser_search = subparsers.add_parser('search', help='Search documents')
     parser_search.add_argument('query', help='Search query')
-    parser_search.add_argument('--limit', type=int, default=20, help='Maximum results')
+    parser_search.add_argument('--limit', type=int, default=20, help='Results per page')
+    parser_search.add_argument('--cursor', help='Continue from the "Next page" cursor of a previous search')
+    parser_search.add_argument('--category', help='Filter by category slug')
+    parser_search.add_argument('--folder', choices=['plany', 'instrukce', 'code', 'docs'], help='Filter by folder')
 
     # Import
     parser_import = subparsers.add_parser('import', help='Import data from files to database')
@@ -3,64 +3,60 @@
 KMS Initial Data Import
 Imports existing file structure from /opt/kms/ into PostgreSQL database
 """
+import io
 import json
+import codecs
 
 import os
 import sys
+import time
 import yaml
 import hashlib
-import psycopg2
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
 
 # Configuration
 KMS_ROOT = Path("/opt/kms")
 CATEGORIES_DIR = KMS_ROOT / "categories"
+DEFAULT_JOBS = min(16, (os.cpu_count() or 2) * 2)
+DEFAULT_BATCH_SIZE = 500
+BATCH_BYTES = 32 * 1024 * 1024  # Flush a batch early once its content reaches this size
+# Files above this are hashed and COPYed in chunks, never held in memory
+DEFAULT_STREAM_THRESHOLD = 8 * 1024 * 1024
+# Files above this are stored without content (metadata, size, checksum only)
+DEFAULT_MAX_DOC_SIZE = 64 * 1024 * 1024
+STREAM_CHUNK_SIZE = 1024 * 1024
+# Completed objects/batches of the last run, for --resume
+JOURNAL_FILE = KMS_ROOT / ".kms-import-journal.jsonl"
+
+# Documents
+STANDARD_FOLDERS = ['plany', 'instrukce', 'code', 'docs']
+DOCUMENT_EXTENSIONS = {'.md', '.txt', '.sh', '.yml', '.yaml', '.json', '.py', '.js', '.ts', '.html', '.css', '.sql'}
+CONTENT_TYPES = {
+    '.md': 'text/markdown',
+    '.txt': 'text/plain',
+    '.py': 'text/x-python',
+    '.js': 'text/javascript',
+    '.ts': 'text/typescript',
+    '.json': 'application/json',
+    '.yaml': 'application/yaml',
+    '.yml': 'application/yaml',
+    '.html': 'text/html',
+    '.css': 'text/css',
+    '.sql': 'text/sql',
+    '.sh': 'text/x-shellscript',
+}
+
+# Shared database layer (connection pool, password decrypted once)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+from database import DB_HOST, DB_NAME, get_db_connection as _get_pooled_connection
+from utils.hierarchy import HierarchyIndex
 
-# Database connection info
-DB_HOST = "localhost"
-DB_NAME = "kms_db"
-DB_USER = "kms_user"
-
-# Get DB password from secrets
-def get_db_password():
-    """Get database password from WikiSys secrets"""
-    import subprocess
-    result = subprocess.run(
-        ["bash", os.path.expanduser("~/.wikisys-local/scripts/secrets-manager.sh"),
-         "decrypt", "passwords/kms-db-password"],
-        capture_output=True,
-        text=True
-    )
-    if result.returncode == 0:
-        # Extract password from output (skip the info messages)
-        lines = result.stdout.strip().split('\n')
-        return lines[-1]  # Last line is the password
-    else:
-        raise Exception(f"Failed to get DB password: {result.stderr}")
-
-# Database connection
 def get_db_connection():
-    """Create database connection"""
-    password = get_db_password()
-    return psycopg2.connect(
-        host=DB_HOST,
-        database=DB_NAME,
-        user=DB_USER,
-        password=password
-    )
-
-# Calculate file checksum
-def calculate_checksum(filepath):
-    """Calculate SHA256 checksum of a file"""
-    sha256 = hashlib.sha256()
-    try:
-        with open(filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b''):
-                sha256.update(chunk)
-        return sha256.hexdigest()
-    except Exception:
-        return None
+    """Borrow a connection from the shared pool (tuple rows)"""
+    return _get_pooled_connection(dict_rows=False)
 
 # Read YAML metadata
 def read_metadata(meta_file):
@@ -72,8 +68,22 @@ def read_metadata(meta_file):
         print(f"Warning: Failed to read {meta_file}: {e}")
         return None
 
+def load_hierarchy(conn):
+    """Slug -> ID index for the whole tree, loaded with three queries"""
+    def query(sql, params=None):
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    hierarchy = HierarchyIndex(query)
+    hierarchy.load()
+    conn.commit()
+    return hierarchy
+
 # Import categories
-def import_categories(conn):
+def import_categories(conn, hierarchy):
     """Import categories from file structure"""
     cur = conn.cursor()
     imported = 0
@@ -116,6 +126,7 @@ def import_categories(conn):
             ))
             cat_id = cur.fetchone()[0]
             conn.commit()
+            hierarchy.put_category(cat_id, cat_slug)
             imported += 1
             print(f"  ✓ {cat_slug} (ID: {cat_id})")
         except Exception as e:
@@ -127,7 +138,7 @@ def import_categories(conn):
     return imported
 
 # Import subcategories
-def import_subcategories(conn):
+def import_subcategories(conn, hierarchy):
     """Import subcategories from file structure"""
     cur = conn.cursor()
     imported = 0
@@ -144,11 +155,9 @@ def import_subcategories(conn):
 
         # Get category ID
         cat_slug = cat_dir.name
-        cur.execute("SELECT id FROM categories WHERE slug = %s", (cat_slug,))
-        result = cur.fetchone()
-        if not result:
+        cat_id = hierarchy.category_id(cat_slug)
+        if not cat_id:
             continue
-        cat_id = result[0]
 
         # Import subcategories
         for sub_dir in subcat_dir.iterdir():
@@ -184,6 +193,7 @@ def import_subcategories(conn):
                 ))
                 sub_id = cur.fetchone()[0]
                 conn.commit()
+                hierarchy.put_subcategory(sub_id, cat_id, sub_slug)
                 imported += 1
                 print(f"  ✓ {cat_slug}/{sub_slug} (ID: {sub_id})")
             except Exception as e:
@@ -195,10 +205,14 @@ def import_subcategories(conn):
     return imported
 
 # Import objects
-def import_objects(conn):
-    """Import objects (projects) from file structure"""
+def import_objects(conn, hierarchy):
+    """
+    Import objects (projects) from file structure
+
+    Returns [(object_id, obj_dir)] for the document import.
+    """
     cur = conn.cursor()
-    imported = 0
+    imported = []
 
     print("\n📄 Importing Objects...")
 
@@ -209,11 +223,9 @@ def import_objects(conn):
         cat_slug = cat_dir.name
 
         # Get category ID
-        cur.execute("SELECT id FROM categories WHERE slug = %s", (cat_slug,))
-        result = cur.fetchone()
-        if not result:
+        cat_id = hierarchy.category_id(cat_slug)
+        if not cat_id:
             continue
-        cat_id = result[0]
 
         # Import objects directly under category
         objects_dir = cat_dir / "objects"
@@ -221,7 +233,9 @@ def import_objects(conn):
             for obj_dir in objects_dir.iterdir():
                 if not obj_dir.is_dir():
                     continue
-                imported += import_single_object(conn, cur, obj_dir, cat_id, None, cat_slug, None)
+                obj_id = import_single_object(conn, cur, hierarchy, obj_dir, cat_id, None, cat_slug, None)
+                if obj_id:
+                    imported.append((obj_id, obj_dir))
 
         # Import objects under subcategories
         subcat_dir = cat_dir / "subcategories"
@@ -233,14 +247,9 @@ def import_objects(conn):
                 sub_slug = sub_dir.name
 
                 # Get subcategory ID
-                cur.execute(
-                    "SELECT id FROM subcategories WHERE category_id = %s AND slug = %s",
-                    (cat_id, sub_slug)
-                )
-                result = cur.fetchone()
-                if not result:
+                sub_id = hierarchy.subcategory_id(cat_id, sub_slug)
+                if not sub_id:
                     continue
-                sub_id = result[0]
 
                 # Import objects
                 sub_objects_dir = sub_dir / "objects"
@@ -248,25 +257,27 @@ def import_objects(conn):
                     for obj_dir in sub_objects_dir.iterdir():
                         if not obj_dir.is_dir():
                             continue
-                        imported += import_single_object(
-                            conn, cur, obj_dir, cat_id, sub_id, cat_slug, sub_slug
+                        obj_id = import_single_object(
+                            conn, cur, hierarchy, obj_dir, cat_id, sub_id, cat_slug, sub_slug
                         )
+                        if obj_id:
+                            imported.append((obj_id, obj_dir))
 
     cur.close()
-    print(f"\n✅ Imported {imported} objects")
+    print(f"\n✅ Imported {len(imported)} objects")
     return imported
 
-def import_single_object(conn, cur, obj_dir, cat_id, sub_id, cat_slug, sub_slug):
-    """Import a single object"""
+def import_single_object(conn, cur, hierarchy, obj_dir, cat_id, sub_id, cat_slug, sub_slug):
+    """Import a single object; returns its ID (None if skipped)"""
     obj_slug = obj_dir.name
     meta_file = obj_dir / ".meta.yaml"
 
     if not meta_file.exists():
-        return 0
+        return None
 
     meta = read_metadata(meta_file)
     if not meta:
-        return 0
+        return None
 
     try:
         # Calculate relative file path
@@ -298,103 +309,227 @@ def import_single_object(conn, cur, obj_dir, cat_id, sub_id, cat_slug, sub_slug)
         ))
         obj_id = cur.fetchone()[0]
         conn.commit()
-
-        # Import documents for this object
-        docs_imported = import_documents(conn, obj_id, obj_dir)
+        hierarchy.put_object(obj_id, cat_id, sub_id, obj_slug)
 
         location = f"{cat_slug}/{sub_slug}/{obj_slug}" if sub_slug else f"{cat_slug}/{obj_slug}"
-        print(f"  ✓ {location} (ID: {obj_id}, {docs_imported} docs)")
-        return 1
+        print(f"  ✓ {location} (ID: {obj_id})")
+        return obj_id
 
     except Exception as e:
         print(f"  ✗ {obj_slug}: {e}")
         conn.rollback()
-        return 0
+        return None
 
 # Import documents
-def import_documents(conn, object_id, obj_dir):
-    """Import documents for an object"""
-    cur = conn.cursor()
-    imported = 0
-
-    # Standard folders
-    folders = ['plany', 'instrukce', 'code', 'docs']
-
+def find_documents(object_id, obj_dir):
+    """Yield (object_id, folder, filename, path) for the documents of an object"""
     # Import from standard folders
-    for folder in folders:
+    for folder in STANDARD_FOLDERS:
         folder_path = obj_dir / folder
-        if not folder_path.exists():
+        if not folder_path.is_dir():
             continue
+        for dirpath, dirnames, filenames in os.walk(folder_path):
+            for name in filenames:
+                if name.startswith('.'):
+                    continue
+                path = Path(dirpath) / name
+                yield object_id, folder, str(path.relative_to(folder_path)), path
 
-        for doc_file in folder_path.rglob('*'):
-            if not doc_file.is_file():
+    # Import files directly from object root (document files only)
+    with os.scandir(obj_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.is_file():
                 continue
-            if doc_file.name.startswith('.'):
+            if Path(entry.name).suffix.lower() not in DOCUMENT_EXTENSIONS:
                 continue
+            yield object_id, 'root', entry.name, Path(entry.path)
+
+class ObjectDone:
+    """Marker after the last document job of an object"""
+
+    def __init__(self, object_id, key):
+        self.object_id = object_id
+        self.key = key
+
+class StreamedContent:
+    """Content that is read from disk while the batch is COPYed"""
+
+    def __init__(self, path):
+        self.path = path
+
+class ImportJournal:
+    """
+    Append-only checkpoint journal (JSON lines)
+
+    A batch record lists the objects whose documents were all committed
+    with it; --resume skips those objects. The journal is removed after a
+    run without failures.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self.completed = set()
+        self.batches = 0
+        if resume and self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue    # torn last line from a crash
+                    self.completed.update(record.get('objects', ()))
+                    self.batches = record.get('batch', self.batches)
+        self._file = open(self.path, 'a' if resume else 'w')
+        if resume:
+            # Terminate a torn last line so the next record starts clean
+            self._file.write('\n')
+        self._write({'started': time.time(), 'resume': resume})
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record_batch(self, objects, documents):
+        self.batches += 1
+        self.completed.update(objects)
+        self._write({'batch': self.batches, 'documents': documents, 'objects': sorted(objects)})
+
+    def close(self, remove=False):
+        self._file.close()
+        if remove:
+            self.path.unlink(missing_ok=True)
+
+def hash_file(path):
+    """SHA256 of a file, read in chunks"""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def load_document(job, known_checksums, stream_threshold=DEFAULT_STREAM_THRESHOLD,
+                  max_doc_size=DEFAULT_MAX_DOC_SIZE):
+    """
+    Read and hash one file (runs on the worker pool)
+
+    Returns (staging row, size); the row is None when ``known_checksums``
+    (incremental mode) already has this checksum for the path. Files above
+    ``stream_threshold`` only get hashed here; their content is streamed
+    at COPY time (StreamedContent), or left out above ``max_doc_size``.
+    """
+    object_id, folder, filename, path = job
+    rel_filepath = str(path.relative_to(KMS_ROOT))
+    size = path.stat().st_size
+
+    if size > stream_threshold:
+        checksum = hash_file(path)
+        content = None if size > max_doc_size else StreamedContent(path)
+    else:
+        with open(path, 'rb') as f:
+            data = f.read()
+        size = len(data)
+        checksum = hashlib.sha256(data).hexdigest()
+        # PostgreSQL text cannot hold NUL
+        content = data.decode('utf-8', errors='ignore').replace('\x00', '')
+
+    if known_checksums is not None and known_checksums.get(rel_filepath) == checksum:
+        return None, size
+    return (
+        object_id,
+        folder,
+        filename,
+        rel_filepath,
+        CONTENT_TYPES.get(path.suffix.lower(), 'application/octet-stream'),
+        size,
+        checksum,
+        content
+    ), size
+
+def bounded_map(executor, fn, iterable, max_in_flight):
+    """
+    executor.map() that keeps at most max_in_flight jobs queued (bounded memory)
+
+    Yields (item, future) in input order; ObjectDone markers pass
+    through with future None.
+    """
+    pending = deque()
+    for item in iterable:
+        future = None if isinstance(item, ObjectDone) else executor.submit(fn, item)
+        pending.append((item, future))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+def csv_field(value):
+    """COPY CSV field: quoted text, unquoted empty for NULL"""
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+class StreamedCsvRow:
+    """File-like single CSV row whose last field is read from a file in chunks"""
+
+    def __init__(self, fields, path):
+        self._parts = self._generate(fields, path)
+        self._buffer = ''
+
+    @staticmethod
+    def _generate(fields, path):
+        yield ','.join(csv_field(value) for value in fields) + ',"'
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+                yield decoder.decode(chunk).replace('\x00', '').replace('"', '""')
+        yield decoder.decode(b'', final=True).replace('\x00', '').replace('"', '""') + '"\n'
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._parts)
+            except StopIteration:
+                break
+        if size < 0:
+            data, self._buffer = self._buffer, ''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+STAGING_COLUMNS = "object_id, folder, filename, filepath, content_type, size_bytes, checksum, content"
+
+def flush_documents(conn, rows):
+    """
+    COPY a batch into a temporary staging table, then merge it set-based
+
+    Returns the number of documents inserted or changed. Rows whose
+    checksum and path are unchanged are not rewritten.
+    """
+    buffer = io.StringIO()
+    streamed = []
+    for row in rows:
+        if isinstance(row[-1], StreamedContent):
+            streamed.append(row)
+        else:
+            buffer.write(','.join(csv_field(value) for value in row) + '\n')
+    buffer.seek(0)
 
-            imported += import_single_document(cur, object_id, doc_file, folder, folder_path)
-
-    # Import files directly from object root
-    for doc_file in obj_dir.iterdir():
-        if not doc_file.is_file():
-            continue
-        if doc_file.name.startswith('.'):
-            continue
-
-        # Skip if file is in a standard folder (already imported)
-        if doc_file.parent.name in folders:
-            continue
-
-        # Only import document files
-        suffix = doc_file.suffix.lower()
-        if suffix not in ['.md', '.txt', '.sh', '.yml', '.yaml', '.json', '.py', '.js', '.ts', '.html', '.css', '.sql']:
-            continue
-
-        imported += import_single_document(cur, object_id, doc_file, 'root', obj_dir)
-
-    conn.commit()
-    cur.close()
-    return imported
-
-def import_single_document(cur, object_id, doc_file, folder, base_path):
-    """Import a single document"""
+    cur = conn.cursor()
     try:
-        # Read file content
-        try:
-            with open(doc_file, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-        except Exception:
-            content = None
-
-        # Calculate checksum and size
-        checksum = calculate_checksum(doc_file)
-        size_bytes = doc_file.stat().st_size
-
-        # Determine content type
-        suffix = doc_file.suffix.lower()
-        content_type = {
-            '.md': 'text/markdown',
-            '.txt': 'text/plain',
-            '.py': 'text/x-python',
-            '.js': 'text/javascript',
-            '.ts': 'text/typescript',
-            '.json': 'application/json',
-            '.yaml': 'application/yaml',
-            '.yml': 'application/yaml',
-            '.html': 'text/html',
-            '.css': 'text/css',
-            '.sql': 'text/sql',
-            '.sh': 'text/x-shellscript',
-        }.get(suffix, 'application/octet-stream')
-
-        # Relative filename
-        rel_filename = str(doc_file.relative_to(base_path))
-        rel_filepath = str(doc_file.relative_to(KMS_ROOT))
-
         cur.execute("""
-            INSERT INTO documents
-            (object_id, folder, filename, filepath, content, content_type, size_bytes, checksum)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            CREATE TEMP TABLE import_staging (
+                object_id INTEGER, folder TEXT, filename TEXT, filepath TEXT,
+                content_type TEXT, size_bytes BIGINT, checksum TEXT, content TEXT
+            ) ON COMMIT DROP
+        """)
+        copy_sql = f"COPY import_staging ({STAGING_COLUMNS}) FROM STDIN WITH (FORMAT csv)"
+        cur.copy_expert(copy_sql, buffer)
+        for row in streamed:
+            cur.copy_expert(copy_sql, StreamedCsvRow(row[:-1], row[-1].path))
+        cur.execute(f"""
+            INSERT INTO documents ({STAGING_COLUMNS})
+            SELECT {STAGING_COLUMNS}
+            FROM import_staging
             ON CONFLICT (object_id, folder, filename) DO UPDATE
             SET filepath = EXCLUDED.filepath,
                 content = EXCLUDED.content,
@@ -403,24 +538,149 @@ def import_single_document(cur, object_id, doc_file, folder, base_path):
                 checksum = EXCLUDED.checksum,
                 version = documents.version + 1,
                 updated_at = NOW()
-        """, (
-            object_id,
-            folder,
-            rel_filename,
-            rel_filepath,
-            content,
-            content_type,
-            size_bytes,
-            checksum
-        ))
-        return 1
-    except Exception as e:
-        print(f"    ⚠️  Failed to import {doc_file.name}: {e}")
-        return 0
+            WHERE documents.checksum IS DISTINCT FROM EXCLUDED.checksum
+               OR documents.filepath IS DISTINCT FROM EXCLUDED.filepath
+        """)
+        written = cur.rowcount
+        conn.commit()
+        return written
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def import_documents(conn, objects, jobs=DEFAULT_JOBS, batch_size=DEFAULT_BATCH_SIZE,
+                     incremental=False, journal=None,
+                     stream_threshold=DEFAULT_STREAM_THRESHOLD, max_doc_size=DEFAULT_MAX_DOC_SIZE):
+    """
+    Import the documents of all objects
+
+    Files are read and hashed on a thread pool (hashlib and file I/O
+    release the GIL); the main thread loads batches of ``batch_size``
+    documents (or BATCH_BYTES of content) in one transaction each.
+    Objects are journaled as complete once all their documents are
+    committed; objects already complete in ``journal`` are skipped.
+    """
+    print(f"\n📝 Importing Documents ({jobs} jobs, batches of {batch_size})...")
+
+    if journal is not None and journal.completed:
+        before = len(objects)
+        objects = [(object_id, obj_dir) for object_id, obj_dir in objects
+                   if str(obj_dir.relative_to(KMS_ROOT)) not in journal.completed]
+        print(f"  Resuming: {before - len(objects)} objects already imported, {len(objects)} to go")
+
+    known_checksums = None
+    if incremental:
+        cur = conn.cursor()
+        cur.execute("SELECT filepath, checksum FROM documents")
+        known_checksums = dict(cur.fetchall())
+        cur.close()
+        conn.commit()
+        print(f"  Incremental: {len(known_checksums)} documents already in DB")
+
+    stats = {"read": 0, "skipped": 0, "written": 0, "failed": 0, "bytes": 0, "oversize": 0}
+    batch, batch_bytes = [], 0
+    done_objects, failed_objects = [], set()
+    started = time.monotonic()
+
+    def flush():
+        nonlocal batch, batch_bytes, done_objects
+        if not batch and not done_objects:
+            return
+        try:
+            if batch:
+                stats["written"] += flush_documents(conn, batch)
+        except Exception as e:
+            # Nothing of a failed batch is journaled; its objects are
+            # never complete, so --resume imports them again
+            stats["failed"] += len(batch)
+            failed_objects.update(row[0] for row in batch)
+            print(f"  ✗ Batch of {len(batch)} documents failed: {e}")
+        else:
+            if journal is not None:
+                journal.record_batch([done.key for done in done_objects
+                                      if done.object_id not in failed_objects], len(batch))
+        batch, batch_bytes, done_objects = [], 0, []
+
+    def all_jobs():
+        for object_id, obj_dir in objects:
+            yield from find_documents(object_id, obj_dir)
+            yield ObjectDone(object_id, str(obj_dir.relative_to(KMS_ROOT)))
+
+    def load(job):
+        return load_document(job, known_checksums, stream_threshold, max_doc_size)
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="kms-import") as executor:
+        for job, future in bounded_map(executor, load, all_jobs(), jobs * 4):
+            if isinstance(job, ObjectDone):
+                if job.object_id not in failed_objects:
+                    done_objects.append(job)
+                continue
+
+            try:
+                row, size = future.result()
+            except Exception as e:
+                stats["failed"] += 1
+                failed_objects.add(job[0])
+                print(f"    ⚠️  Failed to read {job[3]}: {e}")
+                continue
+
+            stats["read"] += 1
+            stats["bytes"] += size
+            if row is None:
+                stats["skipped"] += 1
+                continue
+            if row[-1] is None:
+                stats["oversize"] += 1
+                print(f"    ⚠️  {row[3]}: {size} bytes exceeds --max-doc-size, storing metadata only")
+
+            batch.append(row)
+            if isinstance(row[-1], str):
+                batch_bytes += size
+            if len(batch) >= batch_size or batch_bytes >= BATCH_BYTES:
+                flush()
+                print(f"  … {stats['read']} files read, {stats['written']} documents written", end="\r")
+        flush()
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    stats["seconds"] = elapsed
+    print(f"\n✅ Documents: {stats['read']} read, {stats['written']} written, "
+          f"{stats['skipped']} unchanged, {stats['oversize']} metadata only, "
+          f"{stats['failed']} failed in {elapsed:.1f}s")
+    return stats
+
+def parse_size(value):
+    """Byte size with optional K/M/G suffix ("64M")"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = value.strip().upper().rstrip('B')
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import the /opt/kms tree into the KMS database")
+    parser.add_argument('--jobs', '-j', type=int, default=DEFAULT_JOBS,
+                        help=f'Parallel file readers (default: {DEFAULT_JOBS})')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Documents per transaction (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Skip files whose checksum already matches the database')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted import, skipping objects it completed')
+    parser.add_argument('--journal', default=str(JOURNAL_FILE),
+                        help=f'Checkpoint journal (default: {JOURNAL_FILE})')
+    parser.add_argument('--stream-threshold', type=parse_size, default=DEFAULT_STREAM_THRESHOLD,
+                        help='Stream files larger than this instead of reading them whole (default: 8M)')
+    parser.add_argument('--max-doc-size', type=parse_size, default=DEFAULT_MAX_DOC_SIZE,
+                        help='Store only metadata for files larger than this (default: 64M)')
+    return parser.parse_args(argv)
 
 # Main import function
 def main():
     """Main import function"""
+    args = parse_args()
+
     print("=" * 70)
     print("KMS Initial Data Import")
     print("=" * 70)
@@ -432,9 +692,21 @@ def main():
         print("\n✅ Database connection established")
 
         # Import in order
-        cat_count = import_categories(conn)
-        sub_count = import_subcategories(conn)
-        obj_count = import_objects(conn)
+        hierarchy = load_hierarchy(conn)
+        cat_count = import_categories(conn, hierarchy)
+        sub_count = import_subcategories(conn, hierarchy)
+        objects = import_objects(conn, hierarchy)
+        journal = ImportJournal(args.journal, resume=args.resume)
+        doc_stats = {"failed": 1}
+        try:
+            doc_stats = import_documents(
+                conn, objects, jobs=max(1, args.jobs), batch_size=max(1, args.batch_size),
+                incremental=args.incremental, journal=journal,
+                stream_threshold=args.stream_threshold, max_doc_size=args.max_doc_size
+            )
+        finally:
+            # Keep the journal for --resume unless every document made it
+            journal.close(remove=doc_stats["failed"] == 0)
 
         # Summary
         cur = conn.cursor()
@@ -448,12 +720,15 @@ def main():
         print(f"\nImported:")
         print(f"  Categories:    {cat_count}")
         print(f"  Subcategories: {sub_count}")
-        print(f"  Objects:       {obj_count}")
-        print(f"  Documents:     {doc_count}")
+        print(f"  Objects:       {len(objects)}")
+        print(f"  Documents:     {doc_stats['written']} written, {doc_stats['skipped']} unchanged "
+              f"({doc_count} in DB)")
+        print(f"  Throughput:    {doc_stats['read'] / doc_stats['seconds']:.1f} docs/s, "
+              f"{doc_stats['bytes'] / doc_stats['seconds'] / 1024 / 1024:.2f} MB/s")
         print("\n" + "=" * 70)
 
         conn.close()
-        return 0
+        return 0 if doc_stats['failed'] == 0 else 2
 
     except Exception as e:
         print(f"\n❌ ERROR: {e}")
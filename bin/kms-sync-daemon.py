@@ -8,12 +8,14 @@ import sys
 import time
 import json
 import yaml
-import hashlib
 import logging
 import signal
-import psycopg2
+import argparse
+import threading
+import subprocess
 from pathlib import Path
-from datetime import datetime
+from datetime import timedelta
+from psycopg2.extras import execute_values
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
@@ -22,12 +24,29 @@ KMS_ROOT = Path("/opt/kms")
 CATEGORIES_DIR = KMS_ROOT / "categories"
 LOG_FILE = "/var/log/kms-sync-daemon.log"
 PID_FILE = "/tmp/kms-sync-daemon.pid"
-POLL_INTERVAL = 5  # Seconds between DB polls
-
-# Database connection info
-DB_HOST = "localhost"
-DB_NAME = "kms_db"
-DB_USER = "kms_user"
+# DB -> file sync follows kms_changes notifications; the updated_at
+# watermark is only polled after the LISTEN connection was re-established.
+# The margin re-reads rows of transactions still in flight at disconnect.
+WATERMARK_MARGIN = int(os.getenv("KMS_SYNC_WATERMARK_MARGIN", "60"))  # Seconds
+# (path, size, mtime_ns, sha256) of synced files; outside the watched tree
+MANIFEST_FILE = Path(os.getenv("KMS_SYNC_MANIFEST", str(KMS_ROOT / ".kms-sync-manifest.db")))
+STATS_INTERVAL = 5  # Seconds between stats file updates
+# Worker processes, each owning the categories hashed to it (1 = no sharding)
+SYNC_WORKERS = int(os.getenv("KMS_SYNC_WORKERS", "1"))
+MAX_RESTART_DELAY = 60  # Seconds; crashed workers restart with doubling backoff
+
+# Synced document files
+DOCUMENT_EXTENSIONS = {'.md', '.txt', '.sh', '.yml', '.yaml', '.json', '.py', '.js', '.ts', '.html', '.css', '.sql'}
+STANDARD_FOLDERS = {'plany', 'instrukce', 'code', 'docs'}
+CONTENT_TYPES = {
+    '.md': 'text/markdown',
+    '.txt': 'text/plain',
+    '.py': 'text/x-python',
+    '.js': 'text/javascript',
+    '.json': 'application/json',
+    '.yaml': 'application/yaml',
+    '.yml': 'application/yaml',
+}
 
 # Logging setup
 logging.basicConfig(
@@ -53,42 +72,23 @@ def signal_handler(signum, frame):
 signal.signal(signal.SIGTERM, signal_handler)
 signal.signal(signal.SIGINT, signal_handler)
 
-def get_db_password():
-    """Get database password from WikiSys secrets"""
-    import subprocess
-    result = subprocess.run(
-        ["bash", os.path.expanduser("~/.wikisys-local/scripts/secrets-manager.sh"),
-         "decrypt", "passwords/kms-db-password"],
-        capture_output=True,
-        text=True
-    )
-    if result.returncode == 0:
-        lines = result.stdout.strip().split('\n')
-        return lines[-1]
-    else:
-        raise Exception(f"Failed to get DB password: {result.stderr}")
+# Shared database layer (connection pool, password decrypted once)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+from database import DB_HOST, DB_NAME, get_db_connection as _get_pooled_connection, get_listen_connection
+from utils.change_feed import ChangeFeed
+from utils.hierarchy import HierarchyIndex
+from utils.merge import MERGE, SIDE_DB, SIDE_FILE, choose_side, merge3
+from utils.own_writes import OwnWrites
+from utils.sharding import aggregate_worker_stats, category_shard
+from utils.reconcile import plan_reconcile, scan_tree
+from utils.sync_manifest import SyncManifest, sha256_bytes, sha256_file
+from utils.sync_queue import (
+    CoalescingQueue, EVENT_DELETE, EVENT_UPSERT, SYNC_BATCH_SIZE, SYNC_STATS_FILE, read_stats, write_stats
+)
 
 def get_db_connection():
-    """Create database connection"""
-    password = get_db_password()
-    return psycopg2.connect(
-        host=DB_HOST,
-        database=DB_NAME,
-        user=DB_USER,
-        password=password
-    )
-
-def calculate_checksum(filepath):
-    """Calculate SHA256 checksum of a file"""
-    sha256 = hashlib.sha256()
-    try:
-        with open(filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b''):
-                sha256.update(chunk)
-        return sha256.hexdigest()
-    except Exception as e:
-        logger.error(f"Failed to calculate checksum for {filepath}: {e}")
-        return None
+    """Borrow a connection from the shared pool (tuple rows)"""
+    return _get_pooled_connection(dict_rows=False)
 
 def read_metadata(meta_file):
     """Read .meta.yaml file"""
@@ -109,74 +109,250 @@ def write_metadata(meta_file, metadata):
         logger.error(f"Failed to write {meta_file}: {e}")
         return False
 
+def parse_document_path(filepath):
+    """
+    Map a file under categories/ to (cat_slug, sub_slug, obj_slug, folder, filename)
+
+    Returns None for files that are not synced documents.
+    """
+    try:
+        parts = filepath.relative_to(KMS_ROOT).parts
+    except ValueError:
+        return None
+
+    # Must be in categories/.../objects/... structure
+    if len(parts) < 4 or parts[0] != 'categories' or 'objects' not in parts:
+        return None
+
+    obj_idx = parts.index('objects')
+    if obj_idx + 1 >= len(parts):
+        return None
+
+    obj_slug = parts[obj_idx + 1]
+
+    # Skip .meta.yaml and hidden files
+    if filepath.name.startswith('.'):
+        return None
+
+    # Skip binary files and non-document files
+    if filepath.suffix.lower() not in DOCUMENT_EXTENSIONS:
+        return None
+
+    # Determine folder and filename
+    if obj_idx + 2 < len(parts):
+        next_part = parts[obj_idx + 2]
+
+        if next_part in STANDARD_FOLDERS:
+            # File is in a standard folder
+            folder = next_part
+            filename = '/'.join(parts[obj_idx + 3:]) if obj_idx + 3 < len(parts) else ''
+        elif obj_idx + 2 == len(parts) - 1:
+            # File is directly in object root
+            folder = 'root'
+            filename = next_part
+        else:
+            # File is in a non-standard subdirectory, skip
+            return None
+    else:
+        # File is directly in object root (shouldn't happen with current structure)
+        folder = 'root'
+        filename = parts[-1]
+
+    # Determine category and subcategory
+    cat_slug = parts[1]
+    sub_slug = None
+    if 'subcategories' in parts:
+        sub_idx = parts.index('subcategories')
+        sub_slug = parts[sub_idx + 1]
+
+    return cat_slug, sub_slug, obj_slug, folder, filename
+
+def document_file_path(cat_slug, sub_slug, obj_slug, folder, filename):
+    """File path of a document row (inverse of parse_document_path)"""
+    if sub_slug:
+        obj_dir = CATEGORIES_DIR / cat_slug / "subcategories" / sub_slug / "objects" / obj_slug
+    else:
+        obj_dir = CATEGORIES_DIR / cat_slug / "objects" / obj_slug
+    # Files in the object root are stored with folder 'root'
+    if folder == 'root':
+        return obj_dir / filename
+    return obj_dir / folder / filename
+
+# Documents with the slugs needed to place them on disk
+DOCUMENT_EXPORT_SQL = """
+    SELECT d.id, d.folder, d.filename, d.checksum, d.content, o.slug, c.slug, sc.slug
+    FROM documents d
+    JOIN objects o ON d.object_id = o.id
+    JOIN categories c ON o.category_id = c.id
+    LEFT JOIN subcategories sc ON o.subcategory_id = sc.id
+"""
+
+def document_row(obj_id, folder, filename, rel, data, checksum):
+    """documents upsert values for a file's bytes"""
+    return (
+        obj_id,
+        folder,
+        filename,
+        rel,
+        data.decode('utf-8', errors='ignore'),
+        CONTENT_TYPES.get(Path(filename).suffix.lower(), 'application/octet-stream'),
+        len(data),
+        checksum
+    )
+
+def record_conflicts(cur, conflicts):
+    """Mark documents as in conflict: [(doc_id, filepath, file_checksum, db_checksum, direction)]"""
+    if not conflicts:
+        return
+    execute_values(cur, """
+        INSERT INTO sync_status
+        (entity_type, entity_id, file_path, file_checksum, db_checksum, sync_direction,
+         status, error_message, last_sync)
+        VALUES %s
+        ON CONFLICT (entity_type, entity_id) DO UPDATE
+        SET file_path = EXCLUDED.file_path,
+            file_checksum = EXCLUDED.file_checksum,
+            db_checksum = EXCLUDED.db_checksum,
+            sync_direction = EXCLUDED.sync_direction,
+            status = 'conflict',
+            error_message = EXCLUDED.error_message,
+            last_sync = NOW()
+    """, conflicts,
+        template="('documents', %s, %s, %s, %s, %s, 'conflict', "
+                 "'File and DB both changed since the last sync; merge failed', NOW())")
+
 class FileChangeHandler(FileSystemEventHandler):
-    """Handle file system events"""
+    """Queue file system events for the batch worker (never blocks on the DB)"""
 
-    def __init__(self, sync_manager):
-        self.sync_manager = sync_manager
+    def __init__(self, event_queue, own_writes=None):
+        self.event_queue = event_queue
+        self.own_writes = own_writes
         super().__init__()
 
-    def on_modified(self, event):
-        """Handle file modification"""
-        if event.is_directory:
-            return
+    def queue(self, path, kind):
+        """Queue an event unless it echoes a file the daemon wrote itself"""
+        if kind == EVENT_UPSERT and self.own_writes is not None and path in self.own_writes:
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            if st is not None and self.own_writes.is_echo(path, (st.st_size, st.st_mtime_ns)):
+                logger.debug(f"Dropped echo of own write: {path}")
+                return
+        self.event_queue.put(path, kind)
 
-        filepath = Path(event.src_path)
+    @staticmethod
+    def is_ignored(filepath):
+        """Ignore temporary files and hidden files"""
+        return filepath.name.startswith('.') and not filepath.name == '.meta.yaml'
 
-        # Ignore temporary files and hidden files
-        if filepath.name.startswith('.') and not filepath.name == '.meta.yaml':
+    def on_modified(self, event):
+        """Handle file modification"""
+        if event.is_directory or self.is_ignored(Path(event.src_path)):
             return
-
-        logger.info(f"File modified: {filepath}")
-        self.sync_manager.sync_file_to_db(filepath)
+        logger.debug(f"File modified: {event.src_path}")
+        self.queue(event.src_path, EVENT_UPSERT)
 
     def on_created(self, event):
         """Handle file creation"""
-        if event.is_directory:
+        if event.is_directory or self.is_ignored(Path(event.src_path)):
             return
+        logger.debug(f"File created: {event.src_path}")
+        self.queue(event.src_path, EVENT_UPSERT)
 
-        filepath = Path(event.src_path)
-
-        if filepath.name.startswith('.') and not filepath.name == '.meta.yaml':
+    def on_moved(self, event):
+        """Handle rename (editors save via a temp file and rename)"""
+        if event.is_directory:
             return
-
-        logger.info(f"File created: {filepath}")
-        self.sync_manager.sync_file_to_db(filepath)
+        logger.debug(f"File moved: {event.src_path} -> {event.dest_path}")
+        if not self.is_ignored(Path(event.src_path)):
+            self.queue(event.src_path, EVENT_DELETE)
+        if not self.is_ignored(Path(event.dest_path)):
+            self.queue(event.dest_path, EVENT_UPSERT)
 
     def on_deleted(self, event):
         """Handle file deletion"""
         if event.is_directory:
             return
-
-        filepath = Path(event.src_path)
-
-        logger.info(f"File deleted: {filepath}")
-        self.sync_manager.handle_file_deletion(filepath)
+        logger.debug(f"File deleted: {event.src_path}")
+        self.queue(event.src_path, EVENT_DELETE)
 
 class SyncManager:
     """Manage bidirectional synchronization"""
 
-    def __init__(self):
+    def __init__(self, shard=None, shards=1):
+        # Sharded worker: only categories hashed to ``shard`` are synced
+        self.shard = shard
+        self.shards = shards
         self.conn = get_db_connection()
-        self.last_db_check = datetime.now()
-
-    def sync_file_to_db(self, filepath):
-        """Sync a file change to the database"""
+        self.manifest = SyncManifest(MANIFEST_FILE)
+        # DB -> file runs on the change feed thread, with its own connection
+        self.export_conn = get_db_connection()
+        self.export_lock = threading.Lock()
+        # Transaction timestamp of the last export (DB clock, not this host's)
+        self.db_watermark = None
+        self.resync_pending = False
+        self.reconcile_stats = None
+        # Own file writes and row changes, to drop the events they echo
+        self.own_writes = OwnWrites()
+        # Slug -> ID map; (re)loaded on every kms_changes (re)connect
+        self.hierarchy = HierarchyIndex(self.query)
+        self.change_feed = ChangeFeed(get_listen_connection)
+        self.change_feed.subscribe(self.hierarchy.apply_changes, self.hierarchy.load)
+        self.change_feed.subscribe(self.handle_db_notifications, self.handle_db_resync)
+        if shard is not None:
+            # Ownership of DB rows is decided by category ID from the start
+            self.hierarchy.load()
+
+    def owns(self, cat_slug):
+        """True if this process syncs the category"""
+        return self.shard is None or category_shard(cat_slug, self.shards) == self.shard
+
+    def owned_category_dirs(self):
+        """Category directories on disk owned by this process"""
         try:
-            # Determine what type of file this is
-            rel_path = filepath.relative_to(KMS_ROOT)
-            parts = rel_path.parts
-
-            # Check if it's a metadata file
+            with os.scandir(CATEGORIES_DIR) as it:
+                return [Path(entry.path) for entry in it
+                        if entry.is_dir() and not entry.name.startswith('.') and self.owns(entry.name)]
+        except FileNotFoundError:
+            return []
+
+    def start(self):
+        """Start listening for database changes"""
+        self.change_feed.start()
+
+    def query(self, sql, params=None):
+        """Run a read-only query on its own pooled connection (any thread)"""
+        conn = get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+            cur.close()
+            conn.rollback()
+            return rows
+        finally:
+            conn.close()
+
+    def apply_file_events(self, events):
+        """
+        Apply one batch of coalesced file events [(path, kind, first_seen)]
+
+        Documents are upserted and deleted in bulk, one transaction each.
+        """
+        changed, deleted = [], []
+        for path, kind, _ in events:
+            (deleted if kind == EVENT_DELETE else changed).append(Path(path))
+
+        for filepath in changed:
             if filepath.name == '.meta.yaml':
                 self.sync_metadata_to_db(filepath)
-            # Check if it's a document
-            elif len(parts) >= 4 and parts[0] == 'categories':
-                self.sync_document_to_db(filepath)
 
-        except Exception as e:
-            logger.error(f"Failed to sync {filepath} to DB: {e}")
-            self.conn.rollback()
+        documents = [filepath for filepath in changed if filepath.name != '.meta.yaml']
+        if documents:
+            self.sync_documents_to_db(documents)
+        if deleted:
+            self.delete_documents(deleted)
 
     def sync_metadata_to_db(self, meta_file):
         """Sync .meta.yaml file to database"""
@@ -213,18 +389,12 @@ class SyncManager:
                 sub_slug = parts[3]
 
                 # Get category ID
-                cur.execute("SELECT id FROM categories WHERE slug = %s", (cat_slug,))
-                result = cur.fetchone()
-                if result:
-                    cat_id = result[0]
+                cat_id = self.hierarchy.category_id(cat_slug)
+                if cat_id:
                     # Check if subcategory exists
-                    cur.execute(
-                        "SELECT id FROM subcategories WHERE category_id = %s AND slug = %s",
-                        (cat_id, sub_slug)
-                    )
-                    sub_result = cur.fetchone()
+                    sub_id = self.hierarchy.subcategory_id(cat_id, sub_slug)
 
-                    if sub_result:
+                    if sub_id:
                         # Update existing subcategory
                         cur.execute("""
                             UPDATE subcategories
@@ -256,6 +426,7 @@ class SyncManager:
                             metadata.get('is_active', True)
                         ))
                         sub_id = cur.fetchone()[0]
+                        self.hierarchy.put_subcategory(sub_id, cat_id, sub_slug)
                         logger.info(f"Created subcategory: {cat_slug}/{sub_slug} (ID: {sub_id})")
 
             # Object metadata
@@ -272,21 +443,11 @@ class SyncManager:
                         sub_slug = parts[sub_idx + 1]
 
                     # Get IDs
-                    cur.execute("SELECT id FROM categories WHERE slug = %s", (cat_slug,))
-                    cat_result = cur.fetchone()
-                    if not cat_result:
+                    ids = self.hierarchy.resolve(cat_slug, sub_slug)
+                    if not ids:
+                        cur.close()
                         return
-                    cat_id = cat_result[0]
-
-                    sub_id = None
-                    if sub_slug:
-                        cur.execute(
-                            "SELECT id FROM subcategories WHERE category_id = %s AND slug = %s",
-                            (cat_id, sub_slug)
-                        )
-                        sub_result = cur.fetchone()
-                        if sub_result:
-                            sub_id = sub_result[0]
+                    cat_id, sub_id, _ = ids
 
                     # Update object
                     cur.execute("""
@@ -320,240 +481,452 @@ class SyncManager:
             self.conn.rollback()
             cur.close()
 
-    def sync_document_to_db(self, filepath):
-        """Sync a document file to database"""
-        try:
-            rel_path = filepath.relative_to(KMS_ROOT)
-            parts = rel_path.parts
-
-            # Must be in categories/.../objects/... structure
-            if 'objects' not in parts:
-                return
-
-            obj_idx = parts.index('objects')
-            if obj_idx + 1 >= len(parts):
-                return
-
-            obj_slug = parts[obj_idx + 1]
-
-            # Skip .meta.yaml and hidden files
-            if filepath.name.startswith('.'):
-                return
-
-            # Skip binary files and non-document files
-            ext = filepath.suffix.lower()
-            if ext not in ['.md', '.txt', '.sh', '.yml', '.yaml', '.json', '.py', '.js', '.ts', '.html', '.css', '.sql']:
-                return
+    def sync_documents_to_db(self, filepaths):
+        """
+        Sync changed document files to the database in one transaction
+
+        A row that also changed since the last sync (its checksum is not
+        the manifest's base) is three-way merged with the file; what does
+        not merge cleanly is recorded as a conflict and left alone.
+        """
+        in_sync = []       # manifest entries to record once committed
+        bases = []         # their contents, kept as merge bases
+        candidates = []
+
+        for filepath in filepaths:
+            parsed = parse_document_path(filepath)
+            if parsed is None:
+                continue
+
+            # A file whose stat still matches the manifest is in sync: no I/O
+            rel = str(filepath.relative_to(KMS_ROOT))
+            try:
+                st = filepath.stat()
+            except FileNotFoundError:
+                continue
+            if self.manifest.is_unchanged(rel, st):
+                continue
 
-            # Determine folder and filename
-            # Check if file is directly in object root or in a subdirectory
-            if obj_idx + 2 < len(parts):
-                next_part = parts[obj_idx + 2]
-
-                # Check if next_part is a standard folder or a file (has extension)
-                if next_part in ['plany', 'instrukce', 'code', 'docs']:
-                    # File is in a standard folder
-                    folder = next_part
-                    filename = '/'.join(parts[obj_idx + 3:]) if obj_idx + 3 < len(parts) else ''
-                else:
-                    # Check if it's a file directly in object root (has extension in filename)
-                    # If next_part is the filename (last part), it's in root
-                    if obj_idx + 2 == len(parts) - 1:
-                        # File is directly in object root
-                        folder = 'root'
-                        filename = next_part
-                    else:
-                        # File is in a non-standard subdirectory, skip
-                        return
-            else:
-                # File is directly in object root (shouldn't happen with current structure)
-                folder = 'root'
-                filename = parts[-1]
-
-            # Determine category and subcategory
-            cat_slug = parts[1]
-            sub_slug = None
-            if 'subcategories' in parts:
-                sub_idx = parts.index('subcategories')
-                sub_slug = parts[sub_idx + 1]
-
-            # Get object ID
+            # Read once; checksum, size and content come from the same bytes
+            try:
+                with open(filepath, 'rb') as f:
+                    data = f.read()
+            except OSError as e:
+                logger.error(f"Failed to read {filepath}: {e}")
+                continue
+            checksum = sha256_bytes(data)
+            entry = self.manifest.get(rel)
+            if entry is not None and entry.sha256 == checksum:
+                # Touched but not changed (mtime-only save, chmod, ...)
+                in_sync.append((rel, st.st_size, st.st_mtime_ns, checksum))
+                continue
+
+            candidates.append((parsed, filepath, rel, st, data, checksum, entry))
+
+        merged_files = []  # (filepath, merged bytes) to write once committed
+        conflicts = []     # (rel, file checksum, db checksum)
+        resolved_conflicts = []
+        own_rows = []      # (key, generation) of rows written here
+
+        if candidates:
             cur = self.conn.cursor()
-
-            cur.execute("SELECT id FROM categories WHERE slug = %s", (cat_slug,))
-            cat_result = cur.fetchone()
-            if not cat_result:
-                cur.close()
-                return
-            cat_id = cat_result[0]
-
-            sub_id = None
-            if sub_slug:
-                cur.execute(
-                    "SELECT id FROM subcategories WHERE category_id = %s AND slug = %s",
-                    (cat_id, sub_slug)
-                )
-                sub_result = cur.fetchone()
-                if sub_result:
-                    sub_id = sub_result[0]
-
-            # Get object
-            cur.execute("""
-                SELECT id FROM objects
-                WHERE category_id = %s
-                  AND COALESCE(subcategory_id, 0) = COALESCE(%s, 0)
-                  AND slug = %s
-            """, (cat_id, sub_id, obj_slug))
-            obj_result = cur.fetchone()
-            if not obj_result:
+            try:
+                # Object IDs from the hierarchy index (no queries when known)
+                resolved = []
+                for (cat_slug, sub_slug, obj_slug, folder, filename), *rest in candidates:
+                    ids = self.hierarchy.resolve(cat_slug, sub_slug, obj_slug)
+                    if ids is not None:
+                        resolved.append((ids[2], folder, filename, *rest))
+
+                # Stored checksums, rows locked until commit: identical
+                # files are not uploaded again, concurrent edits are merged
+                stored = {}
+                if resolved:
+                    rows = execute_values(cur, """
+                        SELECT d.object_id, d.folder, d.filename, d.id, d.checksum
+                        FROM (VALUES %s) AS k(object_id, folder, filename)
+                        JOIN documents d ON d.object_id = k.object_id
+                                        AND d.folder = k.folder AND d.filename = k.filename
+                        FOR UPDATE OF d
+                    """, [r[:3] for r in resolved], fetch=True)
+                    stored = {(obj_id, folder, filename): (doc_id, checksum)
+                              for obj_id, folder, filename, doc_id, checksum in rows}
+
+                upserts, to_merge = [], []
+                for obj_id, folder, filename, filepath, rel, st, data, checksum, entry in resolved:
+                    doc_id, db_checksum = stored.get((obj_id, folder, filename), (None, None))
+                    conflict = self.manifest.get_conflict(rel)
+                    if db_checksum == checksum:
+                        side = SIDE_FILE
+                    else:
+                        side = choose_side(entry.sha256 if entry else None, checksum, db_checksum,
+                                           conflict, incoming=SIDE_FILE)
+                    if side == MERGE:
+                        to_merge.append((obj_id, folder, filename, filepath, rel, data, checksum,
+                                         entry, doc_id, db_checksum))
+                        continue
+                    if side != SIDE_FILE:
+                        continue    # the row wins (exported on its notification) or still in conflict
+                    if conflict is not None:
+                        resolved_conflicts.append(rel)
+                    in_sync.append((rel, st.st_size, st.st_mtime_ns, checksum))
+                    bases.append(data)
+                    if db_checksum != checksum:
+                        upserts.append(document_row(obj_id, folder, filename, rel, data, checksum))
+
+                if to_merge:
+                    cur.execute("SELECT id, content FROM documents WHERE id = ANY(%s)",
+                                ([m[8] for m in to_merge],))
+                    db_contents = dict(cur.fetchall())
+                    conflict_rows = []
+                    for obj_id, folder, filename, filepath, rel, data, checksum, entry, doc_id, db_checksum in to_merge:
+                        merged = self.merge_contents(entry.sha256, data, db_contents.get(doc_id))
+                        if merged is None:
+                            conflicts.append((rel, checksum, db_checksum))
+                            conflict_rows.append((doc_id, rel, checksum, db_checksum, 'file_to_db'))
+                            continue
+                        merged_checksum = sha256_bytes(merged)
+                        upserts.append(document_row(obj_id, folder, filename, rel, merged, merged_checksum))
+                        merged_files.append((filepath, merged))
+                    record_conflicts(cur, conflict_rows)
+
+                # Update or insert documents; unchanged rows are not
+                # touched (no version bump, no notification)
+                if upserts:
+                    written = execute_values(cur, """
+                        INSERT INTO documents
+                        (object_id, folder, filename, filepath, content, content_type, size_bytes, checksum)
+                        VALUES %s
+                        ON CONFLICT (object_id, folder, filename) DO UPDATE
+                        SET filepath = EXCLUDED.filepath,
+                            content = EXCLUDED.content,
+                            content_type = EXCLUDED.content_type,
+                            size_bytes = EXCLUDED.size_bytes,
+                            checksum = EXCLUDED.checksum,
+                            version = documents.version + 1,
+                            updated_at = NOW()
+                        WHERE documents.checksum IS DISTINCT FROM EXCLUDED.checksum
+                           OR documents.filepath IS DISTINCT FROM EXCLUDED.filepath
+                        RETURNING id, checksum
+                    """, upserts, page_size=50, fetch=True)
+                    # Before commit: the notifications may arrive right after it
+                    own_rows = [(('documents', doc_id), self.own_writes.record(('documents', doc_id), checksum))
+                                for doc_id, checksum in written]
+
+                self.conn.commit()
                 cur.close()
+                if own_rows:
+                    logger.info(f"Synced {len(own_rows)} document(s) to DB")
+
+            except Exception as e:
+                logger.error(f"Failed to sync {len(candidates)} document(s) to DB: {e}")
+                for key, generation in own_rows:
+                    self.own_writes.forget(key, generation)
+                self.conn.rollback()
                 return
-            obj_id = obj_result[0]
 
-            # Read file content
+        if in_sync:
+            self.manifest.record_many(in_sync)
+            self.manifest.put_bases(bases)
+        for rel in resolved_conflicts:
+            self.manifest.clear_conflict(rel)
+        for filepath, merged in merged_files:
+            self.manifest.clear_conflict(str(filepath.relative_to(KMS_ROOT)))
+            self.write_file(filepath, merged, f"Merged concurrent file and DB edits: {filepath}")
+        for rel, checksum, db_checksum in conflicts:
+            self.manifest.set_conflict(rel, checksum, db_checksum)
+            logger.warning(f"Conflict: {rel} changed in file and DB, left unchanged on both sides")
+
+    def merge_contents(self, base_checksum, file_data, db_content):
+        """Three-way merge of a file and a row; merged bytes, or None on conflict"""
+        base = self.manifest.get_base(base_checksum)
+        if base is None or db_content is None:
+            return None
+        result = merge3(base.decode('utf-8', errors='ignore'),
+                        file_data.decode('utf-8', errors='ignore'), db_content)
+        return result.text.encode('utf-8') if result.clean else None
+
+    def delete_documents(self, filepaths):
+        """Handle file deletions - remove the documents in one statement"""
+        rel_paths = []
+        for filepath in filepaths:
+            # Recreated before the batch ran (editor save via rename)
+            if filepath.exists():
+                continue
             try:
-                with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-            except Exception:
-                content = None
-
-            # Calculate checksum and size
-            checksum = calculate_checksum(filepath)
-            size_bytes = filepath.stat().st_size
-
-            # Determine content type
-            suffix = filepath.suffix.lower()
-            content_type = {
-                '.md': 'text/markdown',
-                '.txt': 'text/plain',
-                '.py': 'text/x-python',
-                '.js': 'text/javascript',
-                '.json': 'application/json',
-                '.yaml': 'application/yaml',
-                '.yml': 'application/yaml',
-            }.get(suffix, 'application/octet-stream')
-
-            # Update or insert document
-            cur.execute("""
-                INSERT INTO documents
-                (object_id, folder, filename, filepath, content, content_type, size_bytes, checksum)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (object_id, folder, filename) DO UPDATE
-                SET filepath = EXCLUDED.filepath,
-                    content = EXCLUDED.content,
-                    content_type = EXCLUDED.content_type,
-                    size_bytes = EXCLUDED.size_bytes,
-                    checksum = EXCLUDED.checksum,
-                    version = documents.version + 1,
-                    updated_at = NOW()
-            """, (
-                obj_id,
-                folder,
-                filename,
-                str(rel_path),
-                content,
-                content_type,
-                size_bytes,
-                checksum
-            ))
+                rel_paths.append(str(filepath.relative_to(KMS_ROOT)))
+            except ValueError:
+                continue
+        if not rel_paths:
+            return
 
+        try:
+            cur = self.conn.cursor()
+            cur.execute("DELETE FROM documents WHERE filepath = ANY(%s)", (rel_paths,))
+            deleted = cur.rowcount
             self.conn.commit()
             cur.close()
-            logger.info(f"Synced document to DB: {filepath}")
+            for rel in rel_paths:
+                self.manifest.remove(rel)
+            if deleted:
+                logger.info(f"Deleted {deleted} document(s) from DB")
 
         except Exception as e:
-            logger.error(f"Failed to sync document {filepath}: {e}")
+            logger.error(f"Failed to handle deletion of {len(rel_paths)} file(s): {e}")
             self.conn.rollback()
 
-    def handle_file_deletion(self, filepath):
-        """Handle file deletion - mark as deleted in DB"""
-        try:
-            rel_path = filepath.relative_to(KMS_ROOT)
+    def reconcile(self, event_queue):
+        """
+        Startup scan: sync what changed on either side while the daemon was down
+
+        File -> DB differences go through the event queue, so the worker
+        applies them in batches on its own connection; DB -> file
+        differences are exported here in batches.
+        """
+        started = time.monotonic()
+        is_document = lambda rel: parse_document_path(KMS_ROOT / rel) is not None
+        if self.shard is None:
+            files = scan_tree(CATEGORIES_DIR, relative_to=KMS_ROOT, include=is_document)
+            rows = self.query("SELECT filepath, size_bytes, checksum FROM documents WHERE filepath IS NOT NULL")
+        else:
+            files = {}
+            for category_dir in self.owned_category_dirs():
+                files.update(scan_tree(category_dir, relative_to=KMS_ROOT, include=is_document))
+            owned = sorted({slug for slug in self.hierarchy.categories() if self.owns(slug)}
+                           | {path.name for path in self.owned_category_dirs()})
+            rows = self.query("""
+                SELECT filepath, size_bytes, checksum FROM documents
+                WHERE filepath IS NOT NULL AND split_part(filepath, '/', 2) = ANY(%s)
+            """, (owned,))
+        scanned = time.monotonic()
+        documents = {filepath: (size, checksum) for filepath, size, checksum in rows}
+        plan = plan_reconcile(files, documents, self.manifest.entries(),
+                              lambda rel: sha256_file(KMS_ROOT / rel))
+
+        if plan.in_sync:
+            self.manifest.record_many(plan.in_sync)
+        # Files without a row: forget their entries so the worker uploads
+        # them; the others keep theirs as the merge base
+        self.manifest.remove_many([rel for rel in plan.upload if rel not in documents])
+        for rel in plan.upload:
+            event_queue.put(str(KMS_ROOT / rel), EVENT_UPSERT)
+        for rel in plan.delete:
+            event_queue.put(str(KMS_ROOT / rel), EVENT_DELETE)
+        for i in range(0, len(plan.export), SYNC_BATCH_SIZE):
+            self.export_documents("d.filepath = ANY(%s)", (plan.export[i:i + SYNC_BATCH_SIZE],))
+        self.manifest.prune_bases()
+
+        self.reconcile_stats = {
+            "files": len(files),
+            "documents": len(documents),
+            "hashed": plan.hashed,
+            "upload": len(plan.upload),
+            "delete": len(plan.delete),
+            "export": len(plan.export),
+            "scan_seconds": round(scanned - started, 3),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+        logger.info(
+            f"Reconciled {len(files)} files with {len(documents)} documents in "
+            f"{self.reconcile_stats['seconds']:.2f}s (scan {self.reconcile_stats['scan_seconds']:.2f}s, "
+            f"{plan.hashed} hashed): {len(plan.upload)} to DB, {len(plan.delete)} deleted, "
+            f"{len(plan.export)} to files"
+        )
+
+    def handle_db_notifications(self, events):
+        """Export documents named in kms_changes notifications"""
+        doc_ids = {
+            event['id'] for event in events
+            if event.get('table') == 'documents'
+            and event.get('action') in ('INSERT', 'UPDATE')
+            and event.get('id') is not None
+            # Rows the daemon just wrote from a file: nothing to export
+            and not self.own_writes.is_echo(('documents', event['id']), consume=True)
+        }
+        if doc_ids:
+            self.export_documents("d.id = ANY(%s)", (sorted(doc_ids),))
+
+    def handle_db_resync(self):
+        """(Re)connected to kms_changes - catch up on what was missed"""
+        if self.db_watermark is None:
+            # First connect: start from now, on the DB clock
+            self.export_documents("FALSE", ())
+            return
+        self.resync_pending = True
+        self.catch_up()
+
+    def catch_up(self):
+        """Watermark poll for changes made while notifications were not received"""
+        since = self.db_watermark - timedelta(seconds=WATERMARK_MARGIN)
+        logger.info(f"Catching up on DB changes since {since}")
+        if self.export_documents("d.updated_at > %s", (since,)):
+            self.resync_pending = False
+
+    def export_documents(self, where, params):
+        """Write the selected documents to files; returns False on a DB error"""
+        with self.export_lock:
+            try:
+                if self.export_conn.closed:
+                    self.export_conn = get_db_connection()
+                cur = self.export_conn.cursor()
+                # now() is the transaction start: nothing committed later is missed
+                cur.execute("SELECT now()")
+                db_now = cur.fetchone()[0]
+                if self.shard is not None:
+                    owned = [cat_id for slug, cat_id in self.hierarchy.categories().items() if self.owns(slug)]
+                    where, params = f"({where}) AND c.id = ANY(%s)", tuple(params) + (owned,)
+                cur.execute(f"{DOCUMENT_EXPORT_SQL} WHERE {where}", params)
+                rows = cur.fetchall()
+                cur.close()
+                self.export_conn.rollback()
+            except Exception as e:
+                logger.error(f"Failed to read DB changes: {e}")
+                try:
+                    self.export_conn.rollback()
+                except Exception:
+                    self.export_conn.close()
+                return False
+
+            for doc_id, folder, filename, checksum, content, obj_slug, cat_slug, sub_slug in rows:
+                file_path = document_file_path(cat_slug, sub_slug, obj_slug, folder, filename)
+                self.write_document_file(doc_id, file_path, content, checksum)
+
+            if self.db_watermark is None or db_now > self.db_watermark:
+                self.db_watermark = db_now
+            return True
+
+    def write_document_file(self, doc_id, file_path, content, checksum):
+        """
+        Write document content to its file unless it already has that checksum
+
+        A file that also changed since the last sync is three-way merged
+        with the row (the merge goes to both sides), or recorded as a
+        conflict and left alone.
+        """
+        if content is None:
+            return
 
-            cur = self.conn.cursor()
+        rel = str(file_path.relative_to(KMS_ROOT))
+        try:
+            st = file_path.stat()
+        except FileNotFoundError:
+            st = None
+        if st is None or not checksum:
+            self.write_file(file_path, content.encode('utf-8'))
+            return
 
-            # Delete document from DB
-            cur.execute("DELETE FROM documents WHERE filepath = %s", (str(rel_path),))
+        entry = self.manifest.get(rel)
+        file_data = None
+        if entry is not None and entry.size == st.st_size and entry.mtime_ns == st.st_mtime_ns:
+            # Manifest vouches for the file: compare checksums only
+            file_checksum = entry.sha256
+        else:
+            # Unknown to the manifest or changed: hash the file once
+            try:
+                with open(file_path, 'rb') as f:
+                    file_data = f.read()
+                file_checksum = sha256_bytes(file_data)
+            except OSError:
+                file_checksum = None
+
+        conflict = self.manifest.get_conflict(rel)
+        if file_checksum == checksum:
+            if file_data is not None:
+                self.manifest.record(rel, st, checksum)
+                self.manifest.put_bases([file_data])
+            if conflict is not None:
+                self.manifest.clear_conflict(rel)
+            return
 
-            self.conn.commit()
+        side = choose_side(entry.sha256 if entry else None, file_checksum, checksum,
+                           conflict, incoming=SIDE_DB)
+        if side == SIDE_DB:
+            if conflict is not None:
+                self.manifest.clear_conflict(rel)
+            self.write_file(file_path, content.encode('utf-8'))
+        elif side == MERGE:
+            merged = self.merge_contents(entry.sha256, file_data, content)
+            if merged is None:
+                self.record_export_conflict(doc_id, rel, file_checksum, checksum)
+            elif self.store_merged_document(doc_id, merged, checksum):
+                self.write_file(file_path, merged, f"Merged concurrent file and DB edits: {file_path}")
+        # SIDE_FILE: the watcher uploads the file; CONFLICT: already recorded
+
+    def store_merged_document(self, doc_id, merged, expected_checksum):
+        """Save a merge result unless the row changed meanwhile (its notification retries)"""
+        merged_checksum = sha256_bytes(merged)
+        generation = None
+        try:
+            cur = self.export_conn.cursor()
+            cur.execute("""
+                UPDATE documents
+                SET content = %s, checksum = %s, size_bytes = %s,
+                    version = version + 1, updated_at = NOW()
+                WHERE id = %s AND checksum = %s
+            """, (merged.decode('utf-8'), merged_checksum, len(merged), doc_id, expected_checksum))
+            stored = cur.rowcount == 1
+            if stored:
+                generation = self.own_writes.record(('documents', doc_id), merged_checksum)
+            self.export_conn.commit()
             cur.close()
-            logger.info(f"Deleted document from DB: {filepath}")
-
+            return stored
         except Exception as e:
-            logger.error(f"Failed to handle deletion of {filepath}: {e}")
-            self.conn.rollback()
-
-    def check_db_changes(self):
-        """Check for database changes and sync to files"""
+            logger.error(f"Failed to store merged document {doc_id}: {e}")
+            if generation is not None:
+                self.own_writes.forget(('documents', doc_id), generation)
+            self.export_conn.rollback()
+            return False
+
+    def record_export_conflict(self, doc_id, rel, file_checksum, db_checksum):
+        """Record a conflict found while exporting (sync_status and manifest)"""
         try:
-            cur = self.conn.cursor()
-
-            # Check for documents updated since last check
-            cur.execute("""
-                SELECT id, object_id, folder, filename, filepath, content, updated_at
-                FROM documents
-                WHERE updated_at > %s
-            """, (self.last_db_check,))
-
-            changed_docs = cur.fetchall()
-
-            for doc in changed_docs:
-                doc_id, obj_id, folder, filename, filepath, content, updated_at = doc
-
-                # Get object details
-                cur.execute("""
-                    SELECT o.slug, c.slug, sc.slug
-                    FROM objects o
-                    JOIN categories c ON o.category_id = c.id
-                    LEFT JOIN subcategories sc ON o.subcategory_id = sc.id
-                    WHERE o.id = %s
-                """, (obj_id,))
-                obj_result = cur.fetchone()
-                if not obj_result:
-                    continue
-
-                obj_slug, cat_slug, sub_slug = obj_result
-
-                # Construct file path
-                if sub_slug:
-                    file_path = KMS_ROOT / "categories" / cat_slug / "subcategories" / sub_slug / "objects" / obj_slug / folder / filename
-                else:
-                    file_path = KMS_ROOT / "categories" / cat_slug / "objects" / obj_slug / folder / filename
-
-                # Check if file exists and is different
-                needs_update = False
-                if not file_path.exists():
-                    needs_update = True
-                else:
-                    # Check if content is different
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            file_content = f.read()
-                        if file_content != content:
-                            needs_update = True
-                    except Exception:
-                        needs_update = True
-
-                if needs_update and content is not None:
-                    # Create parent directory if needed
-                    file_path.parent.mkdir(parents=True, exist_ok=True)
-
-                    # Write content to file
-                    try:
-                        with open(file_path, 'w', encoding='utf-8') as f:
-                            f.write(content)
-                        logger.info(f"Synced DB change to file: {file_path}")
-                    except Exception as e:
-                        logger.error(f"Failed to write {file_path}: {e}")
-
+            cur = self.export_conn.cursor()
+            record_conflicts(cur, [(doc_id, rel, file_checksum, db_checksum, 'db_to_file')])
+            self.export_conn.commit()
             cur.close()
-            self.last_db_check = datetime.now()
-
         except Exception as e:
-            logger.error(f"Failed to check DB changes: {e}")
+            logger.error(f"Failed to record conflict for {rel}: {e}")
+            self.export_conn.rollback()
+        self.manifest.set_conflict(rel, file_checksum, db_checksum)
+        logger.warning(f"Conflict: {rel} changed in file and DB, left unchanged on both sides")
+
+    def write_file(self, file_path, data, message=None):
+        """
+        Write a file and record it as in sync (manifest entry and merge base)
+
+        Written to a hidden temp file and renamed into place: readers never
+        see a partial file, and the final stat is known before the watcher
+        sees the rename, so its echo is dropped (own_writes).
+        """
+        # Create parent directory if needed
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = file_path.with_name(f".{file_path.name}.kms-sync-tmp")
+        checksum = sha256_bytes(data)
+        generation = None
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            st = tmp_path.stat()
+            generation = self.own_writes.record(str(file_path), checksum, (st.st_size, st.st_mtime_ns))
+            os.replace(tmp_path, file_path)
+            self.manifest.record(str(file_path.relative_to(KMS_ROOT)), st, checksum)
+            self.manifest.put_bases([data])
+            logger.info(message or f"Synced DB change to file: {file_path}")
+        except Exception as e:
+            logger.error(f"Failed to write {file_path}: {e}")
+            if generation is not None:
+                self.own_writes.forget(str(file_path), generation)
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
 
     def close(self):
-        """Close database connection"""
+        """Stop listening and close database connections"""
+        self.change_feed.stop()
+        self.export_conn.close()
+        self.manifest.close()
         if self.conn:
             self.conn.close()
             logger.info("Database connection closed")
@@ -574,54 +947,147 @@ def remove_pid_file():
     except Exception as e:
         logger.error(f"Failed to remove PID file: {e}")
 
-def main():
-    """Main daemon function"""
-    logger.info("=" * 70)
-    logger.info("KMS Synchronization Daemon Starting")
-    logger.info("=" * 70)
-    logger.info(f"KMS Root: {KMS_ROOT}")
-    logger.info(f"Database: {DB_NAME}@{DB_HOST}")
-    logger.info(f"Log File: {LOG_FILE}")
+def file_sync_worker(sync_manager, event_queue):
+    """Apply queued file events in batches until shutdown, then drain"""
+    while True:
+        stopping = shutdown_flag
+        batch = event_queue.get_batch(timeout=1.0, flush=stopping)
+        if batch:
+            started = time.monotonic()
+            try:
+                sync_manager.apply_file_events(batch)
+            except Exception as e:
+                logger.error(f"Failed to apply {len(batch)} file event(s): {e}")
+            event_queue.record_batch(batch, time.monotonic() - started)
+        elif stopping:
+            return
 
-    write_pid_file()
+def shard_stats_file(shard):
+    """Stats file of a sharded worker (the supervisor publishes SYNC_STATS_FILE)"""
+    return SYNC_STATS_FILE if shard is None else f"{SYNC_STATS_FILE}.shard{shard}"
+
+def write_daemon_stats(sync_manager, event_queue):
+    """Publish queue depth/lag and change feed state for /metrics"""
+    try:
+        write_stats({
+            "pid": os.getpid(),
+            "shard": sync_manager.shard,
+            "queue": event_queue.stats(),
+            "change_feed": sync_manager.change_feed.stats(),
+            "hierarchy": sync_manager.hierarchy.stats(),
+            "reconcile": sync_manager.reconcile_stats,
+            "own_writes": sync_manager.own_writes.stats(),
+            "db_watermark": sync_manager.db_watermark,
+        }, shard_stats_file(sync_manager.shard))
+    except Exception as e:
+        logger.warning(f"Failed to write stats file: {e}")
+
+class NewCategoryHandler(FileSystemEventHandler):
+    """Sharded worker: start watching category directories created later"""
+
+    def __init__(self, observer, event_handler, sync_manager, event_queue):
+        self.observer = observer
+        self.event_handler = event_handler
+        self.sync_manager = sync_manager
+        self.event_queue = event_queue
+        self.watched = set()
+        super().__init__()
+
+    def watch(self, category_dir):
+        if category_dir in self.watched:
+            return False
+        self.watched.add(category_dir)
+        self.observer.schedule(self.event_handler, str(category_dir), recursive=True)
+        return True
+
+    def on_created(self, event):
+        category_dir = Path(event.src_path)
+        if not event.is_directory or category_dir.name.startswith('.'):
+            return
+        if not self.sync_manager.owns(category_dir.name) or not self.watch(category_dir):
+            return
+        logger.info(f"Watching new category {category_dir.name}")
+        # Files created before the watch was in place
+        for rel in scan_tree(category_dir, relative_to=KMS_ROOT):
+            self.event_queue.put(str(KMS_ROOT / rel), EVENT_UPSERT)
+
+def start_watcher(sync_manager, event_queue):
+    """Watch the whole tree, or only the owned categories of a sharded worker"""
+    event_handler = FileChangeHandler(event_queue, sync_manager.own_writes)
+    observer = Observer()
+    if sync_manager.shard is None:
+        observer.schedule(event_handler, str(CATEGORIES_DIR), recursive=True)
+    else:
+        categories = NewCategoryHandler(observer, event_handler, sync_manager, event_queue)
+        for category_dir in sync_manager.owned_category_dirs():
+            categories.watch(category_dir)
+        observer.schedule(categories, str(CATEGORIES_DIR), recursive=False)
+        logger.info(f"Shard {sync_manager.shard}/{sync_manager.shards}: "
+                    f"{len(categories.watched)} categories")
+    observer.start()
+    return observer
+
+def run_worker(shard=None, shards=1):
+    """Sync the whole tree (shard None) or the categories of one shard"""
+    if shard is None:
+        write_pid_file()
 
     try:
         # Initialize sync manager
-        sync_manager = SyncManager()
+        sync_manager = SyncManager(shard, shards)
         logger.info("Sync manager initialized")
 
+        # File -> DB: watcher feeds a coalescing queue, one worker applies batches
+        event_queue = CoalescingQueue()
+        worker = threading.Thread(
+            target=file_sync_worker, args=(sync_manager, event_queue),
+            name="kms-file-sync", daemon=True
+        )
+        worker.start()
+
         # Setup file watcher
-        event_handler = FileChangeHandler(sync_manager)
-        observer = Observer()
-        observer.schedule(event_handler, str(CATEGORIES_DIR), recursive=True)
-        observer.start()
+        observer = start_watcher(sync_manager, event_queue)
         logger.info(f"File watcher started on {CATEGORIES_DIR}")
 
         logger.info("=" * 70)
         logger.info("Daemon running - monitoring for changes")
         logger.info("=" * 70)
 
-        # Main loop
+        # DB -> file: LISTEN kms_changes
+        sync_manager.start()
+        logger.info("Listening for database changes on kms_changes")
+
+        # Catch up on changes made while stopped; anything changing during
+        # the scan is also seen by the watcher and the change feed
+        try:
+            sync_manager.reconcile(event_queue)
+        except Exception as e:
+            logger.error(f"Startup reconciliation failed: {e}")
+
+        # Main loop (no DB polling; retries a failed post-reconnect catch-up)
+        last_stats = 0.0
         while not shutdown_flag:
             try:
-                # Check for database changes
-                sync_manager.check_db_changes()
-
-                # Sleep for poll interval
-                time.sleep(POLL_INTERVAL)
+                time.sleep(1)
+                if sync_manager.resync_pending:
+                    sync_manager.catch_up()
+                if time.monotonic() - last_stats >= STATS_INTERVAL:
+                    write_daemon_stats(sync_manager, event_queue)
+                    last_stats = time.monotonic()
 
             except KeyboardInterrupt:
                 break
             except Exception as e:
                 logger.error(f"Error in main loop: {e}")
-                time.sleep(POLL_INTERVAL)
 
         # Cleanup
         logger.info("Shutting down...")
         observer.stop()
         observer.join()
+        worker.join(timeout=30)
         sync_manager.close()
-        remove_pid_file()
+        if shard is None:
+            remove_pid_file()
 
         logger.info("=" * 70)
         logger.info("KMS Synchronization Daemon Stopped")
@@ -631,10 +1097,140 @@ def main():
         logger.error(f"Fatal error: {e}")
         import traceback
         traceback.print_exc()
-        remove_pid_file()
+        if shard is None:
+            remove_pid_file()
         return 1
 
     return 0
 
+class WorkerProcess:
+    """One supervised shard worker"""
+
+    def __init__(self, shard, shards):
+        self.shard = shard
+        self.shards = shards
+        self.proc = None
+        self.started = 0.0
+        self.restarts = 0
+        self.restart_delay = 1.0
+        self.restart_at = 0.0
+        self.exit_code = None
+
+    def start(self):
+        self.proc = subprocess.Popen([
+            sys.executable, os.path.abspath(__file__),
+            "--workers", str(self.shards), "--shard", str(self.shard)
+        ])
+        self.started = time.monotonic()
+        logger.info(f"Started shard {self.shard} worker (pid {self.proc.pid})")
+
+    def check(self):
+        """Restart the worker if it exited, with doubling backoff"""
+        now = time.monotonic()
+        if self.proc is not None and self.proc.poll() is not None:
+            self.exit_code = self.proc.returncode
+            logger.error(f"Shard {self.shard} worker (pid {self.proc.pid}) exited with {self.exit_code}, "
+                         f"restarting in {self.restart_delay:.0f}s")
+            # A worker that ran for a while gets a fresh backoff
+            if now - self.started > MAX_RESTART_DELAY:
+                self.restart_delay = 1.0
+            self.restart_at = now + self.restart_delay
+            self.restart_delay = min(self.restart_delay * 2, MAX_RESTART_DELAY)
+            self.proc = None
+        if self.proc is None and now >= self.restart_at:
+            self.restarts += 1
+            self.start()
+
+    def stop(self, timeout=40):
+        if self.proc is None or self.proc.poll() is not None:
+            return
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            logger.error(f"Shard {self.shard} worker did not stop, killing it")
+            self.proc.kill()
+            self.proc.wait()
+
+    def health(self, stats):
+        alive = self.proc is not None and self.proc.poll() is None
+        age = time.time() - stats["written_at"] if stats and "written_at" in stats else None
+        return {
+            "shard": self.shard,
+            "pid": self.proc.pid if self.proc is not None else None,
+            "alive": alive,
+            # Alive and reporting: a hung worker stops writing stats
+            "healthy": alive and age is not None and age < 3 * STATS_INTERVAL,
+            "restarts": self.restarts,
+            "last_exit_code": self.exit_code,
+            "stats_age_seconds": round(age, 1) if age is not None else None,
+        }
+
+def run_supervisor(shards):
+    """Run one worker process per shard, restart crashed ones, aggregate their health"""
+    write_pid_file()
+    logger.info(f"Supervising {shards} sync workers (categories by consistent hash)")
+
+    workers = [WorkerProcess(shard, shards) for shard in range(shards)]
+    for worker in workers:
+        worker.start()
+
+    last_stats = 0.0
+    while not shutdown_flag:
+        try:
+            time.sleep(1)
+            for worker in workers:
+                worker.check()
+            if time.monotonic() - last_stats >= STATS_INTERVAL:
+                shard_stats = {worker.shard: read_stats(shard_stats_file(worker.shard)) for worker in workers}
+                health = [worker.health(shard_stats[worker.shard]) for worker in workers]
+                write_stats(dict(aggregate_worker_stats(health, shard_stats), pid=os.getpid()))
+                last_stats = time.monotonic()
+        except KeyboardInterrupt:
+            break
+        except Exception as e:
+            logger.error(f"Error in supervisor loop: {e}")
+
+    logger.info("Stopping sync workers...")
+    for worker in workers:
+        if worker.proc is not None and worker.proc.poll() is None:
+            worker.proc.terminate()
+    for worker in workers:
+        worker.stop()
+    remove_pid_file()
+    logger.info("KMS Synchronization Daemon Stopped")
+    return 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='KMS bidirectional file/DB sync daemon')
+    parser.add_argument('--workers', type=int, default=SYNC_WORKERS,
+                        help=f'Worker processes, each owning a share of the categories (default: {SYNC_WORKERS})')
+    parser.add_argument('--shard', type=int, default=None,
+                        help='Run as the worker for this shard (started by the supervisor)')
+    return parser.parse_args(argv)
+
+def main():
+    """Main daemon function"""
+    args = parse_args()
+    shards = max(1, args.workers)
+
+    if args.shard is not None:
+        # Tag this worker's log lines
+        for handler in logging.getLogger().handlers:
+            handler.setFormatter(logging.Formatter(
+                f'%(asctime)s - shard {args.shard} - %(levelname)s - %(message)s'))
+        return run_worker(args.shard, shards)
+
+    logger.info("=" * 70)
+    logger.info("KMS Synchronization Daemon Starting")
+    logger.info("=" * 70)
+    logger.info(f"KMS Root: {KMS_ROOT}")
+    logger.info(f"Database: {DB_NAME}@{DB_HOST}")
+    logger.info(f"Log File: {LOG_FILE}")
+
+    if shards > 1:
+        return run_supervisor(shards)
+    return run_worker()
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,150 @@
+-- Stored full-text search vector for documents
+-- Replaces on-the-fly to_tsvector() in search with a weighted, trigger-maintained
+-- column and a GIN index: A = filename, B = markdown headings, C = body.
+-- Date: 2026-10-17
+--
+-- Run with psql outside an explicit transaction (CALL ... COMMIT and
+-- CREATE INDEX CONCURRENTLY need autocommit):
+--   psql -d kms_db -f sql/004_documents_search_vector.sql
+
+-- ============================================================================
+-- COLUMN + VECTOR FUNCTION
+-- ============================================================================
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION document_search_vector(p_filename TEXT, p_content TEXT)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT
+        -- "install-guide.md" also indexed as "install guide md"
+        setweight(to_tsvector('english',
+            COALESCE(p_filename, '') || ' ' ||
+            regexp_replace(COALESCE(p_filename, ''), '[._/-]+', ' ', 'g')), 'A')
+        || setweight(to_tsvector('english', COALESCE(
+            (SELECT string_agg(m[1], ' ')
+             FROM regexp_matches(COALESCE(p_content, ''), '^\s{0,3}#{1,6}\s+(.+)$', 'gn') AS m),
+            '')), 'B')
+        || setweight(to_tsvector('english', COALESCE(p_content, '')), 'C')
+$$;
+
+COMMENT ON FUNCTION document_search_vector(TEXT, TEXT) IS 'Weighted tsvector of a document: filename (A), headings (B), body (C)';
+
+-- ============================================================================
+-- TRIGGER (covers API, sync daemon and importer writes)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION documents_search_vector_update()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.search_vector := document_search_vector(NEW.filename, NEW.content);
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS documents_search_vector_update ON documents;
+CREATE TRIGGER documents_search_vector_update
+    BEFORE INSERT OR UPDATE OF filename, content ON documents
+    FOR EACH ROW EXECUTE FUNCTION documents_search_vector_update();
+
+-- ============================================================================
+-- BACKFILL (batched, one commit per batch)
+-- ============================================================================
+
+-- The backfill only sets search_vector; the per-row triggers would otherwise
+-- bump updated_at, flood change_log/kms_changes and mark every document as
+-- pending sync. Each batch transaction runs with session_replication_role =
+-- replica (SET LOCAL), which skips them for this session only: no ALTER
+-- TABLE, no table lock, concurrent readers and writers are unaffected and
+-- keep firing their triggers. Needs a superuser (or, on PostgreSQL 15+,
+-- GRANT SET ON PARAMETER session_replication_role).
+CREATE OR REPLACE PROCEDURE backfill_documents_search_vector(p_batch_size INTEGER DEFAULT 500)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows INTEGER;
+    v_total INTEGER := 0;
+BEGIN
+    LOOP
+        -- Reset by every COMMIT
+        SET LOCAL session_replication_role = replica;
+
+        UPDATE documents
+        SET search_vector = document_search_vector(filename, content)
+        WHERE id IN (
+            SELECT id FROM documents
+            WHERE search_vector IS NULL
+            ORDER BY id
+            LIMIT p_batch_size
+        );
+        GET DIAGNOSTICS v_rows = ROW_COUNT;
+        COMMIT;
+
+        v_total := v_total + v_rows;
+        RAISE NOTICE 'search_vector backfill: % documents', v_total;
+        EXIT WHEN v_rows < p_batch_size;
+    END LOOP;
+END;
+$$;
+
+CALL backfill_documents_search_vector(500);
+
+-- ============================================================================
+-- INDEXES
+-- ============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_documents_search_vector
+    ON documents USING gin (search_vector);
+
+-- Superseded: nothing queries the on-the-fly content expression any more
+DROP INDEX CONCURRENTLY IF EXISTS idx_documents_content_fts;
+
+-- ============================================================================
+-- SEARCH FUNCTION + VIEW
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION search_documents(search_query text)
+RETURNS TABLE(document_id integer, object_name character varying, folder character varying, filename character varying, rank real)
+LANGUAGE plpgsql STABLE
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        d.id,
+        o.name::VARCHAR,
+        d.folder::VARCHAR,
+        d.filename::VARCHAR,
+        ts_rank(d.search_vector, query) AS rank
+    FROM documents d
+    JOIN objects o ON d.object_id = o.id,
+         plainto_tsquery('english', search_query) AS query
+    WHERE d.search_vector @@ query
+    ORDER BY 5 DESC;
+END;
+$$;
+
+CREATE OR REPLACE VIEW v_documents_search AS
+ SELECT d.id,
+    d.object_id,
+    d.folder,
+    d.filename,
+    d.filepath,
+    d.content_type,
+    d.size_bytes,
+    o.name AS object_name,
+    c.name AS category_name,
+    sc.name AS subcategory_name,
+    d.created_at,
+    d.updated_at,
+    to_tsvector('english'::regconfig, COALESCE(d.content, ''::text)) AS content_vector,
+    to_tsvector('english'::regconfig, (d.filename)::text) AS filename_vector,
+    d.search_vector
+   FROM (((documents d
+     JOIN objects o ON ((d.object_id = o.id)))
+     JOIN categories c ON ((o.category_id = c.id)))
+     LEFT JOIN subcategories sc ON ((o.subcategory_id = sc.id)));
+
+ANALYZE documents;
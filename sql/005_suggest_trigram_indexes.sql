@@ -0,0 +1,24 @@
+-- Indexes for /api/search/suggest
+-- Trigram GIN indexes serve substring (ILIKE '%q%') and similarity (%)
+-- matches; lower(name) text_pattern_ops btrees serve short prefix lookups.
+-- Date: 2026-10-17
+--
+-- Run with psql outside an explicit transaction (CREATE INDEX CONCURRENTLY):
+--   psql -d kms_db -f sql/005_suggest_trigram_indexes.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_objects_name_trgm
+    ON objects USING gin (name gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_documents_filename_trgm
+    ON documents USING gin (filename gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_objects_name_prefix
+    ON objects (lower(name) text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_documents_filename_prefix
+    ON documents (lower(filename) text_pattern_ops);
+
+ANALYZE objects;
+ANALYZE documents;
@@ -0,0 +1,178 @@
+-- Chunked document content for paragraph-level search
+-- document_chunks holds each document's content split at headings and
+-- paragraph breaks, with character offsets into documents.content and a
+-- per-chunk tsvector. Maintained by trigger like documents.search_vector.
+-- Date: 2026-10-17
+--
+-- Run with psql outside an explicit transaction (CALL ... COMMIT and
+-- CREATE INDEX CONCURRENTLY need autocommit):
+--   psql -d kms_db -f sql/006_document_chunks.sql
+
+-- ============================================================================
+-- TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS document_chunks (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    chunk_no INTEGER NOT NULL,
+    heading TEXT,
+    start_offset INTEGER NOT NULL,      -- 0-based character offset in documents.content
+    end_offset INTEGER NOT NULL,        -- exclusive
+    content TEXT NOT NULL,
+    search_vector tsvector NOT NULL,
+    PRIMARY KEY (document_id, chunk_no)
+);
+
+COMMENT ON TABLE document_chunks IS 'Documents split at headings/paragraphs for chunk-level full-text search';
+
+-- ============================================================================
+-- CHUNKER
+-- ============================================================================
+
+-- Splits before every markdown heading, at the first blank line once a
+-- chunk reaches p_target characters, and at any line once it would exceed
+-- p_max. Offsets only depend on the content, so they are stable across
+-- re-chunking of unchanged text.
+CREATE OR REPLACE FUNCTION document_chunks_of(p_content TEXT, p_target INTEGER DEFAULT 1500, p_max INTEGER DEFAULT 4000)
+RETURNS TABLE(chunk_no INTEGER, heading TEXT, start_offset INTEGER, end_offset INTEGER, content TEXT)
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+DECLARE
+    v_line TEXT;
+    v_lines TEXT[] := '{}';
+    v_pos INTEGER := 0;
+    v_start INTEGER := 0;
+    v_len INTEGER := 0;
+    v_no INTEGER := 0;
+    v_heading TEXT;
+    v_chunk_heading TEXT;
+    v_is_heading BOOLEAN;
+    v_total INTEGER;
+BEGIN
+    IF p_content IS NULL OR p_content = '' THEN
+        RETURN;
+    END IF;
+    v_total := length(p_content);
+
+    FOR v_line IN SELECT l FROM regexp_split_to_table(p_content, E'\n') AS l LOOP
+        v_is_heading := v_line ~ '^\s{0,3}#{1,6}\s+\S';
+
+        IF v_len > 0 AND (
+            v_is_heading
+            OR (v_len >= p_target AND v_line ~ '^\s*$')
+            OR v_len + length(v_line) > p_max
+        ) THEN
+            chunk_no := v_no;
+            heading := v_chunk_heading;
+            start_offset := v_start;
+            end_offset := v_pos;
+            content := array_to_string(v_lines, E'\n') || E'\n';
+            RETURN NEXT;
+            v_no := v_no + 1;
+            v_start := v_pos;
+            v_len := 0;
+            v_lines := '{}';
+        END IF;
+
+        IF v_is_heading THEN
+            v_heading := regexp_replace(v_line, '^\s{0,3}#{1,6}\s+|\s+#*\s*$', '', 'g');
+        END IF;
+        IF v_len = 0 THEN
+            v_chunk_heading := v_heading;
+        END IF;
+
+        v_lines := v_lines || v_line;
+        v_len := v_len + length(v_line) + 1;
+        v_pos := v_pos + length(v_line) + 1;
+    END LOOP;
+
+    -- The last line has no trailing newline
+    IF v_len > 0 AND least(v_pos, v_total) > v_start THEN
+        chunk_no := v_no;
+        heading := v_chunk_heading;
+        start_offset := v_start;
+        end_offset := least(v_pos, v_total);
+        content := array_to_string(v_lines, E'\n');
+        RETURN NEXT;
+    END IF;
+END;
+$$;
+
+COMMENT ON FUNCTION document_chunks_of(TEXT, INTEGER, INTEGER) IS 'Split content into heading/paragraph chunks with character offsets';
+
+CREATE OR REPLACE FUNCTION refresh_document_chunks(p_document_id INTEGER, p_content TEXT)
+RETURNS void
+LANGUAGE sql
+AS $$
+    DELETE FROM document_chunks WHERE document_id = p_document_id;
+    INSERT INTO document_chunks (document_id, chunk_no, heading, start_offset, end_offset, content, search_vector)
+    SELECT p_document_id, c.chunk_no, c.heading, c.start_offset, c.end_offset, c.content,
+           setweight(to_tsvector('english', COALESCE(c.heading, '')), 'B')
+           || setweight(to_tsvector('english', c.content), 'C')
+    FROM document_chunks_of(p_content) AS c;
+$$;
+
+-- ============================================================================
+-- TRIGGER
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION documents_chunks_update()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR NEW.content IS DISTINCT FROM OLD.content THEN
+        PERFORM refresh_document_chunks(NEW.id, NEW.content);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS documents_chunks_update ON documents;
+CREATE TRIGGER documents_chunks_update
+    AFTER INSERT OR UPDATE OF content ON documents
+    FOR EACH ROW EXECUTE FUNCTION documents_chunks_update();
+
+-- ============================================================================
+-- BACKFILL (batched, one commit per batch)
+-- ============================================================================
+
+CREATE OR REPLACE PROCEDURE backfill_document_chunks(p_batch_size INTEGER DEFAULT 200)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_doc RECORD;
+    v_rows INTEGER;
+    v_total INTEGER := 0;
+BEGIN
+    LOOP
+        v_rows := 0;
+        FOR v_doc IN
+            SELECT d.id, d.content FROM documents d
+            WHERE d.content IS NOT NULL AND d.content <> ''
+              AND NOT EXISTS (SELECT 1 FROM document_chunks ch WHERE ch.document_id = d.id)
+            ORDER BY d.id
+            LIMIT p_batch_size
+        LOOP
+            PERFORM refresh_document_chunks(v_doc.id, v_doc.content);
+            v_rows := v_rows + 1;
+        END LOOP;
+        COMMIT;
+
+        v_total := v_total + v_rows;
+        RAISE NOTICE 'document_chunks backfill: % documents', v_total;
+        EXIT WHEN v_rows < p_batch_size;
+    END LOOP;
+END;
+$$;
+
+CALL backfill_document_chunks(200);
+
+-- ============================================================================
+-- INDEXES
+-- ============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_document_chunks_search_vector
+    ON document_chunks USING gin (search_vector);
+
+ANALYZE document_chunks;
@@ -0,0 +1,64 @@
+-- Byte offsets for document chunks
+-- start_byte is the UTF-8 byte position of each chunk in documents.content,
+-- so /api/documents/{id}/content can serve HTTP Range requests by reading
+-- only the chunks that overlap the range.
+-- Date: 2026-10-17
+--
+-- Run with psql outside an explicit transaction (CALL ... COMMIT):
+--   psql -d kms_db -f sql/007_document_chunk_byte_offsets.sql
+
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS start_byte BIGINT;
+
+CREATE OR REPLACE FUNCTION refresh_document_chunks(p_document_id INTEGER, p_content TEXT)
+RETURNS void
+LANGUAGE sql
+AS $$
+    DELETE FROM document_chunks WHERE document_id = p_document_id;
+    INSERT INTO document_chunks (document_id, chunk_no, heading, start_offset, end_offset, content, search_vector, start_byte)
+    SELECT p_document_id, c.chunk_no, c.heading, c.start_offset, c.end_offset, c.content,
+           setweight(to_tsvector('english', COALESCE(c.heading, '')), 'B')
+           || setweight(to_tsvector('english', c.content), 'C'),
+           COALESCE(sum(octet_length(c.content)) OVER (
+               ORDER BY c.chunk_no ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0)
+    FROM document_chunks_of(p_content) AS c;
+$$;
+
+CREATE OR REPLACE PROCEDURE backfill_document_chunk_bytes(p_batch_size INTEGER DEFAULT 500)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_docs INTEGER[];
+    v_total INTEGER := 0;
+BEGIN
+    LOOP
+        SELECT array_agg(document_id) INTO v_docs
+        FROM (
+            SELECT DISTINCT document_id FROM document_chunks
+            WHERE start_byte IS NULL
+            ORDER BY document_id
+            LIMIT p_batch_size
+        ) batch;
+        EXIT WHEN v_docs IS NULL;
+
+        UPDATE document_chunks ch
+        SET start_byte = x.start_byte
+        FROM (
+            SELECT document_id, chunk_no,
+                   COALESCE(sum(octet_length(content)) OVER (
+                       PARTITION BY document_id ORDER BY chunk_no
+                       ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0) AS start_byte
+            FROM document_chunks
+            WHERE document_id = ANY(v_docs)
+        ) x
+        WHERE ch.document_id = x.document_id AND ch.chunk_no = x.chunk_no;
+        COMMIT;
+
+        v_total := v_total + array_length(v_docs, 1);
+        RAISE NOTICE 'document_chunks start_byte backfill: % documents', v_total;
+    END LOOP;
+END;
+$$;
+
+CALL backfill_document_chunk_bytes(500);
+
+ALTER TABLE document_chunks ALTER COLUMN start_byte SET NOT NULL;
@@ -0,0 +1,18 @@
+-- kms_changes notifications for categories and subcategories
+-- documents and objects already publish through notify_change(); the
+-- slug -> ID hierarchy index of the sync daemon also needs renames and
+-- deletes of categories and subcategories.
+-- Date: 2026-10-17
+--
+-- Run with psql:
+--   psql -d kms_db -f sql/008_hierarchy_change_notify.sql
+
+DROP TRIGGER IF EXISTS notify_categories_change ON categories;
+CREATE TRIGGER notify_categories_change
+    AFTER INSERT OR DELETE OR UPDATE ON categories
+    FOR EACH ROW EXECUTE FUNCTION notify_change();
+
+DROP TRIGGER IF EXISTS notify_subcategories_change ON subcategories;
+CREATE TRIGGER notify_subcategories_change
+    AFTER INSERT OR DELETE OR UPDATE ON subcategories
+    FOR EACH ROW EXECUTE FUNCTION notify_change();
@@ -0,0 +1,125 @@
+"""
+KMS Async DB Benchmark
+p50/p99 latency of mixed concurrent login + credential-list traffic,
+with blocking calls on the event loop vs. offloaded via run_db/run_in_threadpool.
+
+No PostgreSQL needed: queries are simulated with a blocking sleep of
+--query-ms, bcrypt is real (cost --bcrypt-rounds).
+
+Usage:
+    python tests/bench_async_db.py [--requests 400] [--rate 40]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import bcrypt
+from starlette.concurrency import run_in_threadpool
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from database import run_db
+
+
+def blocking_query(ms: float):
+    """Stand-in for a psycopg2 round trip"""
+    time.sleep(ms / 1000)
+
+
+async def login_blocking(args, password, hashed):
+    blocking_query(args.query_ms)                       # get_user_by_username
+    bcrypt.checkpw(password, hashed)                    # verify_password
+    for _ in range(3):                                  # session, last_login, audit
+        blocking_query(args.query_ms)
+
+
+async def login_offloaded(args, password, hashed):
+    await run_db(blocking_query, args.query_ms)
+    await run_in_threadpool(bcrypt.checkpw, password, hashed)
+    for _ in range(3):
+        await run_db(blocking_query, args.query_ms)
+
+
+async def list_blocking(args):
+    for _ in range(2):                                  # session lookup, credentials query
+        blocking_query(args.query_ms)
+
+
+async def list_offloaded(args):
+    for _ in range(2):
+        await run_db(blocking_query, args.query_ms)
+
+
+async def run_mode(args, login, list_credentials, password, hashed):
+    """Open-loop load: requests arrive at --rate/s, latency counted from arrival"""
+    latencies = {"login": [], "list": []}
+    rng = random.Random(42)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def one(kind, arrival):
+        if kind == "login":
+            await login(args, password, hashed)
+        else:
+            await list_credentials(args)
+        latencies[kind].append((loop.time() - arrival) * 1000)
+
+    tasks = []
+    arrival = start
+    for _ in range(args.requests):
+        arrival += rng.expovariate(args.rate)
+        delay = arrival - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = "login" if rng.random() < args.login_ratio else "list"
+        tasks.append(asyncio.create_task(one(kind, arrival)))
+    await asyncio.gather(*tasks)
+    return latencies, loop.time() - start
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name, latencies, elapsed, total):
+    print(f"\n{name}")
+    print(f"  throughput: {total / elapsed:8.1f} req/s")
+    for kind, values in latencies.items():
+        print(f"  {kind:5s}  n={len(values):4d}  p50={statistics.median(values):8.1f} ms"
+              f"  p99={percentile(values, 99):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async DB path benchmark")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=40.0, help="arrivals per second")
+    parser.add_argument("--query-ms", type=float, default=5.0)
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    parser.add_argument("--login-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    password = b"benchmark-password"
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds=args.bcrypt_rounds))
+
+    print(f"{args.requests} requests at {args.rate:.0f}/s, "
+          f"{args.login_ratio:.0%} logins, query {args.query_ms} ms, bcrypt cost {args.bcrypt_rounds}")
+
+    latencies, elapsed = asyncio.run(run_mode(args, login_blocking, list_blocking, password, hashed))
+    report("Blocking on event loop (before)", latencies, elapsed, args.requests)
+
+    latencies, elapsed = asyncio.run(run_mode(args, login_offloaded, list_offloaded, password, hashed))
+    report("Offloaded via run_db / run_in_threadpool (after)", latencies, elapsed, args.requests)
+
+
+if __name__ == "__main__":
+    main()
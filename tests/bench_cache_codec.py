@@ -0,0 +1,118 @@
+"""
+KMS Cache Codec Benchmark
+Encode/decode time and stored bytes of cached payloads per serializer and
+compression, against the previous json.dumps text path; plus the cost of
+deriving a cache key from call arguments (md5 of a sorted JSON dump vs.
+call_key).
+
+No Redis needed: only the bytes that would be stored are measured.
+Payloads mimic jsonable list_objects pages (v_objects_full rows with
+metadata JSONB) of --rows rows.
+
+Usage:
+    python tests/bench_cache_codec.py [--rows 100 500] [--repeat 200]
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.cache_codec import COMPRESSORS, SERIALIZERS, CacheCodec, call_key
+
+WORDS = ("sync", "daemon", "cache", "object", "category", "phase", "task", "spec", "draft", "review")
+
+
+def make_rows(count: int, seed: int = 42):
+    """list_objects page after jsonable_encoder"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": i, "uuid": f"{rng.getrandbits(128):032x}", "object_slug": f"object-{i}",
+            "object_name": " ".join(rng.choices(WORDS, k=3)).title(),
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(5, 30))),
+            "status": rng.choice(("draft", "active", "archived")), "author": "kms", "file_path": f"p/{i}",
+            "metadata": {
+                "specification": " ".join(rng.choices(WORDS, k=rng.randint(10, 80))),
+                "phases": [{"name": f"Phase {p}", "done": rng.random() < 0.5} for p in range(rng.randint(0, 5))],
+                "priority": rng.randint(1, 5),
+            },
+            "category_id": i % 7, "category_slug": f"cat-{i % 7}", "category_name": f"Category {i % 7}",
+            "category_type": "product", "subcategory_id": None, "subcategory_slug": None,
+            "subcategory_name": None, "tags": rng.sample(WORDS, 2),
+            "created_at": "2026-10-17T12:00:00.123456", "updated_at": "2026-10-17T12:30:45.654321",
+        })
+    return {"t": {"objects": 12}, "v": {"v": rows, "x": 1792234800.0, "d": 0.0123}}
+
+
+def timed(fn, repeat: int) -> float:
+    """Median microseconds per call"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def bench_payloads(rows: int, repeat: int):
+    value = make_rows(rows)
+
+    # Before: json.dumps(default=str) text, json.loads on every Redis hit
+    text = json.dumps(value, default=str)
+    baseline = (timed(lambda: json.dumps(value, default=str), repeat),
+                timed(lambda: json.loads(text), repeat), len(text.encode()))
+
+    print(f"\n{rows} rows")
+    print(f"  {'codec':22s} {'encode us':>10s} {'decode us':>10s} {'bytes':>9s} {'vs json':>8s}")
+    print(f"  {'json text (before)':22s} {baseline[0]:10.1f} {baseline[1]:10.1f} {baseline[2]:9d} {1:8.2f}")
+    for serializer in SERIALIZERS:
+        for compression in COMPRESSORS:
+            codec = CacheCodec(serializer=serializer, compression=compression)
+            payload, _ = codec.encode(value)
+            encode = timed(lambda: codec.encode(value), repeat)
+            decode = timed(lambda: codec.decode(payload), repeat)
+            print(f"  {serializer + '+' + compression:22s} {encode:10.1f} {decode:10.1f} "
+                  f"{len(payload):9d} {len(payload) / baseline[2]:8.2f}")
+
+
+def bench_keys(repeat: int):
+    def md5_key(*args, **kwargs):
+        key_data = json.dumps({"args": args, "kwargs": kwargs}, sort_keys=True)
+        return hashlib.md5(key_data.encode()).hexdigest()
+
+    calls = {
+        "list filters": ((None, None, "active", 0, 100), {}),
+        "keyword filters": ((), {"category_id": 3, "is_active": True, "skip": 0, "limit": 100}),
+        "dict argument": (({"category_id": 3, "tags": ["a", "b"]},), {}),
+    }
+    print(f"\nkey derivation (ns per call, {repeat * 50} calls)")
+    print(f"  {'arguments':18s} {'md5+json':>10s} {'call_key':>10s}")
+    for name, (args, kwargs) in calls.items():
+        before = timed(lambda: [md5_key(*args, **kwargs) for _ in range(50)], repeat) * 1000 / 50
+        after = timed(lambda: [call_key(args, kwargs) for _ in range(50)], repeat) * 1000 / 50
+        print(f"  {name:18s} {before:10.0f} {after:10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache codec benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"serializers: {', '.join(SERIALIZERS)}; compression: {', '.join(COMPRESSORS)}")
+    for rows in args.rows:
+        bench_payloads(rows, args.repeat)
+    bench_keys(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
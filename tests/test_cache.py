@@ -0,0 +1,295 @@
+"""
+KMS Cache Tests
+Unit tests for the two-tier cache (local tier; no Redis required)
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils import cache
+from utils.cache import CacheStats, LocalCache
+
+
+@pytest.fixture
+def local_only(monkeypatch):
+    """Cache module with the local tier as the only tier"""
+    monkeypatch.setattr(cache, "get_redis_client", lambda: None)
+    monkeypatch.setattr(cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(cache, "_tag_versions", {})
+    monkeypatch.setattr(cache, "_tag_invalidations", 0)
+    cache._local_cache.clear()
+    cache._stats.clear()
+    yield cache
+    cache._local_cache.clear()
+    cache._stats.clear()
+
+
+class TestLocalCache:
+    """Test LRU order, bounds and expiry"""
+
+    def test_lru_entry_bound(self):
+        local = LocalCache(max_entries=2, max_bytes=1000, stats=CacheStats())
+        local.set("a:1", 1, 60, 1)
+        local.set("a:2", 2, 60, 1)
+        assert local.get("a:1") == 1      # a:1 is now most recent
+        local.set("a:3", 3, 60, 1)
+        assert local.get("a:2") is None
+        assert local.get("a:1") == 1 and local.get("a:3") == 3
+        assert local.stats.snapshot()["a"]["evictions"] == 1
+
+    def test_byte_bound(self):
+        local = LocalCache(max_entries=100, max_bytes=10, stats=CacheStats())
+        local.set("a:1", "x", 60, 6)
+        local.set("b:1", "y", 60, 6)
+        assert len(local) == 1 and local.bytes == 6
+        assert local.get("b:1") == "y"
+        # Larger than the whole tier: not stored
+        local.set("c:1", "z", 60, 11)
+        assert local.get("c:1") is None
+
+    def test_ttl_and_sweep(self):
+        local = LocalCache(max_entries=100, max_bytes=1000, stats=CacheStats())
+        local.set("a:1", 1, 0.01, 1)
+        local.set("a:2", 2, 60, 1)
+        time.sleep(0.02)
+        assert local.sweep() == 1
+        assert len(local) == 1 and local.bytes == 1
+        assert local.prefix_bytes() == {"a": 1}
+
+
+class TestCacheFunctions:
+    """Test cache_get/cache_set/cached and the stats report"""
+
+    def test_roundtrip_and_stats(self, local_only):
+        assert local_only.cache_get("objects:x") is None
+        local_only.cache_set("objects:x", {"n": 1}, ttl=60)
+        assert local_only.cache_get("objects:x") == {"n": 1}
+
+        stats = local_only.get_cache_stats()
+        objects = stats["prefixes"]["objects"]
+        assert objects["local_hits"] == 1
+        assert objects["misses"] == 1
+        assert objects["sets"] == 1
+        assert objects["bytes"] == local_only.get_codec().encode({"t": {"objects": 0}, "v": {"n": 1}})[1]
+        assert objects["hit_ratio"] == 0.5
+        assert stats["local"]["entries"] == 1
+
+    def test_cached_decorator(self, local_only):
+        calls = []
+
+        @local_only.cached(prefix="stats", ttl=60)
+        def compute(x):
+            calls.append(x)
+            return x * 2
+
+        assert compute(2) == 4
+        assert compute(2) == 4
+        assert calls == [2]
+
+    def test_delete(self, local_only):
+        local_only.cache_set("objects:1", 3)
+        local_only.cache_delete("objects:1")
+        assert local_only.cache_get("objects:1") is None
+
+
+class TestTagInvalidation:
+    """Test tag/namespace version invalidation"""
+
+    def test_namespace_invalidation(self, local_only):
+        local_only.cache_set("users:1", 1)
+        local_only.cache_set("users:2", 2)
+        local_only.cache_set("objects:1", 3)
+        assert local_only.invalidate_tags("users") == 1
+        assert local_only.cache_get("users:1") is None
+        assert local_only.cache_get("users:2") is None
+        assert local_only.cache_get("objects:1") == 3
+        assert local_only.get_cache_stats()["prefixes"]["users"]["invalidated"] == 2
+
+    def test_explicit_tags(self, local_only):
+        local_only.cache_set("objects:a", "a", tags=["object:1"])
+        local_only.cache_set("objects:b", "b", tags=["object:2"])
+        local_only.invalidate_tags("object:1")
+        assert local_only.cache_get("objects:a") is None
+        assert local_only.cache_get("objects:b") == "b"
+        # Entries written after the bump are valid again
+        local_only.cache_set("objects:a", "a2", tags=["object:1"])
+        assert local_only.cache_get("objects:a") == "a2"
+
+    def test_invalidation_during_compute(self, local_only):
+        versions = local_only.tag_versions(local_only.entry_tags("objects:a", ["object:1"]))
+        local_only.invalidate_tags("object:1")      # write lands while computing
+        local_only.cache_set("objects:a", "old", versions=versions)
+        assert local_only.cache_get("objects:a") is None
+
+    def test_cached_and_invalidate_cache(self, local_only):
+        calls = []
+
+        @local_only.cached(prefix="objects", ttl=60, stale_ttl=60, tags=lambda oid: [f"object:{oid}"])
+        def get_object(oid):
+            calls.append(oid)
+            return {"id": oid, "n": len(calls)}
+
+        @local_only.invalidate_cache(tags=lambda oid: [f"object:{oid}"])
+        def update_object(oid):
+            return oid
+
+        get_object(1), get_object(2)
+        update_object(1)
+        # Invalidated entries are misses, not stale values
+        assert get_object(1) == {"id": 1, "n": 3}
+        assert get_object(2) == {"id": 2, "n": 2}
+        assert calls == [1, 2, 1]
+        assert local_only.get_cache_stats()["tags"]["invalidations"] == 1
+
+
+@pytest.fixture
+def redis_tier(monkeypatch):
+    """Cache module on a live Redis (REDIS_URL); skipped without one"""
+    if not cache.REDIS_AVAILABLE:
+        pytest.skip("redis package not installed")
+    client = cache.redis.from_url(cache.REDIS_URL)
+    try:
+        client.ping()
+    except Exception:
+        pytest.skip("no Redis server at REDIS_URL")
+    monkeypatch.setattr(cache, "_redis_client", None)
+    monkeypatch.setattr(cache, "_redis_retry_at", 0.0)
+    monkeypatch.setattr(cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(cache, "_tag_versions", {})
+    cache._local_cache.clear()
+    yield cache, client
+    cache._local_cache.clear()
+
+
+class TestRedisTagVersions:
+    """Test tag versions on Redis"""
+
+    def test_expired_tag_never_repeats_a_version(self, redis_tier):
+        cache, client = redis_tier
+        tag = f"test-{uuid.uuid4().hex}"
+        key = f"{tag}:entry"
+        try:
+            cache.invalidate_tags(tag)
+            cache.cache_set(key, "old", ttl=60)
+            cache._local_cache.clear()
+            assert cache.cache_get(key) == "old"
+
+            # The tag key expires, then the data changes again
+            client.delete(cache.TAG_KEY_PREFIX + tag)
+            cache.invalidate_tags(tag)
+            cache._local_cache.clear()
+            assert cache.cache_get(key) is None
+        finally:
+            client.delete(key, cache.TAG_KEY_PREFIX + tag)
+
+
+class TestStampedeProtection:
+    """Test single-flight, stale-while-revalidate and early refresh"""
+
+    def test_concurrent_misses_compute_once(self, local_only):
+        calls = []
+        gate = threading.Event()
+
+        @local_only.cached(prefix="stats", ttl=60)
+        def slow():
+            calls.append(1)
+            gate.wait(1)
+            return {"total": 42}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        gate.set()
+        for thread in threads:
+            thread.join()
+        assert calls == [1]
+        assert results == [{"total": 42}] * 8
+        assert local_only.get_cache_stats()["prefixes"]["stats"]["coalesced"] == 7
+
+    def test_stale_value_served_while_refreshing(self, local_only):
+        version = [0]
+
+        @local_only.cached(prefix="stats", ttl=1, stale_ttl=60, early_refresh_beta=0)
+        def compute():
+            version[0] += 1
+            return version[0]
+
+        assert compute() == 1
+        key = next(iter(local_only._local_cache._data))
+        entry = local_only.cache_get(key)
+        local_only.cache_set(key, dict(entry, x=time.time() - 1), 60)
+
+        assert compute() == 1                 # stale, served immediately
+        deadline = time.monotonic() + 2
+        while local_only.cache_get(key)["v"] != 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert compute() == 2                 # refreshed in the background
+        assert local_only.get_cache_stats()["prefixes"]["stats"]["stale_served"] == 1
+
+    def test_refresh_losing_lock_is_not_a_result(self, local_only, monkeypatch):
+        version = [0]
+        in_refresh, release = threading.Event(), threading.Event()
+
+        def held_elsewhere(key):
+            # Another worker holds the lock; the background refresh is slow to find out
+            if threading.current_thread().name == "kms-cache-refresh":
+                in_refresh.set()
+                release.wait(2)
+            return local_only._HELD_ELSEWHERE
+
+        monkeypatch.setattr(local_only, "_acquire_lock", held_elsewhere)
+        monkeypatch.setattr(local_only, "CACHE_LOCK_WAIT", 0.1)
+
+        @local_only.cached(prefix="stats", ttl=1, stale_ttl=60, early_refresh_beta=0)
+        def compute():
+            version[0] += 1
+            return version[0]
+
+        assert compute() == 1
+        key = next(iter(local_only._local_cache._data))
+        entry = local_only.cache_get(key)
+        local_only.cache_set(key, dict(entry, x=time.time() - 1), 60)
+
+        assert compute() == 1                 # stale; refresh gives up on the lock
+        assert in_refresh.wait(1)
+        local_only.invalidate_tags("stats")   # a miss now joins that refresh
+        threading.Timer(0.1, release.set).start()
+        assert compute() == 2
+
+    def test_early_refresh_near_expiry(self, local_only):
+        assert local_only._entry_state({"v": 1, "x": time.time() + 3600, "d": 0.01}, 1.0) == "fresh"
+        assert local_only._entry_state({"v": 1, "x": time.time() + 0.001, "d": 100}, 1.0) == "early"
+        assert local_only._entry_state({"v": 1, "x": time.time() - 1, "d": 0}, 1.0) == "stale"
+        assert local_only._entry_state(None, 1.0) == "miss"
+
+    def test_async_function(self, local_only):
+        calls = []
+
+        @local_only.cached(prefix="async", ttl=60)
+        async def fetch(x):
+            calls.append(x)
+            await asyncio.sleep(0.01)
+            return x + 1
+
+        async def main():
+            return await asyncio.gather(*(fetch(1) for _ in range(5)))
+
+        assert asyncio.run(main()) == [2] * 5
+        assert asyncio.run(fetch(1)) == 2
+        assert calls == [1]
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,83 @@
+"""
+KMS Cache Codec Tests
+Unit tests for the cache serializers, compression framing and key derivation
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.cache_codec import COMPRESSORS, SERIALIZERS, CacheCodec, call_key
+
+ROWS = [{"id": i, "name": f"object {i}", "metadata": {"tags": ["a", "b"], "score": i / 3},
+         "updated_at": "2026-10-17T12:00:00.123456", "description": None} for i in range(200)]
+
+
+class TestCacheCodec:
+    """Test round trips, compression and cross-configuration reads"""
+
+    @pytest.mark.parametrize("serializer", sorted(SERIALIZERS))
+    def test_roundtrip(self, serializer):
+        codec = CacheCodec(serializer=serializer, compression="none")
+        payload, size = codec.encode({"t": {"objects": 3}, "v": ROWS})
+        assert codec.decode(payload) == ({"t": {"objects": 3}, "v": ROWS}, size)
+        assert size == len(payload) - 1
+
+    def test_compression_above_threshold(self):
+        codec = CacheCodec(serializer="json", compression="zlib", threshold=1024)
+        small, _ = codec.encode({"n": 1})
+        large, size = codec.encode(ROWS)
+        assert small[0] >> 4 == 0               # below the threshold: stored as is
+        assert large[0] >> 4 == 1 and len(large) < size / 3
+        assert codec.decode(large) == (ROWS, size)
+
+    def test_payload_readable_by_other_configuration(self):
+        payload, _ = CacheCodec(serializer="json", compression="zlib", threshold=0).encode(ROWS)
+        assert CacheCodec(compression="none").decode(payload)[0] == ROWS
+
+    def test_unsupported_value_falls_back_to_json(self):
+        codec = CacheCodec(compression="none")
+        payload, _ = codec.encode({"big": 2 ** 70})
+        assert codec.decode(payload)[0] == {"big": 2 ** 70}
+
+    def test_unreadable_payload(self):
+        codec = CacheCodec()
+        with pytest.raises(ValueError):
+            codec.decode(b'{"legacy": "json text"}')
+        with pytest.raises(ValueError):
+            codec.decode(b"")
+
+    def test_auto_compresses_without_zstd(self, monkeypatch):
+        monkeypatch.delitem(COMPRESSORS, "zstd", raising=False)
+        assert CacheCodec(compression="auto").compressor.name == "zlib"
+
+    def test_unavailable_choice_degrades(self):
+        codec = CacheCodec(serializer="pickle", compression="lz4")
+        assert codec.describe()["serializer"] == "json"
+        assert codec.describe()["compression"] == "none"
+
+
+class TestCallKey:
+    """Test argument digests"""
+
+    def test_keyword_order_and_types(self):
+        assert call_key((1,), {"a": 1, "b": None}) == call_key((1,), {"b": None, "a": 1})
+        assert call_key((1,), {}) != call_key(("1",), {})
+        assert call_key((True,), {}) != call_key((1,), {})
+        assert call_key(("a", "b"), {}) != call_key(("a, b",), {})
+
+    def test_short_keys_raw_long_keys_hashed(self):
+        assert call_key((None, 3, "active", 0, 100), {}) == '[[null,3,"active",0,100],{}]'
+        long_key = call_key(("x" * 100,), {})
+        assert len(long_key) == 32 and not long_key.startswith("[")
+        assert call_key(({"x": 1, "y": [1, 2]},), {}) == call_key(({"y": [1, 2], "x": 1},), {})
+        assert call_key(([1, 2],), {}) != call_key(([2, 1],), {})
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
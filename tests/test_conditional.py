@@ -0,0 +1,149 @@
+"""
+KMS Conditional Request Tests
+Unit tests for ETag / Last-Modified validators and 304 responses (no PostgreSQL required)
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key")
+
+from utils.conditional import (
+    NotModified, not_modified_handler, check_conditional, make_etag, http_date
+)
+
+UPDATED_AT = datetime(2026, 10, 17, 12, 30, 45, 123456)
+
+
+def make_client(state):
+    app = FastAPI()
+    app.add_exception_handler(NotModified, not_modified_handler)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int, request: Request, response: Response):
+        check_conditional(request, response,
+                          make_etag(request, item_id, state["updated_at"]),
+                          state["updated_at"])
+        state["serialized"] += 1
+        return {"id": item_id}
+
+    return TestClient(app)
+
+
+class TestConditionalGet:
+    """Test validators and 304 short-circuits"""
+
+    def test_first_response_carries_validators(self):
+        client = make_client({"updated_at": UPDATED_AT, "serialized": 0})
+        response = client.get("/items/1")
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('W/"')
+        assert response.headers["last-modified"] == "Sat, 17 Oct 2026 12:30:45 GMT"
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    def test_if_none_match(self):
+        state = {"updated_at": UPDATED_AT, "serialized": 0}
+        client = make_client(state)
+        etag = client.get("/items/1").headers["etag"]
+
+        response = client.get("/items/1", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert state["serialized"] == 1
+
+        state["updated_at"] = datetime(2026, 10, 17, 12, 30, 45, 999999)
+        assert client.get("/items/1", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_etag_depends_on_query(self):
+        client = make_client({"updated_at": UPDATED_AT, "serialized": 0})
+        etag = client.get("/items/1").headers["etag"]
+        assert client.get("/items/1?limit=5", headers={"If-None-Match": etag}).status_code == 200
+        assert client.get("/items/2", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_if_modified_since(self):
+        client = make_client({"updated_at": UPDATED_AT, "serialized": 0})
+        assert client.get("/items/1", headers={
+            "If-Modified-Since": http_date(UPDATED_AT)
+        }).status_code == 304
+        assert client.get("/items/1", headers={
+            "If-Modified-Since": "Sat, 17 Oct 2026 12:30:44 GMT"
+        }).status_code == 200
+        assert client.get("/items/1", headers={"If-Modified-Since": "garbage"}).status_code == 200
+
+    def test_if_none_match_wins_over_if_modified_since(self):
+        client = make_client({"updated_at": UPDATED_AT, "serialized": 0})
+        response = client.get("/items/1", headers={
+            "If-None-Match": 'W/"stale"',
+            "If-Modified-Since": http_date(UPDATED_AT),
+        })
+        assert response.status_code == 200
+
+
+class TestListFingerprint:
+    """Test that list endpoints answer 304 from the aggregate row alone"""
+
+    def make_categories_client(self, monkeypatch, fingerprint):
+        from routers import categories
+        from utils import cache
+
+        # Validators straight from the database (read caching: test_read_cache.py)
+        monkeypatch.setattr(cache, "CACHE_ENABLED", False)
+
+        executed = []
+
+        class Cursor:
+            def execute(self, query, params=None):
+                executed.append(query)
+                self.query = query
+
+            def fetchone(self):
+                return dict(fingerprint)
+
+            def fetchall(self):
+                return []
+
+        @contextmanager
+        def fake_cursor():
+            yield Cursor(), None
+
+        monkeypatch.setattr(categories, "get_db_cursor", fake_cursor)
+        app = FastAPI()
+        app.add_exception_handler(NotModified, not_modified_handler)
+        app.include_router(categories.router)
+        return TestClient(app), executed
+
+    def test_list_not_modified_skips_list_query(self, monkeypatch):
+        fingerprint = {"n": 3, "last_modified": UPDATED_AT}
+        client, executed = self.make_categories_client(monkeypatch, fingerprint)
+
+        etag = client.get("/categories/?type=product").headers["etag"]
+        assert len(executed) == 2
+
+        executed.clear()
+        response = client.get("/categories/?type=product", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert len(executed) == 1
+        assert "count(*)" in executed[0] and "type = %s" in executed[0]
+
+    def test_delete_changes_fingerprint(self, monkeypatch):
+        fingerprint = {"n": 3, "last_modified": UPDATED_AT}
+        client, _ = self.make_categories_client(monkeypatch, fingerprint)
+        etag = client.get("/categories/").headers["etag"]
+
+        fingerprint["n"] = 2
+        assert client.get("/categories/", headers={"If-None-Match": etag}).status_code == 200
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
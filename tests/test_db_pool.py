@@ -0,0 +1,207 @@
+"""
+KMS Connection Pool Tests
+Unit tests for the pooled database layer (no PostgreSQL required)
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+import psycopg2
+import psycopg2.extensions
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.db_optimization import ConnectionPool, PoolTimeoutError, ConnectionPoolMonitor
+import database
+
+
+class FakeCursor:
+    def __init__(self, conn=None):
+        self.connection = conn
+
+    def execute(self, query, params=None):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Minimal stand-in for a psycopg2 connection"""
+
+    def __init__(self, password):
+        self.password = password
+        self.closed = 0
+        self.autocommit = False
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self, name=None, cursor_factory=FakeCursor):
+        return cursor_factory(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**kwargs):
+    calls = {"password": 0, "connect": 0}
+
+    def password_provider():
+        calls["password"] += 1
+        return "secret"
+
+    def connect(password):
+        calls["connect"] += 1
+        return FakeConnection(password)
+
+    defaults = dict(pool_size=2, max_overflow=1, timeout=0.05, recycle=1800, min_size=1)
+    defaults.update(kwargs)
+    return ConnectionPool(connect, password_provider, **defaults), calls
+
+
+class TestConnectionPool:
+    """Test connection reuse and limits"""
+
+    def test_connection_is_reused(self):
+        """Returned connections are handed out again without reconnecting"""
+        pool, calls = make_pool()
+        conn = pool.getconn()
+        pool.putconn(conn)
+        assert pool.getconn() is conn
+        assert calls["connect"] == 1
+
+    def test_password_read_once(self):
+        """The secrets script runs once, not per connection"""
+        pool, calls = make_pool()
+        conns = [pool.getconn() for _ in range(3)]
+        for conn in conns:
+            pool.putconn(conn)
+        assert calls["password"] == 1
+
+    def test_password_refreshed_on_auth_failure(self):
+        """A rejected password is re-read exactly once"""
+        passwords = iter(["old", "new"])
+        attempts = []
+
+        def connect(password):
+            attempts.append(password)
+            if password == "old":
+                raise psycopg2.OperationalError("FATAL: password authentication failed for user")
+            return FakeConnection(password)
+
+        pool = ConnectionPool(connect, lambda: next(passwords), pool_size=1, max_overflow=0)
+        assert pool.getconn().password == "new"
+        assert attempts == ["old", "new"]
+        assert pool.stats()["password_refreshes"] == 1
+
+    def test_overflow_limit_times_out(self):
+        """Checkout beyond pool_size + max_overflow raises PoolTimeoutError"""
+        pool, _ = make_pool()
+        held = [pool.getconn() for _ in range(3)]
+        with pytest.raises(PoolTimeoutError):
+            pool.getconn()
+        assert pool.stats()["overflow"] == 1
+        for conn in held:
+            pool.putconn(conn)
+        # Overflow connection is closed, pool keeps pool_size idle
+        assert pool.stats()["idle"] == 2
+
+    def test_recycle_replaces_old_connection(self):
+        """Connections older than recycle are replaced on checkout"""
+        pool, calls = make_pool(recycle=-1)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        assert pool.getconn() is not conn
+        assert conn.closed
+        assert calls["connect"] == 2
+        stats = pool.stats()
+        assert (stats["recycled"], stats["health_check_failures"]) == (1, 0)
+
+    def test_broken_connection_discarded(self):
+        """Closed connections fail the checkout health check"""
+        pool, _ = make_pool()
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.closed = 1
+        assert pool.getconn() is not conn
+        assert pool.stats()["health_check_failures"] == 1
+
+    def test_open_transaction_rolled_back_on_return(self):
+        """Returning a connection mid-transaction resets it"""
+        pool, _ = make_pool()
+        conn = pool.getconn()
+        conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        pool.putconn(conn)
+        assert conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class TestPoolMonitor:
+    """Test ConnectionPoolMonitor reporting"""
+
+    def test_monitor_reports_live_pool(self):
+        """Attached monitor returns the pool's live figures"""
+        pool, _ = make_pool()
+        monitor = ConnectionPoolMonitor()
+        monitor.attach(pool)
+        conn = pool.getconn()
+        stats = monitor.get_stats()
+        assert stats["active"] == 1
+        assert stats["checkouts"] == 1
+        pool.putconn(conn)
+        assert monitor.get_stats()["idle"] == 1
+
+
+class TestRequestScope:
+    """Test request-scoped connection reuse and accounting"""
+
+    @pytest.fixture(autouse=True)
+    def fake_pool(self, monkeypatch):
+        pool, calls = make_pool()
+        monkeypatch.setattr(database, "_pool", pool)
+        self.pool = pool
+        self.calls = calls
+
+    def test_single_connection_per_request(self):
+        """Auth, handler and audit borrowing a connection share one checkout"""
+        with database.request_scope() as scope:
+            for _ in range(4):
+                conn = database.get_db_connection()
+                cur = conn.cursor(cursor_factory=FakeCursor)
+                cur.execute("SELECT 1")
+                conn.close()
+            assert self.pool.stats()["active"] == 1
+        assert scope.stats() == {"queries": 4, "connections": 1}
+        assert self.pool.stats()["active"] == 0
+        assert self.calls["connect"] == 1
+
+    def test_request_stats_outside_scope(self):
+        """No request stats are reported outside a request"""
+        assert database.get_request_stats() is None
+
+    def test_cursor_queries_counted(self):
+        """Every execute on a pooled cursor is counted for the request"""
+        with database.request_scope():
+            conn = database.get_db_connection()
+            cur = conn.cursor(cursor_factory=FakeCursor)
+            cur.execute("SELECT 1")
+            cur.execute("SELECT 2")
+            assert database.get_request_stats() == {"queries": 2, "connections": 1}
+
+    def test_unscoped_connection_returned_on_close(self):
+        """Outside a request close() hands the connection back to the pool"""
+        conn = database.get_db_connection()
+        assert self.pool.stats()["active"] == 1
+        conn.close()
+        assert self.pool.stats()["idle"] == 1
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
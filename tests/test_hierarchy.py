@@ -0,0 +1,96 @@
+"""
+KMS Hierarchy Index Tests
+Unit tests for slug -> ID resolution without PostgreSQL
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.hierarchy import HierarchyIndex
+
+
+class FakeDB:
+    """Tiny stand-in that answers the index's SELECTs from in-memory tables"""
+
+    def __init__(self):
+        self.tables = {
+            "categories": [(1, "products")],
+            "subcategories": [(10, 1, "tools")],
+            "objects": [(100, 1, 10, "kms"), (101, 1, None, "wiki")],
+        }
+        self.queries = []
+
+    def execute(self, sql, params):
+        self.queries.append(sql)
+        table = sql.split("FROM ")[1].split()[0]
+        rows = self.tables[table]
+        if params is None:
+            return list(rows)
+        if "id = ANY" in sql:
+            return [r for r in rows if r[0] in params[0]]
+        if table == "categories":
+            return [r for r in rows if r[1] == params[0]]
+        if table == "subcategories":
+            return [r for r in rows if r[1:] == tuple(params)]
+        cat_id, sub_id, slug = params
+        return [r for r in rows if (r[1], r[2] or 0, r[3]) == (cat_id, sub_id or 0, slug)]
+
+
+@pytest.fixture
+def db():
+    return FakeDB()
+
+
+@pytest.fixture
+def index(db):
+    index = HierarchyIndex(db.execute)
+    index.load()
+    db.queries.clear()
+    return index
+
+
+class TestHierarchyIndex:
+    """Test resolution, misses and change notifications"""
+
+    def test_resolve_without_queries(self, index, db):
+        assert index.resolve("products", "tools", "kms") == (1, 10, 100)
+        assert index.resolve("products", None, "wiki") == (1, None, 101)
+        assert index.resolve("products") == (1, None, None)
+        assert db.queries == []
+
+    def test_miss_queries_once_and_caches(self, index, db):
+        db.tables["objects"].append((102, 1, None, "new"))
+        assert index.resolve("products", None, "new") == (1, None, 102)
+        assert len(db.queries) == 1
+        assert index.resolve("products", None, "new") == (1, None, 102)
+        assert len(db.queries) == 1
+
+    def test_unknown_returns_none(self, index):
+        assert index.resolve("nope", None, "kms") is None
+        assert index.resolve("products", "nope", "kms") is None
+
+    def test_rename_and_delete_notifications(self, index, db):
+        db.tables["objects"][0] = (100, 1, 10, "kms-renamed")
+        index.apply_changes([{"table": "objects", "action": "UPDATE", "id": 100}])
+        assert index.resolve("products", "tools", "kms-renamed") == (1, 10, 100)
+
+        db.queries.clear()
+        index.apply_changes([{"table": "objects", "action": "DELETE", "id": 101}])
+        assert db.queries == []
+        del db.tables["objects"][1]
+        assert index.resolve("products", None, "wiki") is None
+
+    def test_put_after_own_upsert(self, index, db):
+        index.put_object(200, 1, 10, "imported")
+        assert index.resolve("products", "tools", "imported") == (1, 10, 200)
+        assert db.queries == []
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,81 @@
+"""
+KMS Three-Way Merge Tests
+Unit tests for the line merge and the file/DB side selection
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.merge import CONFLICT, MERGE, SIDE_DB, SIDE_FILE, choose_side, merge3
+from utils.sync_manifest import Conflict
+
+BASE = "title\nintro\nbody\nfooter\n"
+
+
+class TestMerge3:
+    """Test line-based merging"""
+
+    def test_disjoint_edits_merge(self):
+        result = merge3(BASE, "TITLE\nintro\nbody\nfooter\n", "title\nintro\nbody\nFOOTER\n")
+        assert result.clean
+        assert result.text == "TITLE\nintro\nbody\nFOOTER\n"
+
+    def test_one_side_unchanged(self):
+        theirs = "title\nintro\nnew body\nfooter\n"
+        assert merge3(BASE, BASE, theirs) == (theirs, 0)
+        assert merge3(BASE, theirs, BASE) == (theirs, 0)
+
+    def test_same_edit_on_both_sides(self):
+        edit = "title\nintro\nBODY\nfooter\n"
+        result = merge3(BASE, edit + "ps\n", edit)
+        assert result.clean
+        assert result.text == edit + "ps\n"
+
+    def test_insertions_at_both_ends(self):
+        result = merge3(BASE, BASE + "appended\n", "prepended\n" + BASE)
+        assert result.text == "prepended\n" + BASE + "appended\n"
+
+    def test_same_line_conflicts(self):
+        result = merge3(BASE, "title\nintro\nfile body\nfooter\n", "title\nintro\ndb body\nfooter\n")
+        assert not result.clean
+        assert result.conflicts == 1
+        assert "<<<<<<< file\nfile body\n=======\ndb body\n>>>>>>> db\n" in result.text
+
+    def test_adjacent_lines_conflict(self):
+        result = merge3(BASE, "title\nINTRO\nbody\nfooter\n", "title\nintro\nBODY\nfooter\n")
+        assert not result.clean
+
+
+class TestChooseSide:
+    """Test which side wins a difference"""
+
+    def test_only_one_side_moved(self):
+        assert choose_side("base", "new", "base") == SIDE_FILE
+        assert choose_side("base", "base", "new") == SIDE_DB
+
+    def test_both_moved_merges(self):
+        assert choose_side("base", "file", "db") == MERGE
+
+    def test_without_base_incoming_wins(self):
+        assert choose_side(None, "file", "db", incoming=SIDE_FILE) == SIDE_FILE
+        assert choose_side(None, "file", "db", incoming=SIDE_DB) == SIDE_DB
+
+    def test_missing_side(self):
+        assert choose_side("base", "file", None) == SIDE_FILE
+        assert choose_side("base", None, "db") == SIDE_DB
+
+    def test_recorded_conflict_until_next_edit(self):
+        conflict = Conflict("file", "db")
+        assert choose_side("base", "file", "db", conflict) == CONFLICT
+        assert choose_side("base", "file 2", "db", conflict) == SIDE_FILE
+        assert choose_side("base", "file", "db 2", conflict) == SIDE_DB
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
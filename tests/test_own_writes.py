@@ -0,0 +1,64 @@
+"""
+KMS Own-Write Registry Tests
+Unit tests for dropping the echoes of the sync daemon's own writes
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.own_writes import OwnWrites
+
+
+class TestOwnWrites:
+    """Test echo matching, consumption, generations and expiry"""
+
+    def test_file_echo_matches_fingerprint(self):
+        writes = OwnWrites()
+        writes.record("/kms/a.md", "sha", (5, 100))
+        assert "/kms/a.md" in writes
+        # Several events for one write are all echoes
+        assert writes.is_echo("/kms/a.md", (5, 100))
+        assert writes.is_echo("/kms/a.md", (5, 100))
+        assert not writes.is_echo("/kms/b.md", (5, 100))
+
+    def test_foreign_write_drops_record(self):
+        writes = OwnWrites()
+        writes.record("/kms/a.md", "sha", (5, 100))
+        assert not writes.is_echo("/kms/a.md", (6, 200))
+        assert "/kms/a.md" not in writes
+        assert not writes.is_echo("/kms/a.md", (5, 100))
+
+    def test_row_echo_is_consumed(self):
+        writes = OwnWrites()
+        writes.record(("documents", 7), "sha")
+        assert writes.is_echo(("documents", 7), consume=True)
+        assert not writes.is_echo(("documents", 7), consume=True)
+
+    def test_forget_respects_generation(self):
+        writes = OwnWrites()
+        first = writes.record("k", "v1")
+        second = writes.record("k", "v2")
+        writes.forget("k", first)
+        assert "k" in writes
+        writes.forget("k", second)
+        assert "k" not in writes
+
+    def test_expiry(self):
+        writes = OwnWrites(ttl=0.01)
+        writes.record("k", "v")
+        time.sleep(0.02)
+        assert not writes.is_echo("k")
+        stats = writes.stats()
+        assert stats["expired"] == 1
+        assert stats["pending"] == 0
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
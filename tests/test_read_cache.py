@@ -0,0 +1,234 @@
+"""
+KMS Read Cache Tests
+No stale reads from the cached list and stats endpoints after API writes,
+kms_changes notifications and change feed reconnects (no PostgreSQL or
+Redis required)
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key")
+
+from routers import categories, objects, system
+from utils import cache, read_cache
+from utils.conditional import NotModified, not_modified_handler
+
+CREATED_AT = datetime(2026, 10, 17, 12, 0, 0, 123456)
+
+
+class FakeDB:
+    """categories + objects (and the v_objects_full view over them) in memory"""
+
+    def __init__(self):
+        self.categories = {
+            1: {"id": 1, "slug": "products", "name": "Products", "type": "product", "description": None,
+                "icon": None, "color": None, "sort_order": 0, "is_active": True, "metadata": {},
+                "created_at": CREATED_AT, "updated_at": CREATED_AT},
+        }
+        self.objects = {
+            7: {"id": 7, "uuid": "a7", "category_id": 1, "subcategory_id": None, "slug": "kms",
+                "name": "KMS", "description": None, "status": "active", "author": None,
+                "file_path": None, "metadata": {}, "created_at": CREATED_AT, "updated_at": CREATED_AT},
+        }
+        self.queries = []
+        self.on_query = None        # hook(query) to interleave writes with a read
+
+    def touch(self, row, **changes):
+        row.update(changes, updated_at=row["updated_at"] + timedelta(seconds=1))
+
+    def view_rows(self):
+        return [{
+            "id": o["id"], "uuid": o["uuid"], "object_slug": o["slug"], "object_name": o["name"],
+            "description": o["description"], "status": o["status"], "author": o["author"],
+            "file_path": o["file_path"], "metadata": o["metadata"],
+            "category_id": o["category_id"], "category_slug": self.categories[o["category_id"]]["slug"],
+            "category_name": self.categories[o["category_id"]]["name"],
+            "category_type": self.categories[o["category_id"]]["type"],
+            "subcategory_id": None, "subcategory_slug": None, "subcategory_name": None, "tags": None,
+            "created_at": o["created_at"], "updated_at": o["updated_at"],
+        } for o in self.objects.values()]
+
+    def fingerprint(self, rows):
+        return {"n": len(rows), "last_modified": max((r["updated_at"] for r in rows), default=None)}
+
+    def execute(self, query, params):
+        query = " ".join(query.split())
+        self.queries.append(query)
+        result = self.run(query, params)
+        if self.on_query:
+            self.on_query(query)
+        return result
+
+    def run(self, query, params):
+        if "(SELECT COUNT(*) FROM categories) as categories" in query:
+            return {"categories": len(self.categories), "objects": len(self.objects)}, []
+        if "GROUP BY" in query:
+            return None, []
+        if "FROM objects o" in query:
+            return dict(self.fingerprint(self.objects.values()), tag_links=0, tag_sum=0), []
+        if "count(*)" in query and "FROM categories" in query:
+            return self.fingerprint(self.categories.values()), []
+        if query.startswith("SELECT * FROM v_objects_full"):
+            return None, self.view_rows()
+        if query.startswith("SELECT * FROM categories WHERE id"):
+            return self.categories.get(params[0]), []
+        if query.startswith("SELECT * FROM categories"):
+            return None, list(self.categories.values())
+        if query.startswith("UPDATE categories"):
+            self.touch(self.categories[params[-1]], name=params[0])
+            return self.categories[params[-1]], []
+        if query.startswith("SELECT * FROM objects WHERE id"):
+            return self.objects.get(params[0]), []
+        if query.startswith("DELETE FROM objects"):
+            del self.objects[params[0]]
+            return None, []
+        raise AssertionError(f"unexpected query: {query}")
+
+    @contextmanager
+    def cursor(self):
+        db = self
+
+        class Cursor:
+            def execute(self, query, params=None):
+                self.one, self.all = db.execute(query, params)
+
+            def fetchone(self):
+                return self.one
+
+            def fetchall(self):
+                return self.all
+
+        class Conn:
+            def commit(self):
+                pass
+
+            def rollback(self):
+                pass
+
+        yield Cursor(), Conn()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Fake database behind the routers, local cache tier only"""
+    fake = FakeDB()
+    for module in (categories, objects, system):
+        monkeypatch.setattr(module, "get_db_cursor", fake.cursor)
+    monkeypatch.setattr(cache, "get_redis_client", lambda: None)
+    monkeypatch.setattr(cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(cache, "_tag_versions", {})
+    cache._local_cache.clear()
+    yield fake
+    cache._local_cache.clear()
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.add_exception_handler(NotModified, not_modified_handler)
+    for module in (categories, objects, system):
+        app.include_router(module.router)
+    return TestClient(app)
+
+
+class TestCachedReads:
+    """Test that repeated reads skip the database"""
+
+    def test_lists_and_stats_served_from_cache(self, client, db):
+        first = [client.get(path).json() for path in ("/categories/", "/objects/", "/system/stats")]
+        db.queries.clear()
+        assert [client.get(path).json() for path in ("/categories/", "/objects/", "/system/stats")] == first
+        assert db.queries == []
+        assert first[0][0]["updated_at"] == "2026-10-17T12:00:00.123456"
+
+    def test_not_modified_from_cache(self, client, db):
+        etag = client.get("/categories/").headers["etag"]
+        db.queries.clear()
+        assert client.get("/categories/", headers={"If-None-Match": etag}).status_code == 304
+        assert db.queries == []
+
+    def test_filters_cached_separately(self, client, db):
+        client.get("/categories/")
+        db.queries.clear()
+        client.get("/categories/?type=product")
+        assert len(db.queries) == 2
+
+
+class TestNoStaleReads:
+    """Test invalidation after API writes, notifications and reconnects"""
+
+    def test_update_invalidates_list(self, client, db):
+        etag = client.get("/categories/").headers["etag"]
+        assert client.put("/categories/1", json={"name": "Goods"}).status_code == 200
+
+        response = client.get("/categories/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()[0]["name"] == "Goods"
+
+    def test_category_rename_invalidates_objects_list(self, client, db):
+        assert client.get("/objects/").json()[0]["category_name"] == "Products"
+        client.put("/categories/1", json={"name": "Goods"})
+        assert client.get("/objects/").json()[0]["category_name"] == "Goods"
+
+    def test_delete_invalidates_list_and_stats(self, client, db):
+        assert len(client.get("/objects/").json()) == 1
+        assert client.get("/system/stats").json()["counts"]["objects"] == 1
+        assert client.delete("/objects/7").status_code == 200
+        assert client.get("/objects/").json() == []
+        assert client.get("/system/stats").json()["counts"]["objects"] == 0
+
+    def test_failed_write_keeps_cache(self, client, db):
+        client.get("/objects/")
+        assert client.delete("/objects/99").status_code == 404
+        db.queries.clear()
+        client.get("/objects/")
+        assert db.queries == []
+
+    def test_sync_daemon_write_via_change_feed(self, client, db):
+        client.get("/objects/")
+        # Written by the sync daemon: only the kms_changes notification tells us
+        db.touch(db.objects[7], name="KMS v2")
+        read_cache.apply_changes([{"table": "objects", "action": "UPDATE", "id": 7}])
+        assert client.get("/objects/").json()[0]["object_name"] == "KMS v2"
+
+    def test_unrelated_notification_keeps_cache(self, client, db):
+        client.get("/categories/")
+        read_cache.apply_changes([{"table": "documents", "action": "UPDATE", "id": 1}])
+        db.queries.clear()
+        client.get("/categories/")
+        assert db.queries == []
+
+    def test_resync_invalidates_everything(self, client, db):
+        client.get("/categories/")
+        client.get("/objects/")
+        db.touch(db.categories[1], name="Goods")
+        read_cache.resync()
+        assert client.get("/categories/").json()[0]["name"] == "Goods"
+        assert client.get("/objects/").json()[0]["category_name"] == "Goods"
+
+    def test_write_during_read_is_not_cached_stale(self, client, db):
+        def write_mid_read(query):
+            if query.startswith("SELECT * FROM v_objects_full"):
+                db.on_query = None
+                # Committed and notified after this read took its snapshot
+                db.touch(db.objects[7], name="KMS v2")
+                read_cache.invalidate_tables("objects")
+
+        db.on_query = write_mid_read
+        assert client.get("/objects/").json()[0]["object_name"] == "KMS"
+        assert client.get("/objects/").json()[0]["object_name"] == "KMS v2"
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
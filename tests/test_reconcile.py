@@ -0,0 +1,110 @@
+"""
+KMS Startup Reconciliation Tests
+Unit tests for the parallel tree scan and the file/DB diff
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.reconcile import plan_reconcile, scan_tree
+from utils.sync_manifest import ManifestEntry, sha256_bytes
+
+
+class TestScanTree:
+    """Test the parallel directory walk"""
+
+    def test_scan_finds_nested_files(self, tmp_path):
+        root = tmp_path / "categories"
+        for rel in ("a/objects/x/docs/one.md", "a/objects/x/two.md", "b/three.txt"):
+            path = root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(rel)
+        (root / "a" / ".hidden.md").write_text("skip")
+        (root / "a" / ".git").mkdir()
+        (root / "a" / ".git" / "HEAD").write_text("skip")
+
+        files = scan_tree(root, relative_to=tmp_path, jobs=4)
+        assert set(files) == {
+            "categories/a/objects/x/docs/one.md",
+            "categories/a/objects/x/two.md",
+            "categories/b/three.txt",
+        }
+        size, mtime_ns = files["categories/b/three.txt"]
+        assert size == len("b/three.txt")
+        assert mtime_ns == os.stat(root / "b" / "three.txt").st_mtime_ns
+
+    def test_include_filter(self, tmp_path):
+        (tmp_path / "a.md").write_text("a")
+        (tmp_path / "b.bin").write_text("b")
+        assert list(scan_tree(tmp_path, include=lambda rel: rel.endswith(".md"))) == ["a.md"]
+
+
+class TestPlanReconcile:
+    """Test which side of a difference wins"""
+
+    def hash_file(self, contents):
+        self.hashed = []
+
+        def run(path):
+            self.hashed.append(path)
+            return sha256_bytes(contents[path])
+        return run
+
+    def test_plan(self):
+        contents = {"same": b"same", "touched": b"touched", "edited": b"edited!", "grown": b"longer",
+                    "touched_db_changed": b"base", "both_changed": b"file edit"}
+        files = {
+            "same": (4, 1),          # manifest vouches, DB agrees
+            "db_changed": (5, 1),    # manifest vouches, DB differs -> export
+            "touched": (7, 2),       # mtime moved, content equal -> hashed, in sync
+            "edited": (7, 2),        # same size, different content -> hashed, upload
+            "grown": (6, 2),         # no entry, size differs -> upload without hashing
+            "touched_db_changed": (4, 2),   # content still the base, row moved -> export
+            "both_changed": (9, 2),  # hashed, neither side is the base -> upload (daemon merges)
+            "new": (3, 1),           # no row -> upload
+        }
+        documents = {
+            "same": (4, sha256_bytes(b"same")),
+            "db_changed": (6, "other"),
+            "touched": (7, sha256_bytes(b"touched")),
+            "edited": (7, sha256_bytes(b"edited?")),
+            "grown": (4, "old"),
+            "touched_db_changed": (7, "row edit"),
+            "both_changed": (8, "row edit"),
+            "removed": (1, "x"),     # synced before, file gone -> delete
+            "db_only": (1, "y"),     # never written -> export
+        }
+        manifest = {
+            "same": ManifestEntry(4, 1, sha256_bytes(b"same")),
+            "db_changed": ManifestEntry(5, 1, "before"),
+            "touched": ManifestEntry(7, 1, sha256_bytes(b"touched")),
+            "removed": ManifestEntry(1, 1, "x"),
+            "touched_db_changed": ManifestEntry(4, 1, sha256_bytes(b"base")),
+            "both_changed": ManifestEntry(4, 1, sha256_bytes(b"base")),
+        }
+
+        plan = plan_reconcile(files, documents, manifest, self.hash_file(contents), jobs=2)
+        assert sorted(plan.upload) == ["both_changed", "edited", "grown", "new"]
+        assert plan.delete == ["removed"]
+        assert sorted(plan.export) == ["db_changed", "db_only", "touched_db_changed"]
+        assert plan.in_sync == [("touched", 7, 2, sha256_bytes(b"touched"))]
+        assert sorted(self.hashed) == ["both_changed", "edited", "touched", "touched_db_changed"]
+        assert plan.hashed == 4
+
+    def test_vanished_file_is_left_to_the_watcher(self):
+        def hash_file(path):
+            raise FileNotFoundError(path)
+
+        plan = plan_reconcile({"gone": (1, 1)}, {"gone": (1, "x")}, {}, hash_file)
+        assert plan.upload == [] and plan.in_sync == []
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
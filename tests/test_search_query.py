@@ -0,0 +1,82 @@
+"""
+KMS Search Page Tests
+Unit tests for the search v2 query builder and result parsing (no PostgreSQL required)
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.search_query import (
+    build_search_page_query, parse_search_page, render_snippet,
+    encode_cursor, decode_cursor, InvalidCursor, SNIPPET_START, SNIPPET_STOP
+)
+
+
+class TestSearchCursor:
+    """Test keyset cursors"""
+
+    def test_round_trip(self):
+        assert decode_cursor(encode_cursor("0.0607927", 42)) == ("0.0607927", 42, 0)
+        assert decode_cursor(encode_cursor("0.1", 42, 3)) == ("0.1", 42, 3)
+
+    def test_garbage_rejected(self):
+        with pytest.raises(InvalidCursor):
+            decode_cursor("not-a-cursor")
+
+
+class TestSearchPageQuery:
+    """Test the generated statement"""
+
+    def test_first_page(self):
+        sql, params = build_search_page_query("install guide", 20)
+        assert "after_rank" not in params
+        assert "ts_headline" in sql
+        assert "GROUP BY content_type" in sql
+
+    def test_cursor_and_filters(self):
+        cursor = encode_cursor("0.5", 7)
+        sql, params = build_search_page_query("x", 10, cursor, {"category": "odoo", "folder": None},
+                                              with_facets=False)
+        assert params["after_rank"] == "0.5" and params["after_id"] == 7
+        assert "c.slug = %(category)s" in sql
+        assert "folder" not in params
+        assert "GROUP BY" not in sql
+
+    def test_chunk_mode(self):
+        sql, _ = build_search_page_query("x", 10, mode="chunk")
+        assert "ch.search_vector @@ query.tsq" in sql
+        assert "count(DISTINCT id)" in sql
+        with pytest.raises(ValueError):
+            build_search_page_query("x", 10, mode="sentence")
+
+    def test_unknown_filter(self):
+        with pytest.raises(ValueError):
+            build_search_page_query("x", 10, filters={"filepath": "/etc"})
+
+
+class TestSearchPageParsing:
+    """Test turning the result row into a page"""
+
+    def test_next_cursor_from_last_hit(self):
+        hits = [{"document_id": 3, "rank": "0.9", "snippet": ""},
+                {"document_id": 1, "rank": "0.5", "snippet": ""}]
+        page = parse_search_page({"hits": hits, "total": 5, "has_more": True, "facets": None})
+        assert page["results"][1]["rank"] == 0.5
+        assert decode_cursor(page["next_cursor"]) == ("0.5", 1, 0)
+
+    def test_last_page_has_no_cursor(self):
+        page = parse_search_page(([], 0, False, {}))
+        assert page["next_cursor"] is None
+
+    def test_snippet_escaped(self):
+        snippet = f"<script> {SNIPPET_START}guide{SNIPPET_STOP}\n text"
+        assert render_snippet(snippet) == "&lt;script&gt; <mark>guide</mark> text"
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
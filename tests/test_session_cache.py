@@ -0,0 +1,189 @@
+"""
+KMS Session Cache Tests
+Unit tests for cached session/user lookups in get_current_user (no PostgreSQL required)
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key")
+
+import auth
+from utils import cache
+
+
+USER = {"id": 7, "username": "alice", "is_active": True, "is_superuser": False}
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Count DB lookups behind get_current_user and record touches"""
+    calls = {"session": 0, "user": 0}
+    touches = []
+
+    def load_session(token_hash):
+        calls["session"] += 1
+        return (42, USER["id"], time.monotonic() + 3600)
+
+    def load_user(user_id):
+        calls["user"] += 1
+        return dict(USER)
+
+    monkeypatch.setattr(auth, "_load_active_session", load_session)
+    monkeypatch.setattr(auth, "get_user_by_id", load_user)
+    monkeypatch.setattr(auth, "_record_session_touch", touches.append)
+    monkeypatch.setattr(auth, "get_redis_client", lambda: None)
+    monkeypatch.setattr(cache, "get_redis_client", lambda: None)
+    monkeypatch.setattr(cache, "_tag_versions", {})
+    auth._session_cache.clear()
+    auth._user_cache.clear()
+    yield calls, touches
+    auth._session_cache.clear()
+    auth._user_cache.clear()
+
+
+def authenticate(token, payload=None):
+    state = SimpleNamespace()
+    if payload is not None:
+        state.access_token, state.token_payload = token, payload
+    request = SimpleNamespace(state=state)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(auth.get_current_user(request, credentials))
+
+
+class TestSessionCache:
+    """Test cached session lookups"""
+
+    def test_repeat_requests_hit_cache(self, backend):
+        """Second request with the same token does no DB lookups"""
+        calls, touches = backend
+        token = auth.create_access_token({"sub": "alice", "user_id": 7})
+        assert authenticate(token)["username"] == "alice"
+        assert authenticate(token)["username"] == "alice"
+        assert calls == {"session": 1, "user": 1}
+        assert touches == [42, 42]
+
+    def test_logout_invalidates(self, backend):
+        """invalidate_session forces a fresh session lookup"""
+        calls, _ = backend
+        token = auth.create_access_token({"sub": "alice", "user_id": 7})
+        authenticate(token)
+        auth.invalidate_session(auth.hash_token(token))
+        authenticate(token)
+        assert calls["session"] == 2
+
+    def test_disabled_user_rejected_after_invalidate(self, backend, monkeypatch):
+        """invalidate_user drops the cached user and its sessions"""
+        calls, _ = backend
+        token = auth.create_access_token({"sub": "alice", "user_id": 7})
+        authenticate(token)
+        monkeypatch.setattr(auth, "get_user_by_id", lambda user_id: dict(USER, is_active=False))
+        auth.invalidate_user(7)
+        with pytest.raises(HTTPException) as exc:
+            authenticate(token)
+        assert exc.value.status_code == 401
+        assert calls["session"] == 2
+
+    def test_invalidation_from_another_worker(self, backend, monkeypatch):
+        """A bumped user tag (as seen from Redis) evicts the cached session and user"""
+        calls, _ = backend
+        token = auth.create_access_token({"sub": "alice", "user_id": 7})
+        authenticate(token)
+        monkeypatch.setattr(auth, "get_user_by_id", lambda user_id: dict(USER, is_active=False))
+        # Another worker disabled the user: only the shared tag version changed
+        cache.invalidate_tags("user:7")
+        with pytest.raises(HTTPException):
+            authenticate(token)
+        assert calls["session"] == 2
+
+    def test_revoked_token_from_another_worker(self, backend, monkeypatch):
+        """A bumped session tag forces a fresh session lookup"""
+        calls, _ = backend
+        token = auth.create_access_token({"sub": "alice", "user_id": 7})
+        authenticate(token)
+        monkeypatch.setattr(auth, "_load_active_session", lambda token_hash: None)
+        cache.invalidate_tags(f"session:{auth.hash_token(token)}")
+        with pytest.raises(HTTPException):
+            authenticate(token)
+
+    def test_short_ttl_without_redis(self, backend, monkeypatch):
+        """Without Redis entries live SESSION_CACHE_LOCAL_TTL at most"""
+        calls, _ = backend
+        monkeypatch.setattr(auth, "SESSION_CACHE_LOCAL_TTL", 0)
+        token = auth.create_access_token({"sub": "alice", "user_id": 7})
+        authenticate(token)
+        authenticate(token)
+        assert calls == {"session": 2, "user": 2}
+
+    def test_returned_user_is_a_copy(self, backend):
+        """Callers cannot mutate the cached user"""
+        token = auth.create_access_token({"sub": "alice", "user_id": 7})
+        authenticate(token)["username"] = "mallory"
+        assert authenticate(token)["username"] == "alice"
+
+    def test_middleware_payload_reused(self, backend, monkeypatch):
+        """Token decoded by the middleware is not decoded again"""
+        token = auth.create_access_token({"sub": "alice", "user_id": 7})
+        payload = auth.verify_token(token, "access")
+
+        def fail(*args, **kwargs):
+            raise AssertionError("token decoded twice")
+
+        monkeypatch.setattr(auth, "verify_token", fail)
+        assert authenticate(token, payload)["id"] == 7
+
+
+class TestSessionTouchFlush:
+    """Test batched last_used_at updates"""
+
+    def test_touches_coalesced(self, monkeypatch):
+        """Many touches of one session become one row in one statement"""
+        statements = []
+
+        class Cursor:
+            def close(self):
+                pass
+
+        class Conn:
+            def cursor(self):
+                return Cursor()
+
+            def commit(self):
+                pass
+
+            def rollback(self):
+                pass
+
+            def close(self):
+                pass
+
+        monkeypatch.setattr(auth, "get_db_connection", Conn)
+        monkeypatch.setattr(auth, "execute_values",
+                            lambda cur, sql, rows, template=None: statements.append(rows))
+        monkeypatch.setattr(auth, "_touch_flusher_pid", os.getpid())
+        monkeypatch.setattr(auth, "_touch_flusher", object())
+        auth._pending_touches.clear()
+
+        for _ in range(100):
+            auth._record_session_touch(1)
+        auth._record_session_touch(2)
+
+        assert auth.flush_session_touches() == 2
+        assert len(statements) == 1
+        assert sorted(row[0] for row in statements[0]) == [1, 2]
+        assert auth.flush_session_touches() == 0
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
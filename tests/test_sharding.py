@@ -0,0 +1,68 @@
+"""
+KMS Sync Sharding Tests
+Unit tests for category -> shard hashing and worker stats aggregation
+"""
+
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.sharding import ConsistentHashRing, aggregate_worker_stats, category_shard
+
+SLUGS = [f"category-{i}" for i in range(2000)]
+
+
+class TestConsistentHashRing:
+    """Test stability, spread and minimal movement"""
+
+    def test_stable_and_in_range(self):
+        assert all(0 <= category_shard(slug, 4) < 4 for slug in SLUGS)
+        assert [category_shard(slug, 4) for slug in SLUGS] == [category_shard(slug, 4) for slug in SLUGS]
+        assert {category_shard(slug, 1) for slug in SLUGS} == {0}
+
+    def test_spread(self):
+        counts = Counter(category_shard(slug, 4) for slug in SLUGS)
+        assert len(counts) == 4
+        assert min(counts.values()) > len(SLUGS) / 4 * 0.5
+
+    def test_adding_a_shard_moves_few_keys(self):
+        moved = sum(category_shard(slug, 4) != category_shard(slug, 5) for slug in SLUGS)
+        # Ideal is 1/5 of the keys; modulo hashing would move ~4/5
+        assert moved < len(SLUGS) * 0.35
+
+    def test_invalid_shard_count(self):
+        with pytest.raises(ValueError):
+            ConsistentHashRing(0)
+
+
+class TestAggregateWorkerStats:
+    """Test the supervisor's combined stats"""
+
+    def test_sums_counters_and_takes_worst_lag(self):
+        shard_stats = {
+            0: {"queue": {"depth": 2, "events": 10, "last_apply_lag_seconds": 0.5},
+                "change_feed": {"connected": True}},
+            1: {"queue": {"depth": 3, "events": 5, "last_apply_lag_seconds": 2.0},
+                "change_feed": {"connected": True}},
+        }
+        stats = aggregate_worker_stats([{"shard": 0}, {"shard": 1}], shard_stats)
+        assert stats["queue"]["depth"] == 5
+        assert stats["queue"]["events"] == 15
+        assert stats["queue"]["last_apply_lag_seconds"] == 2.0
+        assert stats["change_feed"]["connected"] is True
+        assert set(stats["shards"]) == {"0", "1"}
+
+    def test_missing_worker_stats(self):
+        stats = aggregate_worker_stats([{"shard": 0}], {0: None})
+        assert stats["queue"]["depth"] == 0
+        assert stats["change_feed"]["connected"] is False
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,175 @@
+"""
+KMS Streaming Tests
+Unit tests for ranged/conditional streaming responses (no PostgreSQL required)
+"""
+
+import io
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key")
+
+from utils.streaming import (
+    parse_range, etag_matches, ranged_response, iter_file_range, RangeNotSatisfiable
+)
+
+BODY = bytes(range(256)) * 1000
+ETAG = '"abc123"'
+
+
+def make_client(body=BODY, etag=ETAG):
+    app = FastAPI()
+    app.state.released = 0
+
+    @app.get("/blob")
+    def blob(request: Request):
+        def release():
+            app.state.released += 1
+        return ranged_response(
+            request,
+            size=len(body),
+            open_stream=lambda start, end: iter_file_range(io.BytesIO(body), start, end, chunk_size=1000),
+            media_type="application/octet-stream",
+            etag=etag,
+            release=release,
+        )
+
+    return app, TestClient(app)
+
+
+class TestParseRange:
+    """Test Range header parsing"""
+
+    def test_forms(self):
+        assert parse_range("bytes=0-99", 1000) == (0, 99)
+        assert parse_range("bytes=900-", 1000) == (900, 999)
+        assert parse_range("bytes=-100", 1000) == (900, 999)
+        assert parse_range("bytes=0-5000", 1000) == (0, 999)
+
+    def test_ignored(self):
+        assert parse_range(None, 1000) is None
+        assert parse_range("bytes=0-1,5-9", 1000) is None
+        assert parse_range("items=0-1", 1000) is None
+
+    def test_unsatisfiable(self):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range("bytes=1000-", 1000)
+
+    def test_empty_body_unsatisfiable(self):
+        for header in ("bytes=-5", "bytes=0-"):
+            with pytest.raises(RangeNotSatisfiable):
+                parse_range(header, 0)
+
+    def test_etag_matches(self):
+        assert etag_matches('"x", W/"abc123"', ETAG)
+        assert etag_matches("*", ETAG)
+        assert not etag_matches('"other"', ETAG)
+
+
+class TestRangedResponse:
+    """Test 200/206/304/416 responses"""
+
+    def test_full_body(self):
+        _, client = make_client()
+        response = client.get("/blob")
+        assert response.status_code == 200
+        assert response.content == BODY
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["etag"] == ETAG
+
+    def test_partial(self):
+        _, client = make_client()
+        response = client.get("/blob", headers={"Range": "bytes=1500-2600"})
+        assert response.status_code == 206
+        assert response.content == BODY[1500:2601]
+        assert response.headers["content-range"] == f"bytes 1500-2600/{len(BODY)}"
+
+    def test_not_modified(self):
+        app, client = make_client()
+        response = client.get("/blob", headers={"If-None-Match": ETAG})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert app.state.released == 1
+
+    def test_unsatisfiable(self):
+        _, client = make_client()
+        response = client.get("/blob", headers={"Range": f"bytes={len(BODY)}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(BODY)}"
+
+    def test_empty_body_range(self):
+        _, client = make_client(body=b"")
+        response = client.get("/blob", headers={"Range": "bytes=-5"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */0"
+
+    def test_released_after_stream(self):
+        for body, headers in ((BODY, {}), (BODY, {"Range": "bytes=0-9"}), (b"", {})):
+            app, client = make_client(body=body)
+            assert client.get("/blob", headers=headers).status_code in (200, 206)
+            assert app.state.released == 1
+
+    def test_stale_if_range_sends_full_body(self):
+        _, client = make_client()
+        response = client.get("/blob", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+        assert response.status_code == 200
+        assert len(response.content) == len(BODY)
+
+
+class TestDocumentChunkStream:
+    """Test byte slicing across stored document chunks"""
+
+    def test_range_spanning_chunks(self):
+        from routers.documents import _stream_document_content
+
+        text = "# Název\nžluťoučký kůň\n\n## Druhá\nvíce textu\n"
+        pieces = ["# Název\nžluťoučký kůň\n\n", "## Druhá\nvíce textu\n"]
+        rows, offset = [], 0
+        for piece in pieces:
+            rows.append({"start_byte": offset, "content": piece})
+            offset += len(piece.encode("utf-8"))
+
+        class Cursor:
+            itersize = None
+
+            def execute(self, query, params):
+                _, start, end = params
+                self.rows = [r for r in rows
+                             if r["start_byte"] + len(r["content"].encode()) > start
+                             and r["start_byte"] <= end]
+
+            def __iter__(self):
+                return iter(self.rows)
+
+            def close(self):
+                pass
+
+        class Conn:
+            closed = False
+
+            def cursor(self, name=None):
+                return Cursor()
+
+            def rollback(self):
+                pass
+
+            def close(self):
+                self.closed = True
+
+        data = text.encode("utf-8")
+        for start, end in [(0, len(data) - 1), (3, 40), (len(pieces[0].encode()) - 2, len(data) - 3)]:
+            conn = Conn()
+            assert b"".join(_stream_document_content(conn, 1, start, end)) == data[start:end + 1]
+            assert conn.closed
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
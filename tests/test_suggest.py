@@ -0,0 +1,117 @@
+"""
+KMS Search Suggestion Tests
+Unit tests for the suggest prefix index and engine (no PostgreSQL required)
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.suggest import PrefixIndex, SuggestEngine, build_suggest_query
+
+
+def entry(entry_type, entry_id, title, context="ctx"):
+    return {"type": entry_type, "id": entry_id, "title": title, "context": context}
+
+
+class FakeDB:
+    """Answers snapshot queries from a dict and records SQL suggest queries"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.suggest_queries = 0
+
+    def execute(self, query, params):
+        if "similarity" in query:
+            self.suggest_queries += 1
+            return []
+        rows = [r for r in self.rows if ("'object'" in query) == (r["type"] == "object")]
+        if params:
+            rows = [r for r in rows if r["id"] in params[0]]
+        return [dict(r) for r in rows]
+
+
+class TestPrefixIndex:
+    """Test the in-memory prefix index"""
+
+    def test_whole_name_before_word_prefix(self):
+        index = PrefixIndex()
+        index.load([
+            entry("object", 1, "Install Guide"),
+            entry("object", 2, "guide-linux"),
+            entry("document", 3, "user_guide.md"),
+        ])
+        results = index.lookup("gui", 10)
+        assert [r["id"] for r in results["object"]] == [2, 1]
+        assert [r["id"] for r in results["document"]] == [3]
+
+    def test_case_insensitive_and_limit(self):
+        index = PrefixIndex()
+        index.load([entry("object", i, f"Project {i}") for i in range(20)])
+        results = index.lookup("PROJ", 5)
+        assert len(results["object"]) == 5
+
+    def test_upsert_and_remove(self):
+        index = PrefixIndex()
+        index.load([entry("object", 1, "alpha")])
+        index.upsert(entry("object", 1, "beta"))
+        assert index.lookup("alp", 5)["object"] == []
+        assert index.lookup("bet", 5)["object"][0]["id"] == 1
+        index.remove("object", 1)
+        assert index.lookup("bet", 5)["object"] == []
+        assert len(index) == 0
+
+
+class TestSuggestEngine:
+    """Test memory/DB routing and change application"""
+
+    def make_engine(self, rows):
+        db = FakeDB(rows)
+        engine = SuggestEngine(db.execute, use_prefix_index=True)
+        engine.reload()
+        return engine, db
+
+    def test_answered_from_memory_when_full(self):
+        rows = [entry("object", 1, "kms api"), entry("document", 2, "kms.md")]
+        engine, db = self.make_engine(rows)
+        results, source = engine.suggest("km", 1)
+        assert source == "memory"
+        assert db.suggest_queries == 0
+        assert results["object"][0]["title"] == "kms api"
+
+    def test_falls_back_to_db_when_short(self):
+        engine, db = self.make_engine([entry("object", 1, "kms api")])
+        _, source = engine.suggest("kms", 5)
+        assert source == "database"
+        assert db.suggest_queries == 1
+
+    def test_change_events_applied(self):
+        rows = [entry("object", 1, "alpha")]
+        engine, db = self.make_engine(rows)
+        rows.append(entry("object", 2, "alpine"))
+        rows[0] = entry("object", 1, "omega")
+        engine.apply_changes([
+            {"table": "objects", "action": "INSERT", "id": 2},
+            {"table": "objects", "action": "UPDATE", "id": 1},
+            {"table": "categories", "action": "UPDATE", "id": 9},
+        ])
+        titles = [r["title"] for r in engine.index.lookup("al", 10)["object"]]
+        assert titles == ["alpine"]
+        db.rows = [r for r in rows if r["id"] != 2]
+        engine.apply_changes([{"table": "objects", "action": "DELETE", "id": 2}])
+        assert engine.index.lookup("al", 10)["object"] == []
+
+    def test_short_query_uses_prefix_only(self):
+        query, params = build_suggest_query("ab", 5)
+        assert "%%" not in query.split("WHERE")[1].split("ORDER")[0]
+        assert params["prefix"] == "ab%"
+        query, params = build_suggest_query("50%_x", 5)
+        assert params["contains"] == "%50\\%\\_x%"
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,78 @@
+"""
+KMS Sync Manifest Tests
+Unit tests for the stat/checksum manifest used by the sync daemon
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.sync_manifest import SyncManifest, sha256_bytes
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    m = SyncManifest(tmp_path / "state" / "manifest.db")
+    yield m
+    m.close()
+
+
+class TestSyncManifest:
+    """Test stat-only change detection"""
+
+    def test_unknown_file_is_changed(self, manifest, tmp_path):
+        path = tmp_path / "a.md"
+        path.write_text("hello")
+        assert manifest.get("a.md") is None
+        assert not manifest.is_unchanged("a.md", path.stat())
+
+    def test_record_and_stat_match(self, manifest, tmp_path):
+        path = tmp_path / "a.md"
+        path.write_text("hello")
+        st = path.stat()
+        manifest.record("a.md", st, sha256_bytes(b"hello"))
+
+        assert manifest.is_unchanged("a.md", path.stat())
+        assert manifest.get("a.md").sha256 == sha256_bytes(b"hello")
+
+        # mtime-only change is visible without reading the file
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert not manifest.is_unchanged("a.md", path.stat())
+
+    def test_persists_and_removes(self, tmp_path):
+        db = tmp_path / "manifest.db"
+        first = SyncManifest(db)
+        first.record_many([("a.md", 1, 10, "x"), ("b.md", 2, 20, "y")])
+        first.close()
+
+        second = SyncManifest(db)
+        assert len(second) == 2
+        second.remove("a.md")
+        assert set(second.entries()) == {"b.md"}
+        second.close()
+
+    def test_merge_bases(self, manifest):
+        manifest.put_bases([b"v1", b"v2"])
+        manifest.record_many([("a.md", 2, 10, sha256_bytes(b"v2"))])
+        assert manifest.get_base(sha256_bytes(b"v1")) == b"v1"
+
+        assert manifest.prune_bases() == 1
+        assert manifest.get_base(sha256_bytes(b"v1")) is None
+        assert manifest.get_base(sha256_bytes(b"v2")) == b"v2"
+
+    def test_conflicts(self, manifest):
+        assert manifest.get_conflict("a.md") is None
+        manifest.set_conflict("a.md", "file", "db")
+        assert manifest.get_conflict("a.md") == ("file", "db")
+        manifest.clear_conflict("a.md")
+        assert manifest.get_conflict("a.md") is None
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
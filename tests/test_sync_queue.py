@@ -0,0 +1,81 @@
+"""
+KMS Sync Queue Tests
+Unit tests for the debounced, coalescing file event queue
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add API directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "api"))
+
+from utils.sync_queue import (
+    CoalescingQueue, EVENT_DELETE, EVENT_UPSERT, read_stats, write_stats
+)
+
+
+class TestCoalescingQueue:
+    """Test debounce, deduplication and batching"""
+
+    def test_events_for_a_path_coalesce(self):
+        queue = CoalescingQueue(debounce=0.05, max_delay=5)
+        for _ in range(5):
+            queue.put("/a.md", EVENT_UPSERT)
+        queue.put("/b.md", EVENT_UPSERT)
+        queue.put("/b.md", EVENT_DELETE)
+
+        assert queue.get_batch(timeout=0) == []
+        batch = queue.get_batch(timeout=1)
+        assert [(path, kind) for path, kind, _ in batch] == [("/a.md", EVENT_UPSERT), ("/b.md", EVENT_DELETE)]
+
+        stats = queue.stats()
+        assert stats["events"] == 7
+        assert stats["coalesced"] == 5
+        assert stats["depth"] == 0
+
+    def test_debounce_restarts_on_new_event(self):
+        queue = CoalescingQueue(debounce=0.2, max_delay=5)
+        queue.put("/a.md")
+        time.sleep(0.15)
+        queue.put("/a.md")
+        assert queue.get_batch(timeout=0.1) == []
+        assert len(queue.get_batch(timeout=1)) == 1
+
+    def test_max_delay_bounds_a_busy_path(self):
+        queue = CoalescingQueue(debounce=10, max_delay=0.1)
+        queue.put("/a.md")
+        assert len(queue.get_batch(timeout=1)) == 1
+
+    def test_batch_size_and_flush(self):
+        queue = CoalescingQueue(debounce=60, max_delay=60, batch_size=2)
+        for name in "abc":
+            queue.put(f"/{name}.md")
+        assert queue.stats()["depth"] == 3
+        assert len(queue.get_batch(timeout=0, flush=True)) == 2
+        assert len(queue.get_batch(timeout=0, flush=True)) == 1
+
+    def test_record_batch_lag(self):
+        queue = CoalescingQueue(debounce=0, max_delay=0)
+        queue.put("/a.md")
+        batch = queue.get_batch(timeout=1)
+        queue.record_batch(batch, 0.01)
+        stats = queue.stats()
+        assert stats["batches"] == 1
+        assert stats["applied"] == 1
+        assert stats["last_apply_lag_seconds"] >= 0
+
+    def test_stats_file_round_trip(self, tmp_path):
+        path = str(tmp_path / "stats.json")
+        assert read_stats(path) is None
+        write_stats({"queue": {"depth": 3}}, path)
+        stats = read_stats(path)
+        assert stats["queue"]["depth"] == 3
+        assert "written_at" in stats
+
+
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])